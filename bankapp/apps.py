@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BankappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bankapp'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
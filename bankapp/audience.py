@@ -0,0 +1,248 @@
+"""
+Audience sizing: how many stored customers would qualify for a (possibly
+hypothetical) product.
+
+Customer salary, birth date, pincode and company are held as NumPy column
+arrays per process. Pincodes and company names are dictionary-encoded
+(small int codes into a vocabulary), so a product definition is evaluated
+against the whole base with a handful of vectorized lookups and compares:
+
+    pincode served   → boolean lookup table indexed by pincode code
+    company category → category lookup table indexed by company code
+                       (re-derived from the catalog snapshot, so category
+                       changes apply without reloading customers)
+    salary threshold → threshold lookup table indexed by category id
+    age range        → birth year / month-day compared with today
+
+The columns are refreshed incrementally: customers with an id above the
+last loaded one are appended, and rows whose last_eligibility_check moved
+since the previous refresh are overwritten in place. A full reload every
+FULL_RELOAD_INTERVAL seconds picks up deletions and admin edits.
+"""
+import copy
+import threading
+import time
+from datetime import date
+
+import numpy as np
+
+from .models import Customer
+
+REFRESH_INTERVAL = 30          # seconds between incremental refreshes
+FULL_RELOAD_INTERVAL = 3600    # seconds between full reloads
+LOAD_CHUNK_SIZE = 5000
+REGION_DIGITS = 3              # pincode prefix used for the region breakdown
+
+_COLUMNS = ("id", "salary", "dob", "pincode", "companyName")
+
+
+class CustomerColumns:
+    """Column arrays for every stored customer, ordered by id."""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.salary = np.empty(0, dtype=np.float64)
+        self.birth_year = np.empty(0, dtype=np.int32)     # 0 when dob is unknown
+        self.birth_md = np.empty(0, dtype=np.int32)       # month * 100 + day
+        self.pincode_code = np.empty(0, dtype=np.int32)   # index into self.pincodes, -1 when missing
+        self.company_code = np.empty(0, dtype=np.int32)   # index into self.company_names, -1 when missing
+
+        self.pincodes, self._pincode_index = [], {}
+        self.company_names, self._company_index = [], {}
+        self._derived_columns = {}     # name → (cache key, array)
+
+        self.max_id = 0
+        self.refreshed_on = None       # date of the last refresh (for last_eligibility_check)
+        self.refreshed_at = 0.0
+        self.full_loaded_at = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -------------------- loading --------------------
+    @staticmethod
+    def _code(value, vocabulary, index):
+        if not value:
+            return -1
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(vocabulary)
+            vocabulary.append(value)
+        return code
+
+    def _encode(self, rows):
+        """values_list rows → tuple of column arrays."""
+        ids, salary, year, md, pin, company = [], [], [], [], [], []
+        for pk, sal, dob, pincode, company_name in rows:
+            ids.append(pk)
+            salary.append(float(sal or 0))
+            year.append(dob.year if dob else 0)
+            md.append(dob.month * 100 + dob.day if dob else 0)
+            pin.append(self._code(pincode, self.pincodes, self._pincode_index))
+            company.append(self._code(
+                company_name.strip().lower() if company_name else None, self.company_names, self._company_index
+            ))
+        return (
+            np.array(ids, dtype=np.int64),
+            np.array(salary, dtype=np.float64),
+            np.array(year, dtype=np.int32),
+            np.array(md, dtype=np.int32),
+            np.array(pin, dtype=np.int32),
+            np.array(company, dtype=np.int32),
+        )
+
+    def _arrays(self):
+        return (self.ids, self.salary, self.birth_year, self.birth_md, self.pincode_code, self.company_code)
+
+    def _set_arrays(self, arrays):
+        self.ids, self.salary, self.birth_year, self.birth_md, self.pincode_code, self.company_code = arrays
+
+    @classmethod
+    def load(cls):
+        columns = cls()
+        columns.refreshed_on = date.today()
+        rows = Customer.objects.order_by("id").values_list(*_COLUMNS).iterator(chunk_size=LOAD_CHUNK_SIZE)
+        columns._set_arrays(columns._encode(rows))
+        columns.max_id = int(columns.ids[-1]) if len(columns.ids) else 0
+        columns.refreshed_at = columns.full_loaded_at = time.monotonic()
+        return columns
+
+    def refreshed(self):
+        """
+        A copy with new customers appended and re-checked ones overwritten.
+        Readers keep using the old object until the cache swaps in the new one;
+        the code vocabularies are shared (they only grow, codes never change).
+        """
+        fresh = copy.copy(self)
+        fresh._derived_columns = {}
+        fresh._refresh()
+        return fresh
+
+    def _refresh(self):
+        today = date.today()
+        added = self._encode(
+            Customer.objects.filter(id__gt=self.max_id).order_by("id").values_list(*_COLUMNS)
+            .iterator(chunk_size=LOAD_CHUNK_SIZE)
+        )
+        changed = self._encode(
+            Customer.objects.filter(id__lte=self.max_id, last_eligibility_check__gte=self.refreshed_on)
+            .values_list(*_COLUMNS)
+        )
+
+        arrays = list(self._arrays())
+        if len(changed[0]):
+            positions = np.searchsorted(arrays[0], changed[0])
+            known = (positions < len(arrays[0])) & (arrays[0][np.minimum(positions, len(arrays[0]) - 1)] == changed[0])
+            for i in range(1, len(arrays)):
+                arrays[i] = arrays[i].copy()
+                arrays[i][positions[known]] = changed[i][known]
+        if len(added[0]):
+            arrays = [np.concatenate((current, extra)) for current, extra in zip(arrays, added)]
+        self._set_arrays(tuple(arrays))
+
+        if len(self.ids):
+            self.max_id = int(self.ids[-1])
+        self.refreshed_on = today
+        self.refreshed_at = time.monotonic()
+
+    # -------------------- evaluation --------------------
+    def _derived(self, name, key, compute):
+        """Per-object cache of query-independent columns (ages, categories, regions)."""
+        cached = self._derived_columns.get(name)
+        if cached is None or cached[0] != key:
+            cached = self._derived_columns[name] = (key, compute())
+        return cached[1]
+
+    def ages(self, today=None):
+        """Age in completed years per customer (-1 when dob is unknown)."""
+        today = today or date.today()
+
+        def compute():
+            age = today.year - self.birth_year - (self.birth_md > today.month * 100 + today.day)
+            return np.where(self.birth_year > 0, age, -1).astype(np.int32)
+        return self._derived("ages", today, compute)
+
+    def category_ids(self, snapshot):
+        """Resolved company category id per customer, using the snapshot's company → category map."""
+        def compute():
+            lookup = np.array(
+                [snapshot.resolve_category(name) for name in self.company_names[:]] + [snapshot.unlisted_category_id],
+                dtype=np.int32,
+            )
+            return lookup[self.company_code]  # code -1 picks the trailing UNLISTED entry
+        return self._derived("category_ids", snapshot, compute)
+
+    def region_codes(self):
+        """(region code per customer (-1 when no pincode), region labels)."""
+        def compute():
+            labels, index, lookup = [], {}, []
+            for pincode in self.pincodes[:]:
+                lookup.append(self._code(pincode[:REGION_DIGITS], labels, index))
+            return np.array(lookup + [-1], dtype=np.int32)[self.pincode_code], labels
+        return self._derived("regions", None, compute)
+
+    def qualify(self, snapshot, pincodes, min_age, max_age, thresholds, today=None):
+        """
+        Boolean mask of customers that would be eligible for a product served in
+        `pincodes`, with the given age range and `{category_id: min_salary}` thresholds.
+        Same rules as CatalogSnapshot.eligible_products.
+        """
+        served = np.zeros(len(self.pincodes) + 1, dtype=bool)
+        for pincode in pincodes:
+            code = self._pincode_index.get(pincode)
+            if code is not None:
+                served[code] = True
+        mask = served[self.pincode_code]  # code -1 picks the trailing False
+
+        if min_age and max_age:
+            age = self.ages(today)
+            mask &= (age >= min_age) & (age <= max_age)
+
+        category_ids = self.category_ids(snapshot)
+        size = max(int(category_ids.max()) if len(category_ids) else 0, max(thresholds, default=0)) + 1
+        required = np.full(size, np.inf)
+        for category_id, min_salary in thresholds.items():
+            required[category_id] = min_salary
+        mask &= self.salary >= required[category_ids]
+        return mask, category_ids
+
+
+def size_audience(columns, snapshot, pincodes, min_age, max_age, thresholds, today=None):
+    """Count qualifying customers overall, by category and by pincode region."""
+    mask, category_ids = columns.qualify(snapshot, pincodes, min_age, max_age, thresholds, today)
+
+    category_counts = np.bincount(category_ids[mask])
+    by_category = sorted(
+        ({"category": snapshot.category_name(c), "count": int(n)} for c, n in enumerate(category_counts) if n),
+        key=lambda row: -row["count"],
+    )
+
+    regions, labels = columns.region_codes()
+    region_counts = np.bincount(regions[mask & (regions >= 0)], minlength=len(labels))
+    by_region = sorted(
+        ({"region": labels[i], "count": int(n)} for i, n in enumerate(region_counts) if n),
+        key=lambda row: (-row["count"], row["region"]),
+    )
+
+    return {
+        "total_customers": len(columns),
+        "eligible_count": int(mask.sum()),
+        "by_category": by_category,
+        "by_region": by_region,
+    }
+
+
+# -------------------- process-level cache --------------------
+_columns = None
+_columns_lock = threading.Lock()
+
+
+def get_customer_columns():
+    global _columns
+    with _columns_lock:
+        now = time.monotonic()
+        if _columns is None or now - _columns.full_loaded_at >= FULL_RELOAD_INTERVAL:
+            _columns = CustomerColumns.load()
+        elif now - _columns.refreshed_at >= REFRESH_INTERVAL:
+            _columns = _columns.refreshed()
+        return _columns
@@ -0,0 +1,318 @@
+"""
+Bulk import/export of the product catalog.
+
+A catalog file is a JSON document of the shape::
+
+    {
+        "banks": [
+            {
+                "bank_name": "HDFC Bank",
+                "pincode": "110001,110002",
+                "products": [
+                    {
+                        "product_title": "Personal Loan",
+                        "min_age": 21, "max_age": 58,
+                        ...
+                        "categories": {"CAT A": "25000.00", "UNLISTED": "40000.00"}
+                    }
+                ]
+            }
+        ]
+    }
+
+Imports are diffed against the stored products and salary criteria and
+applied with a fixed number of bulk statements, independent of how many
+products or categories the file contains.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .eligibility import bump_catalog_version
+from .models import Bank, Product, CompanyCategory, SalaryCriteria
+
+
+# Product columns carried in a catalog file (besides bank / categories)
+CATALOG_PRODUCT_FIELDS = [
+    "product_title",
+    "min_age",
+    "max_age",
+    "min_tenure",
+    "max_tenure",
+    "min_loan_amount",
+    "max_loan_amount",
+    "min_roi",
+    "max_roi",
+    "foir_details",
+    "foir_percent",
+    "obligation_handling",
+]
+
+DECIMAL_PRODUCT_FIELDS = ("min_loan_amount", "max_loan_amount", "foir_percent")
+
+
+def normalize_category_name(name):
+    """Frontend sends `CAT_A`, the table stores `CAT A`."""
+    return str(name).replace("_", " ").strip()
+
+
+def resolve_categories(names):
+    """
+    Map category names to CompanyCategory rows (case-insensitive),
+    creating the missing ones in a single bulk insert.
+    Returns {normalized_lower_name: CompanyCategory}.
+    """
+    wanted = {}
+    for name in names:
+        clean = normalize_category_name(name)
+        wanted.setdefault(clean.lower(), clean)
+    if not wanted:
+        return {}
+
+    def fetch():
+        qs = CompanyCategory.objects.annotate(lname=Lower("category_name")).filter(lname__in=list(wanted))
+        return {c.lname: c for c in qs}
+
+    found = fetch()
+    missing = [CompanyCategory(category_name=wanted[key]) for key in wanted if key not in found]
+    if missing:
+        CompanyCategory.objects.bulk_create(missing, ignore_conflicts=True)
+        found = fetch()
+    return found
+
+
+def sync_salary_criteria(product_categories, delete_missing=False):
+    """
+    Bring the SalaryCriteria of several products in line with
+    `{product_id: {category_name: min_salary}}` using bulk statements.
+    `None` salaries are skipped, or removed when `delete_missing` is set.
+    Returns a dict with created/updated/deleted counts.
+    """
+    stats = {"created": 0, "updated": 0, "deleted": 0}
+    if not product_categories:
+        return stats
+
+    # A None salary never needs its category: don't create one for it
+    categories = resolve_categories(
+        name for cats in product_categories.values() for name, salary in cats.items() if salary is not None
+    )
+
+    existing = {}
+    duplicates = []
+    for criteria in SalaryCriteria.objects.filter(product_id__in=list(product_categories)).order_by("salary_id"):
+        key = (criteria.product_id, criteria.category_id)
+        if key in existing:
+            duplicates.append(criteria.salary_id)  # keep the first row per (product, category)
+        else:
+            existing[key] = criteria
+
+    to_create, to_update, to_delete = [], [], list(duplicates) if delete_missing else []
+    for product_id, cats in product_categories.items():
+        wanted_keys = set()
+        for name, salary in cats.items():
+            if salary is None:
+                continue
+            salary = Decimal(str(salary))
+            category = categories[normalize_category_name(name).lower()]
+            key = (product_id, category.category_id)
+            wanted_keys.add(key)
+            current = existing.get(key)
+            if current is None:
+                to_create.append(SalaryCriteria(product_id=product_id, category=category, min_salary=salary))
+            elif current.min_salary != salary:
+                current.min_salary = salary
+                to_update.append(current)
+        if delete_missing:
+            to_delete.extend(
+                c.salary_id for key, c in existing.items()
+                if key[0] == product_id and key not in wanted_keys
+            )
+
+    if to_create:
+        SalaryCriteria.objects.bulk_create(to_create)
+    if to_update:
+        SalaryCriteria.objects.bulk_update(to_update, ["min_salary"])
+    if to_delete:
+        SalaryCriteria.objects.filter(salary_id__in=to_delete).delete()
+    if to_create or to_update or to_delete:
+        # bulk statements don't fire the signals that invalidate the eligibility snapshot
+        transaction.on_commit(bump_catalog_version)
+
+    stats.update(created=len(to_create), updated=len(to_update), deleted=len(to_delete))
+    return stats
+
+
+def export_catalog(bank_ids=None):
+    """Dump banks, products and salary criteria as a catalog document."""
+    banks = Bank.objects.order_by("bank_name")
+    if bank_ids:
+        banks = banks.filter(id__in=bank_ids)
+    banks = list(banks.values("id", "bank_name", "pincode"))
+    bank_ids = [b["id"] for b in banks]
+
+    criteria_by_product = {}
+    criteria = (
+        SalaryCriteria.objects.filter(product__bank_id__in=bank_ids)
+        .order_by("product_id", "salary_id")
+        .values_list("product_id", "category__category_name", "min_salary")
+    )
+    for product_id, category_name, min_salary in criteria:
+        criteria_by_product.setdefault(product_id, {}).setdefault(category_name, str(min_salary))
+
+    products_by_bank = {}
+    products = (
+        Product.objects.filter(bank_id__in=bank_ids)
+        .order_by("bank_id", "id")
+        .values("id", "bank_id", *CATALOG_PRODUCT_FIELDS)
+    )
+    for row in products:
+        product_id = row.pop("id")
+        bank_id = row.pop("bank_id")
+        for field in DECIMAL_PRODUCT_FIELDS:
+            if row[field] is not None:
+                row[field] = str(row[field])
+        row["categories"] = criteria_by_product.get(product_id, {})
+        products_by_bank.setdefault(bank_id, []).append(row)
+
+    return {
+        "banks": [
+            {
+                "bank_name": bank["bank_name"],
+                "pincode": bank["pincode"],
+                "products": products_by_bank.get(bank["id"], []),
+            }
+            for bank in banks
+        ]
+    }
+
+
+def _resolve_banks(bank_entries):
+    """Match catalog banks by name (case-insensitive), creating new ones in bulk."""
+    wanted = {entry["bank_name"].strip().lower(): entry for entry in bank_entries}
+
+    def fetch():
+        qs = Bank.objects.annotate(lname=Lower("bank_name")).filter(lname__in=list(wanted))
+        return {b.lname: b for b in qs}
+
+    found = fetch()
+    missing = [
+        Bank(bank_name=entry["bank_name"].strip(), pincode=entry.get("pincode"))
+        for key, entry in wanted.items() if key not in found
+    ]
+    if missing:
+        Bank.objects.bulk_create(missing)
+        found = fetch()
+
+    # Pincode coverage is part of the catalog when supplied
+    changed = []
+    for key, entry in wanted.items():
+        bank = found[key]
+        if "pincode" in entry and entry["pincode"] != bank.pincode:
+            bank.pincode = entry["pincode"]
+            changed.append(bank)
+    if changed:
+        Bank.objects.bulk_update(changed, ["pincode"])
+    return found, len(missing)
+
+
+def import_catalog(bank_entries, delete_missing=False, dry_run=False):
+    """
+    Apply validated catalog bank entries (see CatalogBankSerializer).
+
+    Products are matched on (bank, product_title) case-insensitively.
+    With `delete_missing`, products absent from a bank's `products` list are
+    deleted, as are salary criteria absent from a product's `categories`.
+    Only collections present in the file are diffed: a bank without a
+    `products` key, or a product without `categories`, keeps what it has.
+    `dry_run` computes the same summary and rolls back.
+    """
+    summary = {
+        "banks_created": 0,
+        "products_created": 0,
+        "products_updated": 0,
+        "products_deleted": 0,
+        "criteria_created": 0,
+        "criteria_updated": 0,
+        "criteria_deleted": 0,
+        "dry_run": dry_run,
+    }
+
+    with transaction.atomic():
+        banks, summary["banks_created"] = _resolve_banks(bank_entries)
+
+        existing = {}
+        for product in Product.objects.filter(bank_id__in=[b.id for b in banks.values()]):
+            existing[(product.bank_id, product.product_title.strip().lower())] = product
+
+        to_create, to_update, seen = [], [], set()
+        listed_banks = set()  # banks whose entry carries a `products` list
+        categories_by_key = {}
+        update_fields = [f for f in CATALOG_PRODUCT_FIELDS if f != "product_title"]
+
+        for entry in bank_entries:
+            bank = banks[entry["bank_name"].strip().lower()]
+            if "products" not in entry:
+                continue
+            listed_banks.add(bank.id)
+            for item in entry["products"]:
+                key = (bank.id, item["product_title"].strip().lower())
+                seen.add(key)
+                if "categories" in item:
+                    categories_by_key[key] = item["categories"] or {}
+                product = existing.get(key)
+                if product is None:
+                    to_create.append(Product(bank=bank, **{f: item[f] for f in CATALOG_PRODUCT_FIELDS if f in item}))
+                    continue
+                dirty = False
+                for field in update_fields:
+                    if field in item and getattr(product, field) != item[field]:
+                        setattr(product, field, item[field])
+                        dirty = True
+                if dirty:
+                    to_update.append(product)
+
+        to_delete = [
+            p.id for key, p in existing.items() if key[0] in listed_banks and key not in seen
+        ] if delete_missing else []
+
+        if to_create:
+            Product.objects.bulk_create(to_create)
+            if any(p.pk is None for p in to_create):
+                # Backend can't return ids from bulk inserts — fetch them back in one query
+                created_keys = {(p.bank_id, p.product_title.strip().lower()) for p in to_create}
+                for product in Product.objects.filter(
+                    bank_id__in={k[0] for k in created_keys},
+                    product_title__in=[p.product_title for p in to_create],
+                ):
+                    key = (product.bank_id, product.product_title.strip().lower())
+                    if key in created_keys:
+                        existing[key] = product
+            else:
+                for product in to_create:
+                    existing[(product.bank_id, product.product_title.strip().lower())] = product
+        if to_update:
+            Product.objects.bulk_update(to_update, update_fields)
+        if to_delete:
+            Product.objects.filter(id__in=to_delete).delete()
+
+        criteria_stats = sync_salary_criteria(
+            {existing[key].id: cats for key, cats in categories_by_key.items()},
+            delete_missing=delete_missing,
+        )
+
+        summary.update(
+            products_created=len(to_create),
+            products_updated=len(to_update),
+            products_deleted=len(to_delete),
+            criteria_created=criteria_stats["created"],
+            criteria_updated=criteria_stats["updated"],
+            criteria_deleted=criteria_stats["deleted"],
+        )
+
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            transaction.on_commit(bump_catalog_version)
+
+    return summary
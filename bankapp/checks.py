@@ -0,0 +1,33 @@
+"""
+Deployment checks (`manage.py check --deploy`).
+
+State that must be seen by every worker process has to live in a cache
+shared between them; a local-memory cache silently multiplies rate limits
+by the number of workers and lets duplicate Idempotency-Key requests that
+reach different workers both run.
+"""
+from django.core.cache import caches
+from django.core.checks import Tags, Warning, register
+
+from . import idempotency, throttling
+from .eligibility import is_process_local
+
+# setting → its options getter (the "CACHE" alias must be shared)
+SHARED_CACHE_SETTINGS = {
+    "BANKAPP_RATE_LIMITS": throttling.get_options,
+    "BANKAPP_IDEMPOTENCY": idempotency.get_options,
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    warnings = []
+    for setting, get_options in SHARED_CACHE_SETTINGS.items():
+        alias = get_options()["CACHE"]
+        if is_process_local(caches[alias]):
+            warnings.append(Warning(
+                f"{setting}['CACHE'] uses the process-local cache {alias!r}.",
+                hint="Point it at a cache shared by every worker (database, Redis); local memory is for tests only.",
+                id="bankapp.W001",
+            ))
+    return warnings
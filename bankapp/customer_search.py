@@ -0,0 +1,156 @@
+"""
+Admin customer search: partial name / email / phone / PAN plus filters,
+listed newest first with keyset pagination.
+
+Substring matching (`icontains` on each search field) is served by a
+trigram index:
+
+- Postgres with pg_trgm: GIN `gin_trgm_ops` indexes on UPPER(field), created
+  by migration 0025 when the extension can be installed. `icontains` uses
+  them directly.
+- Anything else (SQLite, Postgres without the extension): the
+  CustomerSearchGram table holds every distinct 3-gram of each customer's
+  lower-cased search fields. A query's customers must own all of the
+  query's grams; those candidates are then checked with `icontains`, so
+  results are exactly the same as a full scan. Rows are kept current by a
+  Customer post_save signal (and deleted with the customer); writes that
+  bypass signals (queryset.update, bulk_create, raw SQL) need
+  `manage.py rebuild_customer_search`.
+
+Pagination is by id (`?cursor=<last id>`), so each page costs the same no
+matter how deep the admin scrolls.
+"""
+from django.db import connections, transaction
+from django.db.models import Count, Q
+
+from .fast_writes import insert_rows
+from .models import Customer, CustomerSearchGram
+
+SEARCH_FIELDS = ("full_name", "email", "phone", "pan")
+GRAM_SIZE = 3
+MIN_QUERY_LENGTH = GRAM_SIZE
+TRIGRAM_INDEX_NAME = "customer_{field}_trgm"
+INDEX_BATCH_SIZE = 2000
+
+BACKEND_PG_TRGM = "pg_trgm"
+BACKEND_NGRAM = "ngram"
+
+_backends = {}  # database alias → backend
+
+
+def grams(text):
+    """Distinct lower-cased 3-grams of `text`."""
+    text = (text or "").lower()
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def customer_grams(values):
+    """Distinct 3-grams over a customer's search field values (never across fields)."""
+    out = set()
+    for value in values:
+        out |= grams(value)
+    return out
+
+
+def search_backend(using="default"):
+    """pg_trgm when migration 0025 created the trigram indexes, else the n-gram table."""
+    backend = _backends.get(using)
+    if backend is None:
+        connection = connections[using]
+        backend = BACKEND_NGRAM
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s",
+                               [TRIGRAM_INDEX_NAME.format(field=SEARCH_FIELDS[0])])
+                if cursor.fetchone():
+                    backend = BACKEND_PG_TRGM
+        _backends[using] = backend
+    return backend
+
+
+# -------------------- n-gram table maintenance --------------------
+def index_customers(rows, replace=True):
+    """Store the grams of `rows` — (customer_id, *SEARCH_FIELDS) tuples — replacing existing ones."""
+    rows = list(rows)
+    if not rows:
+        return 0
+    if replace:
+        CustomerSearchGram.objects.filter(customer_id__in=[row[0] for row in rows]).delete()
+    entries = [(gram, row[0]) for row in rows for gram in customer_grams(row[1:])]
+    insert_rows(CustomerSearchGram, ("gram", "customer"), entries)
+    return len(entries)
+
+
+def rebuild_index(batch_size=INDEX_BATCH_SIZE, progress=None):
+    """
+    Rebuild the n-gram table for every customer in one transaction (searches
+    keep using the old rows until it commits); returns (customers, grams).
+    """
+    customers = gram_count = 0
+    last_id = 0
+    with transaction.atomic():
+        CustomerSearchGram.objects.all().delete()
+        while True:
+            rows = list(
+                Customer.objects.filter(id__gt=last_id).order_by("id").values_list("id", *SEARCH_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            gram_count += index_customers(rows, replace=False)
+            customers += len(rows)
+            last_id = rows[-1][0]
+            if progress:
+                progress(customers, gram_count)
+    return customers, gram_count
+
+
+# -------------------- search --------------------
+def _text_q(query):
+    q = Q()
+    for field in SEARCH_FIELDS:
+        q |= Q(**{f"{field}__icontains": query})
+    return q
+
+
+def filter_customers(filters, query=None, queryset=None):
+    """Customer queryset for the search text and filters (no ordering / paging)."""
+    qs = Customer.objects.all() if queryset is None else queryset
+    if query:
+        if search_backend(qs.db) == BACKEND_NGRAM:
+            wanted = grams(query)
+            candidates = (
+                CustomerSearchGram.objects.filter(gram__in=wanted)
+                .values("customer_id")
+                .annotate(matched=Count("gram"))
+                .filter(matched=len(wanted))
+                .values("customer_id")
+            )
+            qs = qs.filter(id__in=candidates)
+        qs = qs.filter(_text_q(query))
+
+    if filters.get("city"):
+        qs = qs.filter(city__iexact=filters["city"])
+    if filters.get("pincode"):
+        qs = qs.filter(pincode__in=filters["pincode"])
+    if filters.get("employment_type"):
+        qs = qs.filter(employment_type__iexact=filters["employment_type"])
+    if filters.get("salary_min") is not None:
+        qs = qs.filter(salary__gte=filters["salary_min"])
+    if filters.get("salary_max") is not None:
+        qs = qs.filter(salary__lte=filters["salary_max"])
+    if filters.get("checked_from"):
+        qs = qs.filter(last_eligibility_check__gte=filters["checked_from"])
+    if filters.get("checked_to"):
+        qs = qs.filter(last_eligibility_check__lte=filters["checked_to"])
+    return qs
+
+
+def search_customers(filters, query=None, cursor=None, limit=20, queryset=None):
+    """(customers newest first, next cursor or None) for one keyset page."""
+    qs = filter_customers(filters, query, queryset)
+    if cursor:
+        qs = qs.filter(id__lt=cursor)
+    page = list(qs.order_by("-id")[:limit + 1])
+    if len(page) > limit:
+        return page[:limit], page[limit - 1].id
+    return page, None
@@ -0,0 +1,276 @@
+"""
+Customer deduplication.
+
+email, phone and PAN are each unique as stored. But "A@X.com " and
+"a@x.com", or "+91 98765 43210" and "9876543210", are the same person.
+Each such spelling becomes a separate Customer row, and interests end up
+split across them. Two customers are duplicates when they share any
+blocking key:
+
+    email  lower-cased, trimmed; gmail.com / googlemail.com also drop dots and "+tag"
+    phone  digits only, the last 10 (drops +91 / leading 0)
+    pan    upper-cased, alphanumerics only
+
+`find_clusters` makes one streaming pass over the customer table (ordered
+by id, CHUNK_SIZE rows at a time). It keeps only numpy arrays: each
+customer's id and a 64-bit hash per blocking key, at most 56 bytes per
+customer, with no Python objects per row. Sorting the hashes puts
+candidates next to each other. Union-find joins them, and then each
+cluster is checked again against the real keys, so a hash collision can
+never merge two customers.
+
+`merge_clusters` keeps the oldest customer of each cluster. Its empty
+profile fields are filled from the most recently checked duplicate.
+Every duplicate's CustomerInterest rows are re-pointed to the survivor
+with one CASE UPDATE per batch, and then the duplicates are deleted.
+Their eligibility results and search grams go with them. Each batch of
+clusters is its own transaction.
+"""
+import hashlib
+import re
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .models import Customer, CustomerInterest
+
+CHUNK_SIZE = 10000
+MERGE_BATCH_SIZE = 500   # clusters per transaction
+KEY_FIELDS = ("email", "phone", "pan")
+# Empty fields of the survivor filled from its duplicates (unique fields can't be copied)
+PROFILE_FIELDS = (
+    "full_name", "dob", "employment_type", "salary", "city", "pincode", "existing_loan", "annualIncome",
+    "departmentName", "designationName", "companyName", "designation", "company_id", "last_eligibility_check",
+)
+GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+
+_NON_DIGITS = re.compile(r"\D+")
+_NON_ALNUM = re.compile(r"[^0-9A-Z]+")
+
+
+# -------------------- blocking keys --------------------
+def normalize_email(value):
+    value = (value or "").strip().lower()
+    local, at, domain = value.partition("@")
+    if not at or not local or not domain:
+        return None
+    if domain in GMAIL_DOMAINS:
+        local = local.split("+", 1)[0].replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}"
+
+
+def normalize_phone(value):
+    digits = _NON_DIGITS.sub("", value or "")
+    return digits[-10:] if len(digits) >= 10 else None
+
+
+def normalize_pan(value):
+    value = _NON_ALNUM.sub("", (value or "").upper())
+    return value or None
+
+
+NORMALIZERS = {"email": normalize_email, "phone": normalize_phone, "pan": normalize_pan}
+
+
+def blocking_keys(row, keys=KEY_FIELDS):
+    """{field: normalized value} for a row with email / phone / pan attributes or items."""
+    get = row.get if isinstance(row, dict) else (lambda field: getattr(row, field))
+    out = {}
+    for field in keys:
+        value = NORMALIZERS[field](get(field))
+        if value:
+            out[field] = value
+    return out
+
+
+def _key_hash(field, value):
+    return int.from_bytes(hashlib.blake2b(f"{field}:{value}".encode(), digest_size=8).digest(), "little", signed=True)
+
+
+# -------------------- union-find --------------------
+class UnionFind:
+    """Union-find over dense indexes 0..n-1 (numpy parent array, path halving, union by size)."""
+
+    def __init__(self, size):
+        self.parent = np.arange(size, dtype=np.int64)
+        self.size = np.ones(size, dtype=np.int32)
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return int(node)
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+# -------------------- clustering --------------------
+def find_clusters(keys=KEY_FIELDS, chunk_size=CHUNK_SIZE, queryset=None, progress=None):
+    """
+    [[customer ids, ascending], ...] for every group of two or more customers
+    sharing a blocking key, found in one pass over the table.
+    """
+    qs = Customer.objects.all() if queryset is None else queryset
+    id_chunks, hash_chunks, index_chunks = [], [], []
+    seen = 0
+    rows = qs.order_by("id").values_list("id", *keys).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = [row for _, row in zip(range(chunk_size), rows)]
+        if not chunk:
+            break
+        hashes, indexes = [], []
+        for offset, row in enumerate(chunk):
+            for field, value in zip(keys, row[1:]):
+                value = NORMALIZERS[field](value)
+                if value:
+                    hashes.append(_key_hash(field, value))
+                    indexes.append(seen + offset)
+        id_chunks.append(np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk)))
+        hash_chunks.append(np.array(hashes, dtype=np.int64))
+        index_chunks.append(np.array(indexes, dtype=np.int64))
+        seen += len(chunk)
+        if progress:
+            progress(seen)
+    if not seen:
+        return []
+
+    ids = np.concatenate(id_chunks)
+    hashes = np.concatenate(hash_chunks)
+    indexes = np.concatenate(index_chunks)
+    order = np.argsort(hashes, kind="stable")
+    hashes, indexes = hashes[order], indexes[order]
+    same = np.flatnonzero(hashes[1:] == hashes[:-1])  # neighbours sharing a key hash
+
+    forest = UnionFind(len(ids))
+    for i in same:
+        forest.union(indexes[i], indexes[i + 1])
+    candidates = {}
+    for node in np.unique(np.concatenate([indexes[same], indexes[same + 1]])):
+        candidates.setdefault(forest.find(node), []).append(int(ids[node]))
+
+    return sorted(_verified(list(candidates.values()), keys, qs))
+
+
+def _verified(candidates, keys, qs, batch_size=CHUNK_SIZE):
+    """
+    Split hash-candidate clusters by the real normalized keys (guards against
+    hash collisions); members are loaded batch_size ids per query.
+    """
+    clusters, batch, batch_ids = [], [], 0
+    for members in candidates + [None]:
+        if members is None or (batch and batch_ids + len(members) > batch_size):
+            rows = {
+                row["id"]: row
+                for row in qs.filter(id__in=[cid for group in batch for cid in group]).values("id", *keys)
+            }
+            for group in batch:
+                clusters.extend(_split(sorted(cid for cid in group if cid in rows), rows, keys))
+            batch, batch_ids = [], 0
+        if members is not None:
+            batch.append(members)
+            batch_ids += len(members)
+    return clusters
+
+
+def _split(member_ids, rows, keys):
+    position = {cid: i for i, cid in enumerate(member_ids)}
+    forest = UnionFind(len(member_ids))
+    owner = {}
+    for cid in member_ids:
+        for field, value in blocking_keys(rows[cid], keys).items():
+            forest.union(position[owner.setdefault((field, value), cid)], position[cid])
+    groups = {}
+    for cid in member_ids:
+        groups.setdefault(forest.find(position[cid]), []).append(cid)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+# -------------------- merging --------------------
+def describe_clusters(clusters, keys=KEY_FIELDS):
+    """Dry-run view of clusters: members with their keys and interest counts, survivor first."""
+    ids = [cid for cluster in clusters for cid in cluster]
+    rows = {row["id"]: row for row in Customer.objects.filter(id__in=ids).values("id", "full_name", *keys)}
+    interests = dict(
+        CustomerInterest.objects.filter(customer_id__in=ids).order_by().values_list("customer_id")
+        .annotate(n=Count("id")).values_list("customer_id", "n")
+    )
+    return [
+        {
+            "survivor": cluster[0],
+            "customers": [dict(rows[cid], interests=interests.get(cid, 0)) for cid in cluster if cid in rows],
+        }
+        for cluster in clusters
+    ]
+
+
+def _merged_profile(survivor, duplicates):
+    """Survivor fields that are empty but set on a duplicate (most recently checked duplicate wins)."""
+    changes = {}
+    newest_first = sorted(duplicates, key=lambda c: (c.last_eligibility_check is not None, c.last_eligibility_check, c.id),
+                          reverse=True)
+    for field in PROFILE_FIELDS:
+        if getattr(survivor, field) in (None, ""):
+            for duplicate in newest_first:
+                value = getattr(duplicate, field)
+                if value not in (None, ""):
+                    changes[field] = value
+                    break
+    return changes
+
+
+def merge_clusters(clusters, batch_size=MERGE_BATCH_SIZE, progress=None):
+    """Merge each cluster into its lowest id; returns counts."""
+    summary = {"clusters": 0, "customers_removed": 0, "interests_repointed": 0}
+    for start in range(0, len(clusters), batch_size):
+        batch = clusters[start:start + batch_size]
+        with transaction.atomic():
+            _merge_batch(batch, summary)
+        if progress:
+            progress(min(start + batch_size, len(clusters)), len(clusters))
+    return summary
+
+
+def _merge_batch(clusters, summary):
+    ids = [cid for cluster in clusters for cid in cluster]
+    customers = Customer.objects.select_for_update().in_bulk(ids)
+    survivor_of = {}
+    updated = []
+    for cluster in clusters:
+        present = [cid for cid in cluster if cid in customers]  # merged / deleted since clustering
+        if len(present) < 2:
+            continue
+        survivor = customers[present[0]]
+        duplicates = [customers[cid] for cid in present[1:]]
+        changes = _merged_profile(survivor, duplicates)
+        if changes:
+            for field, value in changes.items():
+                setattr(survivor, field, value)
+            updated.append((survivor, [field.removesuffix("_id") for field in changes]))
+        for duplicate in duplicates:
+            survivor_of[duplicate.id] = survivor.id
+        summary["clusters"] += 1
+    if not survivor_of:
+        return
+
+    summary["interests_repointed"] += CustomerInterest.objects.filter(customer_id__in=survivor_of).update(
+        customer_id=Case(
+            *[When(customer_id=dup, then=Value(keep)) for dup, keep in survivor_of.items()],
+            output_field=IntegerField(),
+        )
+    )
+    # Duplicates go first: their unique fields no longer block anything the survivor keeps
+    Customer.objects.filter(id__in=survivor_of).delete()
+    summary["customers_removed"] += len(survivor_of)
+    for survivor, fields in updated:
+        survivor.save(update_fields=fields)
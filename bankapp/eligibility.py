@@ -0,0 +1,332 @@
+"""
+Eligibility engine over an in-memory catalog snapshot.
+
+The per-request loops in views.py used to run one query per bank, product
+and salary criteria. `CatalogSnapshot` loads banks, products, salary
+criteria and company categories once (5 queries) into plain dicts and
+tuples; eligibility for any number of applicants is then evaluated without
+touching the database.
+
+`get_snapshot()` keeps one snapshot per process and rebuilds it when the
+catalog version is bumped (signals.py / catalog_io, after the write
+commits) or after SNAPSHOT_MAX_AGE seconds, whichever comes first. The
+version lives in the BANKAPP_CATALOG_SNAPSHOT["CACHE"] alias, which must be
+shared by every worker. When that cache is process-local (local memory,
+dummy) a bump can't reach the other workers, so no snapshot is reused: each
+call loads a fresh one.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import Bank, Product, SalaryCriteria, Company, CompanyCategory
+
+UNLISTED_CATEGORY = "UNLISTED"
+
+DEFAULT_OPTIONS = {
+    "CACHE": "default",
+}
+CATALOG_VERSION_KEY = "bankapp:catalog_version"
+SNAPSHOT_MAX_AGE = 300  # seconds; safety net should a version bump be lost
+FRONTIER_CACHE_SIZE = 4096  # (category, pincode, age) frontiers kept per snapshot
+
+# Compact ineligibility reason codes; text is only built for reasons that are returned
+REASON_PINCODE = "pincode_not_served"
+REASON_AGE = "age_out_of_range"
+REASON_NO_CRITERIA = "no_salary_criteria"
+REASON_SALARY = "salary_below_minimum"
+
+BankInfo = namedtuple("BankInfo", ["id", "bank_name", "pincodes"])
+ProductInfo = namedtuple("ProductInfo", [
+    "id", "bank_id", "product_title",
+    "min_age", "max_age", "min_tenure", "max_tenure",
+    "min_loan_amount", "max_loan_amount", "min_roi", "max_roi",
+    "foir_details", "foir_percent", "obligation_handling",
+])
+_FLOAT_PRODUCT_FIELDS = [ProductInfo._fields.index(f) for f in ("min_loan_amount", "max_loan_amount", "foir_percent")]
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "BANKAPP_CATALOG_SNAPSHOT", {}))
+    return options
+
+
+def is_process_local(cache):
+    """True for cache backends that other worker processes can't see."""
+    return isinstance(cache, (LocMemCache, DummyCache))
+
+
+def calculate_age(dob, today=None):
+    if not dob:
+        return None
+    today = today or date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+class CatalogSnapshot:
+    """Immutable, picklable view of the catalog used for eligibility checks."""
+
+    def __init__(self, banks, products, criteria, company_categories, category_names, unlisted_category_id):
+        self.banks = banks                                # [BankInfo] in id order
+        self.bank_by_id = {b.id: b for b in banks}
+        self.products = products                          # [ProductInfo] in (bank, id) order
+        self.product_by_id = {p.id: p for p in products}
+        self.products_by_bank = {}
+        for product in products:
+            self.products_by_bank.setdefault(product.bank_id, []).append(product)
+        self.criteria = criteria                          # {(product_id, category_id): [min_salary, ...]}
+        self.criteria_by_product = {}                     # {product_id: {category_id: [min_salary, ...]}}
+        for (product_id, category_id), salaries in criteria.items():
+            self.criteria_by_product.setdefault(product_id, {})[category_id] = salaries
+        self.company_categories = company_categories      # {lower(company_name): category_id}
+        self.category_names = category_names              # {category_id: category_name}
+        self.category_by_name = {name.strip().lower(): pk for pk, name in category_names.items()}
+        self.unlisted_category_id = unlisted_category_id
+
+        self.banks_by_pincode = {}
+        for bank in banks:
+            for pin in bank.pincodes:
+                self.banks_by_pincode.setdefault(pin, []).append(bank)
+
+        # Built on first use — recomputation workers never need them
+        self._category_thresholds = None
+        self._frontiers = {}
+
+    @classmethod
+    def load(cls):
+        unlisted, _ = CompanyCategory.objects.get_or_create(category_name=UNLISTED_CATEGORY)
+
+        banks = [
+            BankInfo(pk, name, frozenset(p.strip() for p in pincode.split(",")) if pincode else frozenset())
+            for pk, name, pincode in Bank.objects.order_by("id").values_list("id", "bank_name", "pincode")
+        ]
+
+        products = []
+        for row in Product.objects.order_by("bank_id", "id").values_list(*ProductInfo._fields):
+            row = list(row)
+            for i in _FLOAT_PRODUCT_FIELDS:  # Decimal → float once, not per applicant
+                if row[i] is not None:
+                    row[i] = float(row[i])
+            products.append(ProductInfo(*row))
+
+        criteria = {}
+        for product_id, category_id, min_salary in (
+            SalaryCriteria.objects.order_by("salary_id").values_list("product_id", "category_id", "min_salary")
+        ):
+            criteria.setdefault((product_id, category_id), []).append(float(min_salary))
+
+        company_categories = {}
+        for name, category_id in Company.objects.order_by("company_id").values_list("company_name", "category_id"):
+            company_categories.setdefault(name.strip().lower(), category_id)
+
+        category_names = dict(CompanyCategory.objects.values_list("category_id", "category_name"))
+
+        return cls(banks, products, criteria, company_categories, category_names, unlisted.category_id)
+
+    # -------------------- lookups --------------------
+    def resolve_category(self, company_name):
+        """Company name → category_id (UNLISTED when unknown), like Company.objects.filter(company_name__iexact=...)"""
+        if company_name:
+            category_id = self.company_categories.get(company_name.strip().lower())
+            if category_id is not None:
+                return category_id
+        return self.unlisted_category_id
+
+    def category_name(self, category_id):
+        return self.category_names.get(category_id, UNLISTED_CATEGORY)
+
+    def category_id(self, name):
+        """Category name (any case, `CAT_A` or `CAT A`) → category_id, or None."""
+        return self.category_by_name.get(str(name).replace("_", " ").strip().lower())
+
+    def product_thresholds(self, product_id):
+        """{category_id: lowest min_salary} — any criteria of the category qualifies."""
+        return {cat: min(salaries) for cat, salaries in self.criteria_by_product.get(product_id, {}).items()}
+
+    def banks_serving(self, pincode):
+        return self.banks_by_pincode.get(pincode, [])
+
+    @staticmethod
+    def age_allows(product, age):
+        """Products without a full age range accept any age."""
+        if product.min_age and product.max_age:
+            return age is not None and product.min_age <= age <= product.max_age
+        return True
+
+    # -------------------- evaluation --------------------
+    def eligible_products(self, age, pincode, category_id, salary):
+        """
+        Yield (product, matched_min_salary) for every product the applicant
+        qualifies for — same rules as the original view loops:
+        bank serves the pincode, age within the product range (when set),
+        and salary ≥ a salary criteria of the applicant's company category.
+        """
+        salary = float(salary or 0)
+        criteria = self.criteria
+        for bank in self.banks_serving(pincode):
+            for product in self.products_by_bank.get(bank.id, ()):
+                if not self.age_allows(product, age):
+                    continue
+                for min_salary in criteria.get((product.id, category_id), ()):
+                    if salary >= min_salary:
+                        yield product, min_salary
+                        break
+
+    def ineligibility_reasons(self, age, pincode, category_id, salary):
+        """
+        Lazily yield (code, bank, product) for every bank / product the applicant
+        does not qualify for, in the order the original loop reported them.
+        Consumers take only what they return (see describe_reason).
+        """
+        salary = float(salary or 0)
+        served = {bank.id for bank in self.banks_serving(pincode)}
+        for bank in self.banks:
+            if bank.id not in served:
+                yield REASON_PINCODE, bank, None
+                continue
+            for product in self.products_by_bank.get(bank.id, ()):
+                if not self.age_allows(product, age):
+                    yield REASON_AGE, bank, product
+                    continue
+                salaries = self.criteria.get((product.id, category_id))
+                if not salaries:
+                    yield REASON_NO_CRITERIA, bank, product
+                elif not any(salary >= min_salary for min_salary in salaries):
+                    yield REASON_SALARY, bank, product
+
+    def describe_reason(self, reason, age, category_id):
+        """Human-readable dict for one (code, bank, product) reason."""
+        code, bank, product = reason
+        if code == REASON_PINCODE:
+            return {"bank_name": bank.bank_name,
+                    "reason": "Bank not available in your area (pincode not served)", "code": code}
+
+        if code == REASON_AGE:
+            text = f"Age {age} not in range {product.min_age}-{product.max_age}"
+        elif code == REASON_NO_CRITERIA:
+            text = f"No salary criteria defined for category '{self.category_name(category_id)}'"
+        else:
+            min_required = self.criteria[(product.id, category_id)][0]
+            text = f"Salary below minimum ₹{min_required:,.0f} for {self.category_name(category_id)}"
+        return {"bank_name": bank.bank_name, "product": product.product_title, "reason": text, "code": code}
+
+    # -------------------- salary frontier --------------------
+    def category_thresholds(self, category_id):
+        """
+        (thresholds, products) for one category: every product's lowest
+        min_salary for the category, sorted ascending (ties by bank, product id).
+        """
+        if self._category_thresholds is None:
+            by_category = {}
+            for product_id, per_category in self.criteria_by_product.items():
+                product = self.product_by_id.get(product_id)
+                if product is None:
+                    continue
+                for cat, salaries in per_category.items():
+                    by_category.setdefault(cat, []).append((min(salaries), product.bank_id, product.id, product))
+            self._category_thresholds = {}
+            for cat, rows in by_category.items():
+                rows.sort(key=lambda row: row[:3])
+                self._category_thresholds[cat] = ([row[0] for row in rows], [row[3] for row in rows])
+        return self._category_thresholds.get(category_id, ([], []))
+
+    def salary_frontier(self, category_id, pincode, age):
+        """
+        (thresholds, products) for the products an applicant could get apart
+        from salary (bank serves the pincode, age in range), ascending by
+        threshold. Eligible products for a salary are `products[:bisect_right(thresholds, salary)]`.
+        """
+        key = (category_id, pincode, age)
+        frontier = self._frontiers.get(key)
+        if frontier is None:
+            served = {bank.id for bank in self.banks_serving(pincode)}
+            thresholds, products = [], []
+            for threshold, product in zip(*self.category_thresholds(category_id)):
+                if product.bank_id in served and self.age_allows(product, age):
+                    thresholds.append(threshold)
+                    products.append(product)
+            if len(self._frontiers) >= FRONTIER_CACHE_SIZE:
+                self._frontiers.clear()
+            frontier = self._frontiers[key] = (thresholds, products)
+        return frontier
+
+    def next_unlocks(self, category_id, pincode, age, salary, steps=3):
+        """
+        (eligible products, [(threshold, [products unlocked at it]), ...]) for
+        the next `steps` distinct thresholds above `salary`.
+        """
+        thresholds, products = self.salary_frontier(category_id, pincode, age)
+        eligible_end = position = bisect_right(thresholds, float(salary or 0))
+        unlocks = []
+        while position < len(thresholds) and len(unlocks) < steps:
+            end = bisect_right(thresholds, thresholds[position], lo=position)
+            unlocks.append((thresholds[position], products[position:end]))
+            position = end
+        return products[:eligible_end], unlocks
+
+
+# -------------------- process-level cache --------------------
+_snapshot = None
+_snapshot_version = None
+_snapshot_loaded_at = 0.0
+_snapshot_lock = threading.Lock()
+
+
+def bump_catalog_version():
+    """
+    Invalidate every process's snapshot. Call once catalog writes have
+    committed (transaction.on_commit): bumped earlier, a concurrent reload
+    could cache the old catalog under the new version.
+    """
+    # A fresh token rather than incr(): two bumps racing on a non-atomic incr could leave one unseen
+    caches[get_options()["CACHE"]].set(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    global _snapshot
+    _snapshot = None
+
+
+def _is_current(snapshot, version):
+    return (
+        snapshot is not None
+        and version == _snapshot_version
+        and time.monotonic() - _snapshot_loaded_at < SNAPSHOT_MAX_AGE
+    )
+
+
+def get_snapshot(refresh=False):
+    """
+    This process's current snapshot. refresh=True reloads it: for callers that
+    found, in the database, a catalog row the snapshot doesn't have.
+    """
+    global _snapshot, _snapshot_version, _snapshot_loaded_at
+    cache = caches[get_options()["CACHE"]]
+    if is_process_local(cache):
+        return CatalogSnapshot.load()
+    version = cache.get(CATALOG_VERSION_KEY, 0)
+    snapshot = _snapshot
+    if not refresh and _is_current(snapshot, version):
+        return snapshot
+    with _snapshot_lock:
+        # Another thread may have reloaded it meanwhile
+        if (refresh and _snapshot is snapshot) or not _is_current(_snapshot, version):
+            _snapshot = CatalogSnapshot.load()
+            _snapshot_version = version
+            _snapshot_loaded_at = time.monotonic()
+        return _snapshot
+
+
+def peek_snapshot():
+    """This process's snapshot if it is loaded and current, else None — never loads one."""
+    cache = caches[get_options()["CACHE"]]
+    if is_process_local(cache):
+        return None
+    snapshot = _snapshot
+    return snapshot if _is_current(snapshot, cache.get(CATALOG_VERSION_KEY, 0)) else None
@@ -0,0 +1,151 @@
+"""
+Serializer-free read path for the large list endpoints.
+
+Rows are built straight from `.values_list()` tuples. Column converters are
+taken once from the matching serializer's own fields, so the JSON produced
+here is identical to `XSerializer(qs, many=True).data` without paying for a
+serializer walk per row.
+"""
+from functools import lru_cache
+
+from rest_framework import serializers as drf_fields
+
+from .media_urls import image_url, image_srcset
+from .models import Bank, SalaryCriteria
+from .serializers import ProductSerializer, SalaryCriteriaSerializer
+
+# Fields whose to_representation is a no-op for the python values the DB hands back
+_PASSTHROUGH_FIELDS = (
+    drf_fields.IntegerField,
+    drf_fields.CharField,
+    drf_fields.FloatField,
+    drf_fields.PrimaryKeyRelatedField,
+)
+
+
+def _column_mapper(field):
+    """
+    Converter equivalent to what Serializer.to_representation does for one
+    field: None stays None, everything else goes through the field.
+    Returns None when the raw value can be used as is.
+    """
+    if isinstance(field, _PASSTHROUGH_FIELDS):
+        return None
+    to_representation = field.to_representation
+
+    def mapper(value):
+        return None if value is None else to_representation(value)
+    return mapper
+
+
+def _cloudinary_mapper(model_field):
+    # ModelField → CloudinaryField.value_to_string → get_prep_value()
+    get_prep_value = model_field.get_prep_value
+
+    def mapper(value):
+        return None if value is None else get_prep_value(value)
+    return mapper
+
+
+@lru_cache(maxsize=None)
+def _mappers(serializer_class):
+    return {name: _column_mapper(field) for name, field in serializer_class().fields.items()}
+
+
+def _build(rows, names, mappers):
+    """Zip value tuples into dicts, applying only the converters that do work."""
+    active = [(i, mappers[name]) for i, name in enumerate(names) if mappers.get(name)]
+    out = []
+    append = out.append
+    for row in rows:
+        if active:
+            row = list(row)
+            for i, mapper in active:
+                row[i] = mapper(row[i])
+        append(dict(zip(names, row)))
+    return out
+
+
+def bank_rows(queryset):
+    """Equivalent of BankSerializer(queryset, many=True).data"""
+    image_repr = _cloudinary_mapper(Bank._meta.get_field("bank_image"))
+    out = []
+    for pk, bank_name, pincode, image in queryset.values_list("id", "bank_name", "pincode", "bank_image"):
+        out.append({
+            "id": pk,
+            "bank_name": bank_name,
+            "pincode": [p.strip() for p in pincode.split(",") if p.strip()] if pincode else [],
+            "bank_image": image_repr(image),
+            "bank_image_url": image_url(image),
+            "bank_image_thumb_url": image_url(image, "thumb"),
+            "bank_image_srcset": image_srcset(image),
+        })
+    return out
+
+
+SALARY_CRITERIA_COLUMNS = (
+    ("salary_id", "salary_id"),
+    ("product", "product_id"),
+    ("product_name", "product__product_title"),
+    ("category", "category_id"),
+    ("category_name", "category__category_name"),
+    ("min_salary", "min_salary"),
+)
+
+
+def salary_criteria_rows(queryset):
+    """Equivalent of SalaryCriteriaSerializer(queryset, many=True).data"""
+    names = [name for name, _ in SALARY_CRITERIA_COLUMNS]
+    lookups = [lookup for _, lookup in SALARY_CRITERIA_COLUMNS]
+    return _build(queryset.values_list(*lookups), names, _mappers(SalaryCriteriaSerializer))
+
+
+PRODUCT_COLUMNS = (
+    ("id", "id"),
+    ("bank", "bank_id"),
+    ("product_title", "product_title"),
+    ("min_age", "min_age"),
+    ("max_age", "max_age"),
+    ("min_tenure", "min_tenure"),
+    ("max_tenure", "max_tenure"),
+    ("min_loan_amount", "min_loan_amount"),
+    ("max_loan_amount", "max_loan_amount"),
+    ("min_roi", "min_roi"),
+    ("max_roi", "max_roi"),
+    ("foir_details", "foir_details"),
+    ("foir_percent", "foir_percent"),
+    ("obligation_handling", "obligation_handling"),
+)
+
+
+def product_rows(queryset):
+    """Equivalent of ProductSerializer(queryset, many=True).data (2 queries)"""
+    names = [name for name, _ in PRODUCT_COLUMNS]
+    lookups = [lookup for _, lookup in PRODUCT_COLUMNS]
+    products = _build(queryset.values_list(*lookups), names, _mappers(ProductSerializer))
+    if not products:
+        return products
+
+    # Same ordering as ProductSerializer.setup_eager_loading's prefetch
+    criteria = salary_criteria_rows(
+        SalaryCriteria.objects.filter(product__in=queryset.values("pk")).order_by("salary_id")
+    )
+    by_product = {}
+    for row in criteria:
+        by_product.setdefault(row["product"], []).append(row)
+    for product in products:
+        product["salary_criteria"] = by_product.get(product["id"], [])
+    return products
+
+
+def company_rows(queryset):
+    """Equivalent of CompanySerializer(queryset, many=True).data"""
+    rows = queryset.values_list("company_id", "company_name", "category__category_id", "category__category_name")
+    return [
+        {
+            "company_id": company_id,
+            "company_name": company_name,
+            "category": {"category_id": category_id, "category_name": category_name} if category_id is not None else None,
+        }
+        for company_id, company_name, category_id, category_name in rows
+    ]
@@ -0,0 +1,158 @@
+"""
+Eligibility → interest conversion funnel.
+
+DailyFunnelStat keeps one row of counters per day × bank × product ×
+company category × pincode region, incremented as events happen (one
+upsert statement per event or batch, see fast_writes.increment_rows):
+
+    eligible            an eligibility check found the product eligible
+                        (record_check, called from the eligibility view)
+    interests           a CustomerInterest was created (record_interests,
+                        called in the insert's transaction, direct or buffered)
+    eligible_interests  ... by a customer the catalog snapshot finds eligible
+                        for that product (for the bank, when no product was chosen)
+
+Counts are events, not distinct customers: a customer who checks twice is
+counted twice. Reports (`funnel_report`) sum these rows over a date range,
+so they read O(days × products) rows and never the customer or interest
+tables. Counting starts when this table is deployed.
+
+Settings (BANKAPP_FUNNEL): REGION_DIGITS — leading pincode digits forming a
+region (1 = postal zone, 2 = sub-zone, 3 = sorting district).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .eligibility import calculate_age, get_snapshot
+from .fast_writes import increment_rows
+from .models import Customer, DailyFunnelStat
+
+DEFAULT_OPTIONS = {
+    "REGION_DIGITS": 3,
+}
+KEY_FIELDS = ("day", "bank", "product", "category", "region")
+COUNT_FIELDS = ("eligible", "interests", "eligible_interests")
+# Must match the expressions of the funnel_stat_unique index
+CONFLICT_TARGET = '"day", "bank_id", COALESCE("product_id", 0), COALESCE("category_id", 0), "region"'
+
+# group_by dimension → (grouping columns, labels joined in)
+DIMENSIONS = {
+    "day": (("day",), {}),
+    "bank": (("bank_id",), {"bank_name": F("bank__bank_name")}),
+    "product": (("product_id",), {"product_title": F("product__product_title")}),
+    "category": (("category_id",), {"category_name": F("category__category_name")}),
+    "region": (("region",), {}),
+}
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "BANKAPP_FUNNEL", {}))
+    return options
+
+
+def region_of(pincode, digits=None):
+    digits = digits or get_options()["REGION_DIGITS"]
+    prefix = str(pincode or "").strip()[:digits]
+    return prefix if len(prefix) == digits and prefix.isdigit() else ""
+
+
+def increment_stats(rows):
+    """rows: (day, bank_id, product_id, category_id, region, eligible, interests, eligible_interests)."""
+    adapt = connection.ops.adapt_datefield_value
+    increment_rows(DailyFunnelStat, KEY_FIELDS, COUNT_FIELDS, [(adapt(row[0]), *row[1:]) for row in rows], CONFLICT_TARGET)
+
+
+# -------------------- recording --------------------
+def record_check(products, category_id, pincode, day=None):
+    """One eligibility check that found `products` eligible."""
+    day = day or timezone.localdate()
+    region = region_of(pincode)
+    increment_stats([(day, p.bank_id, p.id, category_id, region, 1, 0, 0) for p in products])
+
+
+def record_interests(interests, customers=None, snapshot=None):
+    """
+    interests: (customer_id, bank_id, product_id, created_at) of new rows.
+    customers: optional {customer_id: (dob, salary, pincode, companyName)} the
+    caller already fetched; otherwise they are loaded with one query.
+    snapshot: the catalog snapshot the caller already holds, if any.
+    """
+    if not interests:
+        return
+    if customers is None:
+        customers = {
+            row[0]: row[1:]
+            for row in Customer.objects.filter(id__in={i[0] for i in interests})
+            .values_list("id", "dob", "salary", "pincode", "companyName")
+        }
+    snapshot = snapshot or get_snapshot()
+    today = timezone.localdate()
+    region_digits = get_options()["REGION_DIGITS"]
+
+    profiles = {}  # customer_id → (category_id, region, eligible product ids, eligible bank ids)
+    rows = []
+    for customer_id, bank_id, product_id, created_at in interests:
+        profile = profiles.get(customer_id)
+        if profile is None:
+            dob, salary, pincode, company_name = customers.get(customer_id, (None, None, None, None))
+            category_id = snapshot.resolve_category(company_name)
+            eligible = list(snapshot.eligible_products(calculate_age(dob, today), pincode, category_id, salary))
+            profile = profiles[customer_id] = (
+                category_id, region_of(pincode, region_digits),
+                {p.id for p, _ in eligible}, {p.bank_id for p, _ in eligible},
+            )
+        category_id, region, product_ids, bank_ids = profile
+        was_eligible = product_id in product_ids if product_id is not None else bank_id in bank_ids
+        day = timezone.localdate(created_at) if created_at else today
+        rows.append((day, bank_id, product_id, category_id, region, 0, 1, int(was_eligible)))
+    increment_stats(rows)
+
+
+# -------------------- reporting --------------------
+def funnel_report(date_from, date_to, group_by=("bank",), bank_ids=None, product_ids=None,
+                  category_id=None, region=None):
+    """Summed counters per `group_by` combination, with conversion = eligible_interests / eligible."""
+    qs = DailyFunnelStat.objects.filter(day__gte=date_from, day__lte=date_to)
+    if bank_ids:
+        qs = qs.filter(bank_id__in=bank_ids)
+    if product_ids:
+        qs = qs.filter(product_id__in=product_ids)
+    if category_id is not None:
+        qs = qs.filter(category_id=category_id)
+    if region:
+        qs = qs.filter(region__startswith=region)
+
+    columns, labels = [], {}
+    for dimension in group_by:
+        columns.extend(DIMENSIONS[dimension][0])
+        labels.update(DIMENSIONS[dimension][1])
+    rows = (
+        qs.order_by().values(*columns, **labels)
+        .annotate(**{field: Sum(field) for field in COUNT_FIELDS})
+        .order_by(*columns)
+    )
+    report = []
+    totals = dict.fromkeys(COUNT_FIELDS, 0)
+    for row in rows:
+        for field in COUNT_FIELDS:
+            totals[field] += row[field]
+        report.append(_with_rates(row))
+    return report, _with_rates(totals)
+
+
+def _with_rates(row):
+    row["conversion"] = round(row["eligible_interests"] / row["eligible"], 4) if row["eligible"] else None
+    row["eligible_share_of_interests"] = (
+        round(row["eligible_interests"] / row["interests"], 4) if row["interests"] else None
+    )
+    return row
+
+
+def default_range(days=30):
+    today = timezone.localdate()
+    return today - timedelta(days=days - 1), today
@@ -0,0 +1,165 @@
+"""
+Idempotency-Key handling for POST endpoints.
+
+A client that retries a POST sends the same `Idempotency-Key` header. The
+first request with a key claims it in the cache (`cache.add`, atomic on
+every shared backend) and runs the view; its response (status + data) is
+stored under the key for TTL seconds. Later requests with the key:
+
+- same request, first one finished  → the stored response is replayed
+                                       (header `Idempotent-Replayed: true`)
+                                       without running the view again;
+- same request, first one in flight → waits up to WAIT seconds for it to
+                                       finish and replays it, else 409 with
+                                       Retry-After;
+- different method / path / body    → 422, a key is bound to one request.
+
+5xx responses and exceptions release the key so the retry runs again.
+While the view runs, its claim is refreshed every LOCK_TIMEOUT / 3 seconds,
+so a slow request keeps it however long it takes; only a crashed worker
+stops refreshing and lets the claim expire. Throttles can call
+`is_replay()` so that a replayed response doesn't count against a limit.
+
+Settings (BANKAPP_IDEMPOTENCY): CACHE (alias — must be shared between
+workers in production), TTL, LOCK_TIMEOUT (how long an in-flight claim
+survives a crashed worker), WAIT, POLL_INTERVAL (seconds).
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULTS = {
+    "CACHE": "default",
+    "TTL": 24 * 3600,
+    "LOCK_TIMEOUT": 60,
+    "WAIT": 10,
+    "POLL_INTERVAL": 0.05,
+}
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+KEY_PREFIX = "idempotency"
+
+_IN_FLIGHT = "in_flight"
+_DONE = "done"
+
+
+def get_options():
+    options = dict(DEFAULTS)
+    options.update(getattr(settings, "BANKAPP_IDEMPOTENCY", {}))
+    return options
+
+
+def request_fingerprint(request):
+    """Hash of method, path (with query string) and body."""
+    body = request.data
+    if hasattr(body, "lists"):  # QueryDict: keep repeated keys
+        body = {key: values for key, values in body.lists()}
+    payload = json.dumps([request.method, request.get_full_path(), body], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cache_key(scope, key):
+    return f"{KEY_PREFIX}:{scope}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def is_replay(request, scope):
+    """True when this POST's Idempotency-Key already has a stored response for the same request."""
+    key = request.headers.get(HEADER)
+    if request.method != "POST" or not key or len(key) > MAX_KEY_LENGTH:
+        return False
+    record = caches[get_options()["CACHE"]].get(_cache_key(scope, key))
+    return bool(record) and record["state"] == _DONE and record["fingerprint"] == request_fingerprint(request)
+
+
+def _error(message, http_status, **headers):
+    return Response({"status": "error", "message": message}, status=http_status, headers=headers or None)
+
+
+def idempotent(scope):
+    """
+    Decorator for DRF function views (apply below @api_view). Only POST
+    requests carrying an Idempotency-Key are affected.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if request.method != "POST" or not key:
+                return view(request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return _error(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters", status.HTTP_400_BAD_REQUEST)
+
+            options = get_options()
+            cache = caches[options["CACHE"]]
+            cache_key = _cache_key(scope, key)
+            fingerprint = request_fingerprint(request)
+            deadline = time.monotonic() + options["WAIT"]
+
+            while True:
+                claim = {"state": _IN_FLIGHT, "fingerprint": fingerprint}
+                if cache.add(cache_key, claim, timeout=options["LOCK_TIMEOUT"]):
+                    return _run(view, request, args, kwargs, cache, cache_key, fingerprint, options)
+                record = cache.get(cache_key)
+                if record is None:
+                    continue  # released (failed) or expired since add(): claim it
+                if record["fingerprint"] != fingerprint:
+                    return _error(f"{HEADER} was already used for a different request",
+                                  status.HTTP_422_UNPROCESSABLE_ENTITY)
+                if record["state"] == _DONE:
+                    return Response(record["data"], status=record["status"], headers={"Idempotent-Replayed": "true"})
+                if time.monotonic() >= deadline:
+                    return _error("A request with this Idempotency-Key is still being processed",
+                                  status.HTTP_409_CONFLICT, **{"Retry-After": "1"})
+                time.sleep(options["POLL_INTERVAL"])
+        return wrapper
+    return decorator
+
+
+class ClaimRefresher(threading.Thread):
+    """Keeps an in-flight claim from expiring while its view is still running."""
+
+    def __init__(self, cache, cache_key, timeout):
+        super().__init__(name="idempotency-claim", daemon=True)
+        self.cache = cache
+        self.cache_key = cache_key
+        self.timeout = timeout
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.timeout / 3):
+                self.cache.touch(self.cache_key, self.timeout)
+        finally:
+            connections.close_all()  # this thread's connections (database cache)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def _run(view, request, args, kwargs, cache, cache_key, fingerprint, options):
+    """Run the view for a claimed key and store its response (5xx / exceptions release the key)."""
+    refresher = ClaimRefresher(cache, cache_key, options["LOCK_TIMEOUT"])
+    refresher.start()
+    try:
+        response = view(request, *args, **kwargs)
+    except BaseException:
+        cache.delete(cache_key)
+        raise
+    finally:
+        refresher.stop()  # before the response is stored: a late touch() would cut its TTL
+    if isinstance(response, Response) and response.status_code < 500:
+        cache.set(cache_key, {
+            "state": _DONE, "fingerprint": fingerprint, "status": response.status_code, "data": response.data,
+        }, timeout=options["TTL"])
+    else:
+        cache.delete(cache_key)
+    return response
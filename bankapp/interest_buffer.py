@@ -0,0 +1,343 @@
+"""
+Write-behind ingestion of CustomerInterest rows.
+
+In buffered mode (`POST customer-interests/?buffered=true`, or MODE
+"buffered") the request is validated against the cached catalog snapshot
+(bank exists, product belongs to it), appended to an in-process buffer and
+answered with 202 Accepted. A flusher thread writes the buffer with one
+`bulk_create` whenever MAX_ROWS rows are waiting or the oldest has waited
+MAX_DELAY_MS; customer ids are checked for the whole batch with a single
+query, rows for unknown customers are dropped and logged. Should the
+insert still hit a foreign key (a row deleted meanwhile, a stale catalog
+snapshot), the batch is checked against the database and written without
+the offending rows.
+
+Nothing accepted is lost on the way:
+- a flush that fails (database down) spools its rows to SPOOL_DIR;
+- more than MAX_PENDING waiting rows spool new ones straight to disk;
+- at interpreter exit the buffer is flushed, or spooled if that fails.
+Spool files (JSON lines) are claimed by rename and replayed by the flusher
+when it starts and after every successful flush; replayed rows keep the
+time they were accepted as created_at. A file claimed by a process that
+died mid-replay (`*.jsonl.<pid>.replaying`, pid no longer running) is
+claimed again. If spooling itself fails, the rows go back into the buffer
+for the next flush, and a flusher thread that died is restarted on the next
+add().
+
+Settings (BANKAPP_INTEREST_BUFFER):
+    MODE          "direct" (default) or "buffered" for every POST
+    MAX_ROWS      rows per flush
+    MAX_DELAY_MS  longest a row waits in memory
+    MAX_PENDING   rows held in memory before spooling to disk
+    SPOOL_DIR     directory for spooled rows
+    AUTO_FLUSH    run the flusher thread (tests flush by hand)
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .eligibility import get_snapshot
+from .funnel import record_interests
+from .lead_outbox import record_leads
+from .live_feed import publish_interests
+from .models import Bank, Customer, CustomerInterest, Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    "MODE": "direct",
+    "MAX_ROWS": 500,
+    "MAX_DELAY_MS": 200,
+    "MAX_PENDING": 50000,
+    "SPOOL_DIR": os.path.join(str(settings.BASE_DIR), "interest_spool"),
+    "AUTO_FLUSH": True,
+}
+# Rows written this long after they were accepted get their created_at restored
+LATE_WRITE = timedelta(seconds=1)
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "BANKAPP_INTEREST_BUFFER", {}))
+    return options
+
+
+def validate_interest(snapshot, bank_id, product_id):
+    """Error message, or None when the bank / product pair exists in the catalog snapshot."""
+    if bank_id not in snapshot.bank_by_id:
+        return f"Bank {bank_id} does not exist"
+    if product_id is not None:
+        product = snapshot.product_by_id.get(product_id)
+        if product is None:
+            return f"Product {product_id} does not exist"
+        if product.bank_id != bank_id:
+            return f"Product {product_id} does not belong to bank {bank_id}"
+    return None
+
+
+def rows_in_database(rows):
+    """The rows whose customer, bank and product (belonging to that bank) exist in the database."""
+    customers = set(Customer.objects.filter(id__in={r[0] for r in rows}).values_list("id", flat=True))
+    banks = set(Bank.objects.filter(id__in={r[1] for r in rows}).values_list("id", flat=True))
+    products = dict(
+        Product.objects.filter(id__in={r[2] for r in rows if r[2] is not None}).values_list("id", "bank_id")
+    )
+    return [r for r in rows if r[0] in customers and r[1] in banks and (r[2] is None or products.get(r[2]) == r[1])]
+
+
+class InterestBuffer:
+    """Thread-safe buffer of (customer_id, bank_id, product_id, accepted_at) rows."""
+
+    def __init__(self, options=None):
+        self.options = options or get_options()
+        self._rows = []
+        self._oldest = None              # monotonic time of the oldest buffered row
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+        self.stats = {"accepted": 0, "written": 0, "dropped": 0, "spooled": 0, "flushes": 0}
+
+    # -------------------- intake --------------------
+    def add(self, customer_id, bank_id, product_id=None):
+        """Queue one interest; returns its accepted_at."""
+        accepted_at = timezone.now()
+        row = (customer_id, bank_id, product_id, accepted_at)
+        with self._lock:
+            self.stats["accepted"] += 1
+            if len(self._rows) >= self.options["MAX_PENDING"]:
+                overflow = True
+            else:
+                overflow = False
+                if not self._rows:
+                    self._oldest = time.monotonic()
+                self._rows.append(row)
+                if len(self._rows) == 1 or len(self._rows) >= self.options["MAX_ROWS"]:
+                    self._wakeup.notify()  # start the MAX_DELAY_MS clock / flush a full batch
+        if overflow:
+            self._spool([row])
+        elif self.options["AUTO_FLUSH"]:
+            self._ensure_thread()
+        return accepted_at
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows)
+
+    # -------------------- flushing --------------------
+    def _take(self):
+        size = self.options["MAX_ROWS"]
+        with self._lock:
+            rows, self._rows = self._rows[:size], self._rows[size:]
+            self._oldest = time.monotonic() if self._rows else None
+            return rows
+
+    def _put_back(self, rows):
+        with self._lock:
+            self._rows[:0] = rows
+            self._oldest = time.monotonic()  # retried after MAX_DELAY_MS, not in a tight loop
+
+    def flush(self):
+        """Write everything buffered now; returns rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = self._take()
+                if not rows:
+                    return written
+                try:
+                    written += self._write(rows)
+                except Exception:
+                    logger.exception("Interest flush of %s rows failed; spooling them", len(rows))
+                    try:
+                        self._spool(rows)
+                    except Exception:
+                        logger.exception("Spooling %s interests failed; keeping them buffered", len(rows))
+                        self._put_back(rows)
+                        return written
+
+    def _write(self, rows):
+        # Customers checked per batch; bank / product again in case the catalog changed since intake
+        snapshot = get_snapshot()
+        known = {
+            row[0]: row[1:]  # the funnel's eligibility inputs
+            for row in Customer.objects.filter(id__in={r[0] for r in rows})
+            .values_list("id", "dob", "salary", "pincode", "companyName")
+        }
+        valid, rejected = [], []
+        for row in rows:
+            if row[0] in known:
+                (valid if validate_interest(snapshot, row[1], row[2]) is None else rejected).append(row)
+        if rejected:
+            valid += rows_in_database(rejected)  # the snapshot may predate their bank / product
+        self._drop(len(rows) - len(valid))
+        try:
+            self._insert(valid, known, snapshot)
+        except IntegrityError:
+            # A customer / bank / product deleted since the checks above, or newer than the
+            # snapshot knows: check the batch against the database so one row can't block the rest
+            checked = rows_in_database(valid)
+            if len(checked) == len(valid):
+                raise
+            self._drop(len(valid) - len(checked))
+            valid = checked
+            self._insert(valid, known, snapshot)
+        self.stats["written"] += len(valid)
+        self.stats["flushes"] += 1
+        return len(valid)
+
+    def _drop(self, count):
+        if count:
+            self.stats["dropped"] += count
+            logger.warning("Dropped %s buffered interests for unknown customers / products", count)
+
+    @staticmethod
+    def _insert(valid, known, snapshot):
+        with transaction.atomic():
+            created = CustomerInterest.objects.bulk_create(
+                [CustomerInterest(customer_id=c, bank_id=b, product_id=p) for c, b, p, _ in valid]
+            )
+            # created_at is auto_now_add (set at insert); restore it for rows written late (spool replays)
+            late = []
+            for interest, (_, _, _, accepted_at) in zip(created, valid):
+                if interest.pk is not None and interest.created_at - accepted_at > LATE_WRITE:
+                    interest.created_at = accepted_at
+                    late.append(interest)
+            if late:
+                CustomerInterest.objects.bulk_update(late, ["created_at"])
+            record_leads([interest.pk for interest in created])
+            record_interests(
+                [(i.customer_id, i.bank_id, i.product_id, i.created_at) for i in created], customers=known,
+                snapshot=snapshot,
+            )
+            publish_interests([interest.pk for interest in created])  # bulk_create sends no post_save
+
+    def _run(self):
+        close_old_connections()
+        self.replay_spool()
+        delay = self.options["MAX_DELAY_MS"] / 1000.0
+        while not self._stopping:
+            with self._lock:
+                while not self._stopping and (
+                    not self._rows
+                    or (len(self._rows) < self.options["MAX_ROWS"] and time.monotonic() - self._oldest < delay)
+                ):
+                    timeout = None if not self._rows else max(delay - (time.monotonic() - self._oldest), 0.001)
+                    self._wakeup.wait(timeout)
+            if self._stopping:
+                break
+            close_old_connections()
+            try:
+                if self.flush():
+                    self.replay_spool()
+            except Exception:
+                logger.exception("Interest buffer flusher failed; retrying")
+                time.sleep(delay)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if not self._stopping and (self._thread is None or not self._thread.is_alive()):
+                    self._thread = threading.Thread(target=self._run, name="interest-buffer", daemon=True)
+                    self._thread.start()
+
+    def shutdown(self):
+        """Stop the flusher and write (or spool) whatever is still buffered."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    # -------------------- spool --------------------
+    def _spool(self, rows):
+        spool_dir = self.options["SPOOL_DIR"]
+        os.makedirs(spool_dir, exist_ok=True)
+        path = os.path.join(spool_dir, f"{uuid.uuid4().hex}.jsonl")
+        with open(path + ".tmp", "w") as fh:
+            for customer_id, bank_id, product_id, accepted_at in rows:
+                fh.write(json.dumps([customer_id, bank_id, product_id, accepted_at.isoformat()]) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(path + ".tmp", path)
+        self.stats["spooled"] += len(rows)
+
+    @staticmethod
+    def _spool_name(name):
+        """The .jsonl name of a spool file to replay: waiting, or orphaned by a dead replayer; else None."""
+        if name.endswith(".jsonl"):
+            return name
+        if name.endswith(".replaying"):
+            base, pid, _ = name.rsplit(".", 2)
+            if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                return base
+        return None
+
+    def replay_spool(self):
+        """Write spooled rows back; each file is claimed by renaming it first. Returns rows written."""
+        spool_dir = self.options["SPOOL_DIR"]
+        if not os.path.isdir(spool_dir):
+            return 0
+        written = 0
+        for entry in sorted(os.listdir(spool_dir)):
+            name = self._spool_name(entry)
+            if name is None:
+                continue
+            claimed = os.path.join(spool_dir, f"{name}.{os.getpid()}.replaying")
+            try:
+                os.rename(os.path.join(spool_dir, entry), claimed)
+            except OSError:
+                continue  # another process took it
+            with open(claimed) as fh:
+                rows = [
+                    (c, b, p, datetime.fromisoformat(at))
+                    for c, b, p, at in (json.loads(line) for line in fh if line.strip())
+                ]
+            size = self.options["MAX_ROWS"]
+            for i in range(0, len(rows), size):
+                try:
+                    written += self._write(rows[i:i + size])
+                except Exception:
+                    logger.exception("Replaying %s failed; spooling the rest for the next attempt", name)
+                    self._spool(rows[i:])
+                    os.remove(claimed)
+                    return written
+            os.remove(claimed)
+        return written
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        return True  # os.kill() would terminate it; orphans are left for manual replay
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+# -------------------- process-level buffer --------------------
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = InterestBuffer()
+            atexit.register(_buffer.shutdown)
+        return _buffer
@@ -0,0 +1,282 @@
+"""
+Database-backed background job queue.
+
+Long-running work (catalog imports, media uploads, eligibility
+recomputation, exports) is recorded as a Job row and executed by the
+`run_workers` management command instead of inside a gunicorn request.
+
+- Workers claim jobs with `SELECT ... FOR UPDATE SKIP LOCKED` (where the
+  database supports it), highest priority first, so any number of worker
+  processes can share the table.
+- Failed jobs are retried with exponential backoff up to `max_attempts`.
+- Handlers report progress through `JobContext.report_progress`, which is
+  visible on the jobs API while the job runs.
+- While a job runs, a heartbeat thread refreshes `locked_at` every
+  HEARTBEAT_SECONDS, so `requeue_stale` only takes back jobs whose worker
+  died. A worker that lost its claim doesn't record an outcome. A job
+  whose worker keeps dying fails after `max_attempts` claims.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 5
+HEARTBEAT_SECONDS = 60  # keep well below run_workers --stale-after
+
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register `fn(ctx, payload) -> result` as the handler for a job kind."""
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def enqueue(kind, payload=None, priority=0, max_attempts=3, run_after=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=run_after or timezone.now(),
+    )
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobContext:
+    """Handed to job handlers; throttles progress writes to one per second."""
+
+    def __init__(self, job):
+        self.job = job
+        self._last_write = 0.0
+
+    def report_progress(self, percent, message=None, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_write < 1.0:
+            return
+        self._last_write = now
+        percent = max(0.0, min(100.0, float(percent)))
+        _claimed(self.job).update(progress=percent, progress_message=message, locked_at=timezone.now())
+        self.job.progress, self.job.progress_message = percent, message
+
+
+def _claimed(job):
+    """The job's row, as long as it is still running under this worker's claim."""
+    return Job.objects.filter(pk=job.pk, status="running", locked_by=job.locked_by)
+
+
+class Heartbeat(threading.Thread):
+    """Refreshes a running job's `locked_at` until stopped, in its own thread and connection."""
+
+    def __init__(self, job, interval=HEARTBEAT_SECONDS):
+        super().__init__(name=f"job-heartbeat-{job.pk}", daemon=True)
+        self.job = job
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        used_db = False
+        while not self._stopped.wait(self.interval):
+            used_db = True
+            try:
+                if not _claimed(self.job).update(locked_at=timezone.now()):
+                    logger.warning("Job %s lost its claim to another worker", self.job.pk)
+                    break
+            except DatabaseError as e:
+                logger.warning("Heartbeat of job %s failed: %s", self.job.pk, e)
+        if used_db:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def claim_next(worker_id, kinds=None):
+    """Atomically take the next runnable job, or return None."""
+    now = timezone.now()
+    with transaction.atomic():
+        qs = Job.objects.filter(status="queued", run_after__lte=now)
+        if kinds:
+            qs = qs.filter(kind__in=kinds)
+        qs = qs.order_by("-priority", "run_after", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        job = qs.first()
+        if job is None:
+            return None
+        # Conditional update keeps claiming safe on backends without SKIP LOCKED
+        claimed = Job.objects.filter(pk=job.pk, status="queued").update(
+            status="running", locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job, heartbeat_interval=HEARTBEAT_SECONDS):
+    """
+    Execute a claimed job and record success, retry or failure.
+    Returns False when the job failed or its claim was lost meanwhile.
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+    heartbeat = Heartbeat(job, heartbeat_interval)
+    heartbeat.start()
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        result = handler(JobContext(job), job.payload)
+    except Exception as e:
+        heartbeat.stop()
+        error = f"{e}\n{traceback.format_exc(limit=5)}"
+        if job.attempts < job.max_attempts:
+            delay = RETRY_BASE_SECONDS * (2 ** (job.attempts - 1))
+            recorded = _claimed(job).update(
+                status="queued", last_error=error, locked_by=None, locked_at=None,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+            if recorded:
+                logger.warning("Job %s (%s) failed, retrying in %ss: %s", job.pk, job.kind, delay, e)
+        else:
+            recorded = _claimed(job).update(
+                status="failed", last_error=error, locked_by=None, finished_at=timezone.now()
+            )
+            if recorded:
+                logger.error("Job %s (%s) failed permanently: %s", job.pk, job.kind, e)
+        if not recorded:
+            logger.warning("Job %s (%s) lost its claim; failure not recorded: %s", job.pk, job.kind, e)
+        return False
+
+    heartbeat.stop()
+    if not _claimed(job).update(
+        status="succeeded", result=result, progress=100, locked_by=None, finished_at=timezone.now()
+    ):
+        logger.warning("Job %s (%s) lost its claim; result discarded", job.pk, job.kind)
+        return False
+    return True
+
+
+def requeue_stale(timeout_seconds):
+    """
+    Give jobs whose worker stopped sending heartbeats back to the queue, or
+    fail them once they have used up `max_attempts`. Returns the number requeued.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status="running", locked_at__lt=now - timedelta(seconds=timeout_seconds))
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", locked_by=None, finished_at=now,
+        last_error=f"Worker stopped responding (no heartbeat for {timeout_seconds}s)",
+    )
+    if failed:
+        logger.error("Failed %s job(s) whose workers kept dying", failed)
+    return stale.update(status="queued", locked_by=None, locked_at=None, run_after=now)
+
+
+def work(worker_id=None, kinds=None, poll_interval=1.0, max_jobs=None, stop=None, exit_when_idle=False):
+    """Worker loop: claim → run until `stop()` is true, `max_jobs` ran, or (optionally) the queue is empty."""
+    worker_id = worker_id or default_worker_id()
+    done = 0
+    while not (stop and stop()):
+        try:
+            job = claim_next(worker_id, kinds)
+        except DatabaseError as e:
+            # lock timeouts / dropped connections: back off and try again
+            logger.warning("Worker %s could not claim a job: %s", worker_id, e)
+            close_old_connections()
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            if exit_when_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        done += 1
+        if max_jobs and done >= max_jobs:
+            break
+    return done
+
+
+# -------------------- Built-in handlers --------------------
+@job_handler("catalog_import")
+def _catalog_import(ctx, payload):
+    from .catalog_io import import_catalog
+    from .serializers import CatalogImportSerializer
+
+    serializer = CatalogImportSerializer(data=payload["catalog"])
+    serializer.is_valid(raise_exception=True)
+    ctx.report_progress(10, "Catalog validated", force=True)
+    return import_catalog(
+        serializer.validated_data["banks"],
+        delete_missing=payload.get("delete_missing", False),
+        dry_run=payload.get("dry_run", False),
+    )
+
+
+@job_handler("media_upload")
+def _media_upload(ctx, payload):
+    from .media_uploads import process_upload
+
+    # process_upload retries on its own and records failures on the MediaUpload row
+    outcome = process_upload(payload["upload_id"])
+    return {"upload_id": payload["upload_id"], "status": outcome}
+
+
+@job_handler("eligibility_recompute")
+def _eligibility_recompute(ctx, payload):
+    from .recompute import recompute_all
+
+    def progress(done, total, customers):
+        ctx.report_progress(100.0 * done / total, f"{done}/{total} shards, {customers} customers", force=done == total)
+
+    return recompute_all(
+        processes=payload.get("processes"),
+        shard_size=payload.get("shard_size", 10000),
+        progress=progress,
+    )
+
+
+@job_handler("lead_dispatch")
+def _lead_dispatch(ctx, payload):
+    from .lead_outbox import dispatch_once
+
+    totals = {"batches": 0, "delivered": 0, "failed_batches": 0, "dead": 0}
+    for _ in range(payload.get("rounds", 1)):
+        summary = dispatch_once(batch_size=payload.get("batch_size"))
+        for key in totals:
+            totals[key] += summary[key]
+        if not summary["batches"]:
+            break
+    return totals
+
+
+@job_handler("lead_export")
+def _lead_export(ctx, payload):
+    from datetime import date, timedelta
+    from .lead_exports import export_day
+
+    day = date.fromisoformat(payload["date"]) if payload.get("date") else date.today() - timedelta(days=1)
+    summary = export_day(day, processes=payload.get("processes", 1), force=payload.get("force", False))
+    summary["written"] = len(summary["written"])
+    return summary
+
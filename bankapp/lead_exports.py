@@ -0,0 +1,283 @@
+"""
+Daily per-bank lead files.
+
+For one day, every CustomerInterest row is exported with the customer's
+details and eligibility snapshot (the EligibilityResult for the product —
+or the cheapest one at the bank when no product was chosen) to
+`<OUTPUT_DIR>/<YYYY-MM-DD>/bank_<id>.csv.gz`.
+
+Banks are split across worker processes (largest first, balanced by row
+count). Each worker makes a single streaming pass over its banks' rows
+ordered by bank and groups them with itertools.groupby, so memory stays
+constant whatever the volume: one open gzip stream, one database cursor.
+Files are written to a temporary name and renamed; gzip headers carry no
+timestamp, so unchanged data gives byte-identical files.
+
+`manifest.json` in the day's directory records, per bank, the file, row
+count, sha256 and a fingerprint of the source rows: a digest of the rows
+as they would be exported, so a changed interest, customer detail, product
+title or eligibility result all count. Computing it is one streaming pass
+over the same query, without the CSV / gzip work. A rerun regenerates only
+banks whose fingerprint changed or whose file is missing or altered on
+disk; banks left without rows lose their file.
+
+Settings (BANKAPP_LEAD_EXPORT): OUTPUT_DIR.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta
+
+from django import db
+from django.conf import settings
+from django.db.models import Min, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import CustomerInterest, EligibilityResult
+
+DEFAULT_OPTIONS = {
+    "OUTPUT_DIR": os.path.join(str(settings.BASE_DIR), "lead_exports"),
+}
+CHUNK_SIZE = 2000
+MANIFEST_NAME = "manifest.json"
+
+# CSV header → CustomerInterest lookup ("eligible" is derived from the eligibility columns)
+COLUMNS = (
+    ("interest_id", "id"),
+    ("created_at", "created_at"),
+    ("customer_id", "customer_id"),
+    ("full_name", "customer__full_name"),
+    ("email", "customer__email"),
+    ("phone", "customer__phone"),
+    ("dob", "customer__dob"),
+    ("city", "customer__city"),
+    ("pincode", "customer__pincode"),
+    ("employment_type", "customer__employment_type"),
+    ("salary", "customer__salary"),
+    ("company_name", "customer__companyName"),
+    ("product_id", "product_id"),
+    ("product_title", "product__product_title"),
+    ("last_eligibility_check", "customer__last_eligibility_check"),
+    ("min_salary_required", "product_min_salary"),
+    ("bank_min_salary_required", "bank_min_salary"),
+)
+HEADER = [name for name, _ in COLUMNS[:-2]] + ["eligible", "min_salary_required"]
+_PRODUCT_ID = HEADER.index("product_id")
+FORMAT_VERSION = hashlib.sha1(",".join(HEADER).encode()).hexdigest()[:8]
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "BANKAPP_LEAD_EXPORT", {}))
+    return options
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def day_interests(day):
+    start, end = day_bounds(day)
+    return CustomerInterest.objects.filter(created_at__gte=start, created_at__lt=end)
+
+
+def bank_fingerprints(day, bank_ids=None):
+    """
+    {bank_id: (rows, fingerprint)} for the banks with leads on `day`; the fingerprint
+    digests the exported rows, so customer edits since the last run are noticed.
+    """
+    fingerprints = {}
+    rows = export_rows(day, bank_ids).iterator(chunk_size=CHUNK_SIZE)
+    for bank_id, bank_rows in itertools.groupby(rows, key=lambda row: row[0]):
+        digest = hashlib.sha256()
+        count = 0
+        for row in bank_rows:
+            digest.update(repr(_csv_row(list(row[1:]))).encode())
+            count += 1
+        fingerprints[bank_id] = (count, f"{FORMAT_VERSION}:{digest.hexdigest()}")
+    return fingerprints
+
+
+def export_rows(day, bank_ids):
+    """Rows of `bank_ids` (all banks when None) for `day` ordered by bank, with the eligibility snapshot annotated."""
+    results = EligibilityResult.objects.filter(customer_id=OuterRef("customer_id"), bank_id=OuterRef("bank_id"))
+    interests = day_interests(day)
+    if bank_ids is not None:
+        interests = interests.filter(bank_id__in=bank_ids)
+    return (
+        interests
+        .annotate(
+            product_min_salary=Subquery(
+                results.filter(product_id=OuterRef("product_id")).values("min_salary_required")[:1]
+            ),
+            bank_min_salary=Subquery(
+                results.order_by().values("bank_id").annotate(m=Min("min_salary_required")).values("m")[:1]
+            ),
+        )
+        .order_by("bank_id", "created_at", "id")
+        .values_list("bank_id", *[lookup for _, lookup in COLUMNS])
+    )
+
+
+def _csv_row(row):
+    *base, product_min, bank_min = row
+    min_salary = product_min if base[_PRODUCT_ID] is not None else bank_min
+    if min_salary is None:
+        return base + ["no", None]
+    return base + ["yes", f"{min_salary:.2f}"]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bank_file(directory, bank_id):
+    return os.path.join(directory, f"bank_{bank_id}.csv.gz")
+
+
+def write_bank_files(day, bank_ids, directory):
+    """
+    One streaming pass over the day's rows for `bank_ids`, one gzip CSV per bank.
+    Returns {bank_id: {"file", "rows", "sha256", "bytes"}}.
+    """
+    written = {}
+    rows = export_rows(day, bank_ids).iterator(chunk_size=CHUNK_SIZE)
+    for bank_id, bank_rows in itertools.groupby(rows, key=lambda row: row[0]):
+        path = bank_file(directory, bank_id)
+        count = 0
+        with open(path + ".part", "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0, filename="") as zipped:
+            text = io.TextIOWrapper(zipped, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(HEADER)
+            for row in bank_rows:
+                writer.writerow(_csv_row(list(row[1:])))
+                count += 1
+            text.detach()  # flush; the gzip stream is closed by the with block
+        os.replace(path + ".part", path)
+        written[bank_id] = {
+            "file": os.path.basename(path), "rows": count, "sha256": _sha256(path), "bytes": os.path.getsize(path),
+        }
+    return written
+
+
+# -------------------- manifest --------------------
+def load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {"banks": {}}
+
+
+def save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".part", "w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(path + ".part", path)
+
+
+def _is_current(directory, entry, fingerprint):
+    if not entry or entry.get("fingerprint") != fingerprint:
+        return False
+    path = os.path.join(directory, entry["file"])
+    return os.path.exists(path) and os.path.getsize(path) == entry["bytes"] and _sha256(path) == entry["sha256"]
+
+
+def plan_groups(bank_rows, processes):
+    """Split {bank_id: rows} into at most `processes` groups of similar size, largest banks first."""
+    groups = [[0, []] for _ in range(max(1, min(processes, len(bank_rows))))]
+    for bank_id, rows in sorted(bank_rows.items(), key=lambda item: -item[1]):
+        lightest = min(groups, key=lambda group: group[0])
+        lightest[0] += rows
+        lightest[1].append(bank_id)
+    return [sorted(bank_ids) for _, bank_ids in groups if bank_ids]
+
+
+# -------------------- workers --------------------
+def _init_worker():
+    import django
+    django.setup()  # no-op when forked, required with the spawn start method
+    db.connections.close_all()
+
+
+def _export_group(task):
+    day, bank_ids, directory = task
+    return write_bank_files(day, bank_ids, directory)
+
+
+def export_day(day, output_dir=None, processes=1, bank_ids=None, force=False, progress=None):
+    """
+    Write the lead files for `day` that are missing or out of date; returns a summary dict.
+    `progress(bank_id, entry)` is called for each file written.
+    """
+    started = time.monotonic()
+    directory = os.path.join(output_dir or get_options()["OUTPUT_DIR"], day.isoformat())
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    entries = {int(bank_id): entry for bank_id, entry in manifest.get("banks", {}).items()}
+
+    fingerprints = bank_fingerprints(day, bank_ids or None)
+    wanted = set(fingerprints) | set(entries)
+    if bank_ids:
+        wanted &= set(bank_ids)
+
+    removed = []
+    for bank_id in sorted(wanted - set(fingerprints)):  # no leads any more
+        path = os.path.join(directory, entries[bank_id]["file"])
+        if os.path.exists(path):
+            os.remove(path)
+        del entries[bank_id]
+        removed.append(bank_id)
+
+    stale = {
+        bank_id: fingerprints[bank_id][0]
+        for bank_id in wanted & set(fingerprints)
+        if force or not _is_current(directory, entries.get(bank_id), fingerprints[bank_id][1])
+    }
+    groups = plan_groups(stale, processes)
+    tasks = [(day, group, directory) for group in groups]
+
+    def collect(written):
+        for bank_id, entry in written.items():
+            entry["fingerprint"] = fingerprints[bank_id][1]
+            entry["generated_at"] = timezone.now().isoformat()
+            entries[bank_id] = entry
+            if progress:
+                progress(bank_id, entry)
+
+    if len(tasks) <= 1 or processes <= 1:
+        for task in tasks:
+            collect(_export_group(task))
+    else:
+        # Children fork with the parent's connection; close it so neither side reuses it
+        db.connections.close_all()
+        with multiprocessing.Pool(processes=len(tasks), initializer=_init_worker) as pool:
+            for written in pool.imap_unordered(_export_group, tasks):
+                collect(written)
+
+    save_manifest(directory, {
+        "date": day.isoformat(),
+        "columns": HEADER,
+        "banks": {str(bank_id): entry for bank_id, entry in sorted(entries.items())},
+    })
+    return {
+        "date": day.isoformat(),
+        "directory": directory,
+        "written": sorted(stale),
+        "rows_written": sum(stale.values()),
+        "unchanged": len(wanted & set(fingerprints)) - len(stale),
+        "removed": removed,
+        "processes": min(processes, len(tasks)) or 1,
+        "seconds": round(time.monotonic() - started, 2),
+    }
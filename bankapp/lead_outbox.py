@@ -0,0 +1,388 @@
+"""
+Transactional outbox for delivering leads to partner banks.
+
+Every CustomerInterest insert writes a LeadOutbox row in the same
+transaction (`record_leads`), so a lead exists exactly when its interest
+does. The dispatcher (`dispatch_leads` command or the "lead_dispatch" job):
+
+1. claims up to BATCH_SIZE due rows per bank (`status='pending'` →
+   'sending' with a batch id, SKIP LOCKED where supported, so several
+   dispatchers can run side by side);
+2. delivers each bank's batch through its transport — banks in parallel,
+   up to CONCURRENCY at a time;
+3. marks the batch delivered, or schedules a retry with exponential
+   backoff (BACKOFF × 2^(attempts−1), capped at MAX_BACKOFF, ±20% jitter);
+   after MAX_ATTEMPTS the rows are marked failed.
+
+Delivery is at-least-once: a dispatcher that dies mid-batch leaves rows in
+'sending', and they are retried once SENDING_TIMEOUT has passed. Batches
+carry their batch id (Idempotency-Key header / file name) so receivers
+can drop duplicates.
+
+Transports:
+    WebhookTransport   POSTs {"batch_id", "bank_id", "leads": [...]} as JSON to
+                       WEBHOOK_URL ("{bank_id}" is substituted)
+    FileDropTransport  writes <FILE_DROP_DIR>/<bank_id>/<time>_<batch_id>.jsonl
+                       atomically (an SFTP-style drop folder)
+`LocalLeadReceiver` is an in-process HTTP endpoint standing in for a bank
+webhook in tests and local runs.
+
+Settings (BANKAPP_LEAD_DELIVERY): TRANSPORT, WEBHOOK_URL, FILE_DROP_DIR,
+TIMEOUT, BATCH_SIZE, CONCURRENCY, MAX_ATTEMPTS, BACKOFF, MAX_BACKOFF,
+SENDING_TIMEOUT, and BANKS — per-bank overrides of any of them,
+e.g. {3: {"TRANSPORT": "bankapp.lead_outbox.FileDropTransport"}}.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import CustomerInterest, LeadOutbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    "TRANSPORT": "bankapp.lead_outbox.WebhookTransport",
+    "WEBHOOK_URL": None,
+    "FILE_DROP_DIR": os.path.join(str(settings.BASE_DIR), "lead_drop"),
+    "TIMEOUT": 10,
+    "BATCH_SIZE": 200,
+    "CONCURRENCY": 4,
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF": 30,
+    "MAX_BACKOFF": 3600,
+    "SENDING_TIMEOUT": 300,
+    "BANKS": {},
+}
+
+# CustomerInterest lookups copied into the lead payload
+LEAD_COLUMNS = (
+    ("interest_id", "id"),
+    ("created_at", "created_at"),
+    ("bank_id", "bank_id"),
+    ("customer_id", "customer_id"),
+    ("full_name", "customer__full_name"),
+    ("email", "customer__email"),
+    ("phone", "customer__phone"),
+    ("city", "customer__city"),
+    ("pincode", "customer__pincode"),
+    ("employment_type", "customer__employment_type"),
+    ("salary", "customer__salary"),
+    ("company_name", "customer__companyName"),
+    ("product_id", "product_id"),
+    ("product_title", "product__product_title"),
+)
+
+
+def get_options(bank_id=None):
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "BANKAPP_LEAD_DELIVERY", {}))
+    if bank_id is not None:
+        banks = options.get("BANKS") or {}
+        options.update(banks.get(bank_id) or banks.get(str(bank_id)) or {})
+    return options
+
+
+class DeliveryError(Exception):
+    pass
+
+
+# -------------------- outbox writes --------------------
+def _json_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        return str(value)  # Decimal
+    return value
+
+
+def record_leads(interest_ids):
+    """
+    Outbox rows for freshly inserted interests. Call inside the transaction
+    that inserted them.
+    """
+    if not interest_ids:
+        return []
+    names = [name for name, _ in LEAD_COLUMNS]
+    rows = CustomerInterest.objects.filter(pk__in=interest_ids).values_list(*[lookup for _, lookup in LEAD_COLUMNS])
+    entries = []
+    for row in rows:
+        payload = {name: _json_value(value) for name, value in zip(names, row)}
+        entries.append(LeadOutbox(interest_id=row[0], bank_id=row[2], payload=payload, created_at=row[1]))
+    return LeadOutbox.objects.bulk_create(entries)
+
+
+# -------------------- transports --------------------
+class WebhookTransport:
+    """Shared by the dispatcher's threads: each thread keeps its own requests.Session (not thread-safe)."""
+
+    def __init__(self, options):
+        if not options["WEBHOOK_URL"]:
+            raise DeliveryError("WEBHOOK_URL is not configured")
+        self.url = options["WEBHOOK_URL"]
+        self.timeout = options["TIMEOUT"]
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def deliver(self, bank_id, batch_id, leads):
+        try:
+            response = self.session.post(
+                self.url.format(bank_id=bank_id),
+                data=json.dumps({"batch_id": batch_id, "bank_id": bank_id, "leads": leads}),
+                headers={"Content-Type": "application/json", "Idempotency-Key": batch_id},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise DeliveryError(str(e)) from e
+        if not 200 <= response.status_code < 300:
+            raise DeliveryError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+
+class FileDropTransport:
+    def __init__(self, options):
+        self.root = options["FILE_DROP_DIR"]
+
+    def deliver(self, bank_id, batch_id, leads):
+        directory = os.path.join(self.root, str(bank_id))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{timezone.now():%Y%m%dT%H%M%S}_{batch_id}.jsonl")
+        with open(path + ".part", "w") as fh:
+            for lead in leads:
+                fh.write(json.dumps(lead) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(path + ".part", path)  # the bank only ever sees complete files
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(bank_id):
+    options = get_options(bank_id)
+    key = (options["TRANSPORT"], options["WEBHOOK_URL"], options["FILE_DROP_DIR"], options["TIMEOUT"])
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _transports[key] = import_string(options["TRANSPORT"])(options)
+        return transport
+
+
+# -------------------- dispatching --------------------
+def requeue_stale(now=None):
+    """Hand 'sending' rows of a dispatcher that died back to the queue."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=get_options()["SENDING_TIMEOUT"])
+    return LeadOutbox.objects.filter(status="sending", locked_at__lt=cutoff).update(status="pending", locked_at=None)
+
+
+def claim_batches(batch_size=None, max_banks=None, now=None):
+    """[(bank_id, batch_id, [(outbox id, attempts, payload), ...]), ...] claimed for delivery."""
+    now = now or timezone.now()
+    due = LeadOutbox.objects.filter(status="pending", next_attempt_at__lte=now)
+    bank_ids = list(due.order_by("bank_id").values_list("bank_id", flat=True).distinct()[:max_banks])
+    batches = []
+    for bank_id in bank_ids:
+        size = batch_size or get_options(bank_id)["BATCH_SIZE"]
+        batch_id = uuid.uuid4().hex
+        with transaction.atomic():
+            qs = due.filter(bank_id=bank_id).order_by("id")
+            if connection.features.has_select_for_update_skip_locked:
+                qs = qs.select_for_update(skip_locked=True)
+            ids = list(qs.values_list("id", flat=True)[:size])
+            # Conditional update keeps claiming safe on backends without SKIP LOCKED
+            LeadOutbox.objects.filter(id__in=ids, status="pending").update(
+                status="sending", locked_at=now, batch_id=batch_id
+            )
+        rows = list(
+            LeadOutbox.objects.filter(batch_id=batch_id, status="sending").order_by("id")
+            .values_list("id", "attempts", "payload")
+        )
+        if rows:
+            batches.append((bank_id, batch_id, rows))
+    return batches
+
+
+def _backoff(attempts, options):
+    delay = min(options["BACKOFF"] * 2 ** (attempts - 1), options["MAX_BACKOFF"])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _deliver(bank_id, batch_id, rows):
+    """Returns None on success, else the error text."""
+    try:
+        get_transport(bank_id).deliver(bank_id, batch_id, [payload for _, _, payload in rows])
+    except Exception as e:  # any transport failure is retried
+        return str(e) or e.__class__.__name__
+    return None
+
+
+def _finish(bank_id, batch_id, rows, error):
+    now = timezone.now()
+    ids = [row_id for row_id, _, _ in rows]
+    if error is None:
+        LeadOutbox.objects.filter(id__in=ids, batch_id=batch_id).update(
+            status="delivered", delivered_at=now, locked_at=None, last_error=None, attempts=F("attempts") + 1
+        )
+        return 0
+    options = get_options(bank_id)
+    by_attempts = {}
+    for row_id, attempts, _ in rows:
+        by_attempts.setdefault(attempts + 1, []).append(row_id)
+    dead = 0
+    for attempts, group in by_attempts.items():
+        if attempts >= options["MAX_ATTEMPTS"]:
+            dead += len(group)
+            changes = {"status": "failed"}
+        else:
+            changes = {"status": "pending", "next_attempt_at": now + timedelta(seconds=_backoff(attempts, options))}
+        LeadOutbox.objects.filter(id__in=group, batch_id=batch_id).update(
+            attempts=attempts, locked_at=None, last_error=error[:2000], **changes
+        )
+    logger.warning("Lead batch %s for bank %s failed (%s leads): %s", batch_id, bank_id, len(rows), error)
+    return dead
+
+
+def dispatch_once(batch_size=None, max_banks=None):
+    """Claim, deliver and settle one round of batches (one per bank with due leads)."""
+    started = time.monotonic()
+    requeue_stale()
+    batches = claim_batches(batch_size, max_banks)
+    summary = {"batches": len(batches), "delivered": 0, "failed_batches": 0, "dead": 0}
+    if not batches:
+        return summary
+
+    # Only the transport calls run in threads; the database work stays on this connection
+    with ThreadPoolExecutor(max_workers=max(1, get_options()["CONCURRENCY"])) as pool:
+        errors = list(pool.map(lambda batch: _deliver(*batch), batches))
+    for (bank_id, batch_id, rows), error in zip(batches, errors):
+        summary["dead"] += _finish(bank_id, batch_id, rows, error)
+        if error is None:
+            summary["delivered"] += len(rows)
+        else:
+            summary["failed_batches"] += 1
+    summary["seconds"] = round(time.monotonic() - started, 3)
+    return summary
+
+
+def run_dispatcher(interval=5.0, stop=None, batch_size=None):
+    """Dispatch until `stop()` is true; sleeps `interval` seconds whenever nothing was due."""
+    while not (stop and stop()):
+        summary = dispatch_once(batch_size)
+        if summary["batches"]:
+            logger.info("Lead dispatch: %s", summary)
+        else:
+            time.sleep(interval)
+
+
+# -------------------- metrics --------------------
+def delivery_metrics(now=None):
+    """Queue depth, lag and delivery throughput for the metrics endpoint."""
+    now = now or timezone.now()
+    hour_ago = now - timedelta(hours=1)
+
+    by_status = dict(LeadOutbox.objects.order_by().values_list("status").annotate(n=Count("id")).values_list("status", "n"))
+    pending = LeadOutbox.objects.filter(status__in=("pending", "sending"))
+    oldest_pending = pending.aggregate(oldest=Min("created_at"))["oldest"]
+    per_bank = list(
+        pending.order_by().values("bank_id", "bank__bank_name").annotate(pending=Count("id"), oldest=Min("created_at"))
+        .order_by("-pending")
+    )
+
+    latency = ExpressionWrapper(F("delivered_at") - F("created_at"), output_field=DurationField())
+    delivered = LeadOutbox.objects.filter(status="delivered", delivered_at__gte=hour_ago).aggregate(
+        count=Count("id"), avg_latency=Avg(latency), max_latency=Max(latency)
+    )
+    last_5_min = LeadOutbox.objects.filter(status="delivered", delivered_at__gte=now - timedelta(minutes=5)).count()
+
+    def seconds(value):
+        return round(value.total_seconds(), 1) if value is not None else None
+
+    return {
+        "pending": by_status.get("pending", 0),
+        "sending": by_status.get("sending", 0),
+        "failed": by_status.get("failed", 0),
+        "delivered_total": by_status.get("delivered", 0),
+        "oldest_pending_lag_seconds": seconds(now - oldest_pending) if oldest_pending else 0,
+        "delivered_last_hour": delivered["count"],
+        "delivered_per_minute_last_5_min": round(last_5_min / 5, 2),
+        "avg_delivery_latency_seconds": seconds(delivered["avg_latency"]),
+        "max_delivery_latency_seconds": seconds(delivered["max_latency"]),
+        "pending_by_bank": [
+            {
+                "bank_id": row["bank_id"],
+                "bank_name": row["bank__bank_name"],
+                "pending": row["pending"],
+                "lag_seconds": seconds(now - row["oldest"]),
+            }
+            for row in per_bank
+        ],
+    }
+
+
+# -------------------- local stand-in for a bank webhook --------------------
+class LocalLeadReceiver:
+    """
+    HTTP server on 127.0.0.1 recording the batches POSTed to it:
+
+        with LocalLeadReceiver() as receiver:
+            settings.BANKAPP_LEAD_DELIVERY = {"WEBHOOK_URL": receiver.url}
+            ...
+            receiver.batches  # [(path, body dict), ...]
+
+    `fail_next(n)` answers the next n requests with 503.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self._failures = 0
+        self._lock = threading.Lock()
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with receiver._lock:
+                    fail = receiver._failures > 0
+                    receiver._failures -= fail
+                    if not fail:
+                        receiver.batches.append((self.path, json.loads(body)))
+                self.send_response(503 if fail else 200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/leads/{{bank_id}}"
+
+    def fail_next(self, count=1):
+        with self._lock:
+            self._failures = count
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,190 @@
+"""
+Live admin dashboard feed (Server-Sent Events).
+
+`GET admin-dashboard/stream/` keeps a connection open and pushes dashboard
+events as they happen, instead of the admin UI polling `admin-dashboard/`:
+
+    event: snapshot           the full dashboard payload, once on connect
+    event: eligibility_check  a customer ran an eligibility check
+    event: interest           a CustomerInterest was created (direct or buffered)
+    event: product            a product was created / updated / deleted
+    event: resync             this client fell behind; reload the snapshot
+
+Writers publish after their transaction commits (signals in signals.py,
+plus explicit calls where rows bypass signals). Each event is encoded once
+and fanned out to every subscriber's bounded asyncio queue. Clients that
+reconnect with `Last-Event-ID` get the events they missed replayed from a
+short history instead of a new snapshot.
+
+LocalBroker is in-process: dashboards only see writes made by the same
+process. With several worker processes, set BROKER to a shared
+implementation (e.g. Redis pub/sub) exposing the same publish / subscribe /
+replay methods. The stream needs the ASGI app (myproject.asgi, e.g.
+`gunicorn myproject.asgi:application -k uvicorn.workers.UvicornWorker`);
+under WSGI it would hold a worker thread forever, so it answers 501 there.
+
+Settings (BANKAPP_LIVE_FEED): BROKER (dotted path), QUEUE_SIZE (events
+buffered per client), HISTORY (events kept for Last-Event-ID),
+HEARTBEAT (seconds between keep-alive comments), RETRY (ms, reconnect hint).
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import CustomerInterest
+
+DEFAULT_OPTIONS = {
+    "BROKER": "bankapp.live_feed.LocalBroker",
+    "QUEUE_SIZE": 500,
+    "HISTORY": 500,
+    "HEARTBEAT": 15,
+    "RETRY": 3000,
+}
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "BANKAPP_LIVE_FEED", {}))
+    return options
+
+
+def format_event(event_id, kind, data):
+    """One SSE message (without an id, the client's Last-Event-ID is left alone)."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {kind}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """One connected client: an asyncio queue fed from any thread through its event loop."""
+
+    def __init__(self, broker, loop, size):
+        self.broker = broker
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def _put(self, message):
+        # Runs on the subscriber's loop. A client that can't keep up is told to resync.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = format_event(None, "resync", "{}")
+        self.queue.put_nowait(message)
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:  # loop closed: the client is gone
+            self.broker.unsubscribe(self)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process pub/sub with a short replay history."""
+
+    def __init__(self, options):
+        self.queue_size = options["QUEUE_SIZE"]
+        self._history = deque(maxlen=options["HISTORY"])  # (event id, message)
+        self._ids = itertools.count(1)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, kind, payload):
+        data = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":"))
+        with self._lock:
+            event_id = next(self._ids)
+            message = format_event(event_id, kind, data)
+            self._history.append((event_id, message))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return event_id
+
+    def subscribe(self, loop):
+        subscription = Subscription(self, loop, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def replay(self, last_event_id):
+        """
+        Messages after `last_event_id`, or None when the history doesn't cover
+        the gap (too old, skipped while nobody listened, or from before a restart).
+        """
+        with self._lock:
+            if not self._history or not self._history[0][0] - 1 <= last_event_id <= self._history[-1][0]:
+                return None
+            return [message for event_id, message in self._history if event_id > last_event_id]
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def skip(self):
+        """An event nobody is listening for: not built, but reconnecting clients must resync."""
+        with self._lock:
+            next(self._ids)
+            self._history.clear()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            options = get_options()
+            _broker = import_string(options["BROKER"])(options)
+        return _broker
+
+
+def publish_on_commit(kind, payload_factory, using="default"):
+    """
+    Publish once the surrounding transaction commits (immediately outside
+    one). The payload is only built when a dashboard is connected.
+    """
+    def publish():
+        broker = get_broker()
+        if broker.has_subscribers():
+            broker.publish(kind, payload_factory())
+        else:
+            broker.skip()
+
+    transaction.on_commit(publish, using=using)
+
+
+# -------------------- event payloads --------------------
+def interest_events(interest_ids):
+    """Dashboard rows (RecentInterestSerializer fields + bank) for new interests, one query."""
+    return list(
+        CustomerInterest.objects.filter(pk__in=interest_ids).order_by("id").values(
+            "id", "created_at", "customer_id", "bank_id",
+            customer_name=F("customer__full_name"),
+            bank_name=F("bank__bank_name"),
+            product_name=F("product__product_title"),
+        )
+    )
+
+
+def publish_interests(interest_ids, using="default"):
+    if interest_ids:
+        ids = list(interest_ids)
+        publish_on_commit("interest", lambda: {"interests": interest_events(ids)}, using=using)
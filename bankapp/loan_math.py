@@ -0,0 +1,239 @@
+"""
+Loan sizing from FOIR (fixed obligations to income ratio).
+
+A lender lets all EMIs together take up to `foir_percent` of the monthly
+net salary. The EMI headroom left for a new loan is
+
+    capacity = salary × foir% − existing EMIs     (existing EMIs only count
+                                                   when the product deducts them)
+
+and the largest principal whose EMI fits in it, at monthly rate r over n
+months, is
+
+    P = capacity × ((1 + r)^n − 1) / (r × (1 + r)^n)      (capacity × n when r = 0)
+
+capped at the product's max_loan_amount. The math works on NumPy arrays so
+every eligible product of an applicant is sized in one pass.
+"""
+import re
+from decimal import Decimal
+
+import numpy as np
+
+OBLIGATION_DEDUCT = "deduct"
+OBLIGATION_IGNORE = "ignore"
+
+# "50%", "FOIR 60 percent", "40-50%", "40 to 50 %", "0.5" — first value in (0, 100]
+_PERCENT_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(%|percent)?(?:\s*(?:-|–|to)\s*\d+(?:\.\d+)?)?\s*(%|percent)?",
+    re.IGNORECASE,
+)
+_IGNORES_OBLIGATIONS_RE = re.compile(
+    r"\b(?:excl\w*|exclusive of|without|ignor\w*|not including)\b[^.;]*\b(?:emi|obligation|loan)",
+    re.IGNORECASE,
+)
+
+
+def parse_foir(text):
+    """
+    Free-text FOIR description → (foir_percent or None, obligation handling).
+    Ranges resolve to their lower bound (the conservative reading).
+    """
+    if not text:
+        return None, OBLIGATION_DEDUCT
+    handling = OBLIGATION_IGNORE if _IGNORES_OBLIGATIONS_RE.search(text) else OBLIGATION_DEDUCT
+    # Prefer a value after the word FOIR ("1% fee, FOIR 50%" → 50)
+    keyword = text.lower().find("foir")
+    for candidate in ([text[keyword:]] if keyword >= 0 else []) + [text]:
+        for match in _PERCENT_RE.finditer(candidate):
+            value = Decimal(match.group(1))
+            if value <= 1 and not (match.group(2) or match.group(3)):
+                value *= 100  # written as a ratio
+            if 0 < value <= 100:
+                return value.quantize(Decimal("0.01")), handling
+    return None, handling
+
+
+def emi(principal, annual_rate_percent, months):
+    """Monthly instalment for each (principal, annual ROI %, tenure in months)."""
+    principal, rate, months = np.broadcast_arrays(
+        np.asarray(principal, dtype=float),
+        np.asarray(annual_rate_percent, dtype=float) / 1200.0,
+        np.asarray(months, dtype=float),
+    )
+    growth = np.power(1.0 + rate, months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate > 0, principal * rate * growth / (growth - 1.0), principal / months)
+
+
+def principal_for_emi(monthly_emi, annual_rate_percent, months):
+    """Largest principal repayable with `monthly_emi` — the inverse of emi()."""
+    monthly_emi, rate, months = np.broadcast_arrays(
+        np.asarray(monthly_emi, dtype=float),
+        np.asarray(annual_rate_percent, dtype=float) / 1200.0,
+        np.asarray(months, dtype=float),
+    )
+    growth = np.power(1.0 + rate, months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate > 0, monthly_emi * (growth - 1.0) / (rate * growth), monthly_emi * months)
+
+
+def _column(products, getter):
+    values = (getter(p) for p in products)
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+
+
+def estimate_max_loans(products, salary, existing_emi=0.0):
+    """
+    Maximum sanctionable amount for each product (anything with the Product
+    loan / ROI / tenure / FOIR attributes), in one vectorized pass.
+
+    Products without FOIR, ROI or tenure keep the previous estimate
+    (max_loan_amount, else 5 × salary). Returns one dict per product:
+    {"estimated_max_loan": float, "loan_estimate": {...}}.
+    """
+    if not products:
+        return []
+    salary = float(salary or 0)
+    existing_emi = float(existing_emi or 0)
+
+    foir = _column(products, lambda p: p.foir_percent)
+    # Upper ROI / tenure: the rate the lender may charge, the longest term it offers
+    roi = _column(products, lambda p: p.max_roi if p.max_roi is not None else p.min_roi)
+    tenure = _column(products, lambda p: p.max_tenure or p.min_tenure or None)
+    max_loan = _column(products, lambda p: p.max_loan_amount or None)
+    min_loan = _column(products, lambda p: p.min_loan_amount or None)
+    deducts = np.array([p.obligation_handling != OBLIGATION_IGNORE for p in products])
+
+    computable = ~np.isnan(foir) & ~np.isnan(roi) & ~np.isnan(tenure)
+    capacity = np.maximum(salary * foir / 100.0 - np.where(deducts, existing_emi, 0.0), 0.0)
+    principal = np.floor(principal_for_emi(capacity, roi, tenure))
+    capped = computable & ~np.isnan(max_loan) & (principal > max_loan)
+    principal = np.where(capped, max_loan, principal)
+
+    fallback = np.where(np.isnan(max_loan), salary * 5, max_loan)
+    estimate = np.where(computable, principal, fallback)
+    below_min = computable & ~np.isnan(min_loan) & (estimate < min_loan)
+
+    results = []
+    for i, product in enumerate(products):
+        if computable[i]:
+            details = {
+                "basis": "foir",
+                "foir_percent": float(foir[i]),
+                "obligation_handling": product.obligation_handling,
+                "existing_emi": existing_emi if deducts[i] else 0.0,
+                "emi_capacity": round(float(capacity[i]), 2),
+                "roi": float(roi[i]),
+                "tenure_months": int(tenure[i]),
+                "capped_by_max_loan": bool(capped[i]),
+                "below_min_loan": bool(below_min[i]),
+            }
+        else:
+            details = {"basis": "max_loan_amount" if not np.isnan(max_loan[i]) else "salary_multiple"}
+        results.append({"estimated_max_loan": float(estimate[i]), "loan_estimate": details})
+    return results
+
+
+# -------------------- EMI grids / amortization --------------------
+MAX_GRID_POINTS = 120  # tenure or ROI points per product
+
+
+def _tenure_points(product, step):
+    low, high = product.min_tenure or product.max_tenure, product.max_tenure or product.min_tenure
+    if not low:
+        return None
+    low, high = sorted((low, high))
+    points = list(range(low, high + 1, step))[:MAX_GRID_POINTS]
+    if points[-1] != high and len(points) < MAX_GRID_POINTS:
+        points.append(high)
+    return points
+
+
+def _roi_points(product, steps):
+    low = product.min_roi if product.min_roi is not None else product.max_roi
+    high = product.max_roi if product.max_roi is not None else product.min_roi
+    if low is None:
+        return None
+    low, high = sorted((low, high))
+    return sorted({round(float(r), 2) for r in np.linspace(low, high, steps)})
+
+
+def emi_grid(amount, products, tenure_step=12, roi_steps=3):
+    """
+    EMI, total interest and total payable of `amount` for every product over
+    its tenure range (every `tenure_step` months) × ROI range (`roi_steps` points).
+
+    All products are evaluated in one broadcast over a (product, roi, tenure)
+    array padded with NaN. Returns (grids, skipped) — grids are dicts with
+    "rois", "tenures" and row-per-ROI matrices; skipped lists products without
+    a tenure or ROI range.
+    """
+    grids, skipped, tenure_lists, roi_lists = [], [], [], []
+    for product in products:
+        tenures, rois = _tenure_points(product, tenure_step), _roi_points(product, roi_steps)
+        if not tenures or not rois:
+            skipped.append((product, "tenure range not set" if not tenures else "ROI range not set"))
+            continue
+        grids.append(product)
+        tenure_lists.append(tenures)
+        roi_lists.append(rois)
+    if not grids:
+        return [], skipped
+
+    width_t = max(len(t) for t in tenure_lists)
+    width_r = max(len(r) for r in roi_lists)
+    tenure = np.full((len(grids), width_t), np.nan)
+    roi = np.full((len(grids), width_r), np.nan)
+    for i, (tenures, rois) in enumerate(zip(tenure_lists, roi_lists)):
+        tenure[i, :len(tenures)] = tenures
+        roi[i, :len(rois)] = rois
+
+    amount = float(amount)
+    monthly = emi(amount, roi[:, :, None], tenure[:, None, :])        # (products, rois, tenures)
+    payable = monthly * tenure[:, None, :]
+    interest = payable - amount
+    monthly, payable, interest = (np.round(a, 2) for a in (monthly, payable, interest))
+
+    results = []
+    for i, product in enumerate(grids):
+        rows, cols = len(roi_lists[i]), len(tenure_lists[i])
+        results.append({
+            "product": product,
+            "rois": roi_lists[i],
+            "tenures": tenure_lists[i],
+            "emi": monthly[i, :rows, :cols].tolist(),
+            "total_interest": interest[i, :rows, :cols].tolist(),
+            "total_payable": payable[i, :rows, :cols].tolist(),
+        })
+    return results, skipped
+
+
+def amortization_rows(amount, annual_rate_percent, months, chunk=120):
+    """
+    Yield {"month", "emi", "principal", "interest", "balance"} for each month,
+    computed `chunk` months at a time from the closed-form balance
+    B(k) = P(1+r)^k − E((1+r)^k − 1)/r, so long schedules stream without
+    building the whole table.
+    """
+    amount, months = float(amount), int(months)
+    rate = float(annual_rate_percent) / 1200.0
+    monthly = float(emi(amount, annual_rate_percent, months))
+    for start in range(0, months, chunk):
+        k = np.arange(start, min(start + chunk, months) + 1, dtype=float)
+        if rate > 0:
+            growth = np.power(1.0 + rate, k)
+            balance = amount * growth - monthly * (growth - 1.0) / rate
+        else:
+            balance = amount - monthly * k
+        balance[-1] = 0.0 if k[-1] == months else balance[-1]
+        interest = balance[:-1] * rate
+        principal = balance[:-1] - balance[1:]
+        for i in range(len(k) - 1):
+            yield {
+                "month": int(k[i + 1]),
+                "emi": round(monthly, 2),
+                "principal": round(float(principal[i]), 2),
+                "interest": round(float(interest[i]), 2),
+                "balance": round(max(float(balance[i + 1]), 0.0), 2),
+            }
@@ -0,0 +1,96 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from bankapp.fast_reads import bank_rows, product_rows, salary_criteria_rows, company_rows
+from bankapp.models import Bank, Product, CompanyCategory, Company, SalaryCriteria
+from bankapp.serializers import BankSerializer, ProductSerializer, SalaryCriteriaSerializer, CompanySerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the serializer and .values() read paths of the list endpoints: "
+        "checks the rendered JSON is identical and reports the per-row cost of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Create N synthetic banks/products/companies first (rolled back afterwards)")
+        parser.add_argument("--repeat", type=int, default=5, help="Timing runs per path (best is reported)")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options["seed"]:
+                    self._seed(options["seed"])
+                self._run(options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, n):
+        categories = CompanyCategory.objects.bulk_create(
+            [CompanyCategory(category_name=f"BENCH CAT {i}") for i in range(10)]
+        )
+        banks = Bank.objects.bulk_create(
+            [Bank(bank_name=f"Bench Bank {i}", pincode="110001,110002,110003") for i in range(n)]
+        )
+        products = Product.objects.bulk_create([
+            Product(bank=bank, product_title=f"Bench Loan {i}", min_age=21, max_age=60, min_tenure=12,
+                    max_tenure=60, min_loan_amount=50000, max_loan_amount=2500000, min_roi=10.5,
+                    max_roi=18.25, foir_details="50% of net salary")
+            for i, bank in enumerate(banks)
+        ])
+        SalaryCriteria.objects.bulk_create([
+            SalaryCriteria(product=product, category=category, min_salary=20000 + 1000 * j)
+            for product in products for j, category in enumerate(categories)
+        ])
+        Company.objects.bulk_create([
+            Company(company_name=f"Bench Company {i}", category=categories[i % len(categories)])
+            for i in range(n)
+        ])
+
+    def _run(self, repeat):
+        renderer = JSONRenderer()
+        cases = [
+            ("banks", Bank.objects.all().order_by("bank_name"), BankSerializer, bank_rows),
+            ("products", Product.objects.all(), ProductSerializer, product_rows),
+            ("salary-criteria", SalaryCriteria.objects.all(), SalaryCriteriaSerializer, salary_criteria_rows),
+            ("companies", Company.objects.all(), CompanySerializer, company_rows),
+        ]
+        for name, queryset, serializer_class, fast in cases:
+            rows = queryset.count()
+            if not rows:
+                self.stdout.write(f"{name:16} no rows, skipped")
+                continue
+
+            def slow():
+                return serializer_class(serializer_class.setup_eager_loading(queryset.all()), many=True).data
+
+            def quick():
+                return fast(queryset.all())
+
+            same = renderer.render(slow()) == renderer.render(quick())
+            slow_t = self._best(slow, repeat)
+            fast_t = self._best(quick, repeat)
+            self.stdout.write(
+                f"{name:16} rows={rows:<7} serializer={slow_t / rows * 1e6:8.1f}us/row "
+                f"values={fast_t / rows * 1e6:8.1f}us/row speedup={slow_t / fast_t:5.1f}x "
+                f"identical={'yes' if same else 'NO'}"
+            )
+
+    @staticmethod
+    def _best(fn, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
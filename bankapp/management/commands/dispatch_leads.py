@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from bankapp.lead_outbox import dispatch_once, run_dispatcher
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver pending partner-bank leads from the outbox in per-bank batches "
+        "(webhook or file drop, see BANKAPP_LEAD_DELIVERY), retrying failures with backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Deliver what is due now and exit")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep when nothing is due")
+        parser.add_argument("--batch-size", type=int, default=None, help="Override BATCH_SIZE")
+
+    def handle(self, *args, **options):
+        if not options["once"]:
+            self.stdout.write("Dispatching leads (Ctrl+C to stop)...")
+            try:
+                run_dispatcher(options["interval"], batch_size=options["batch_size"])
+            except KeyboardInterrupt:
+                pass
+            return
+
+        totals = {"batches": 0, "delivered": 0, "failed_batches": 0, "dead": 0}
+        while True:
+            summary = dispatch_once(batch_size=options["batch_size"])
+            if not summary["batches"]:
+                break
+            for key in totals:
+                totals[key] += summary[key]
+            if summary["failed_batches"] == summary["batches"]:
+                break  # everything due is failing; leave it to the backoff
+        self.stdout.write(f"Lead dispatch: {totals}")
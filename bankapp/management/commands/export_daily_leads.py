@@ -0,0 +1,41 @@
+import multiprocessing
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bankapp.lead_exports import export_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Write one gzip CSV per bank with the day's leads and eligibility snapshot, "
+        "regenerating only files that are missing or whose leads changed (see manifest.json)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Day to export, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument("--output-dir", help="Override BANKAPP_LEAD_EXPORT['OUTPUT_DIR']")
+        parser.add_argument("--processes", type=int, default=min(4, multiprocessing.cpu_count()),
+                            help="Worker processes (1 runs inline)")
+        parser.add_argument("--bank", type=int, action="append", dest="banks", help="Only this bank id (repeatable)")
+        parser.add_argument("--force", action="store_true", help="Regenerate files even when unchanged")
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options["date"]) if options["date"] else date.today() - timedelta(days=1)
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+
+        def progress(bank_id, entry):
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"  bank {bank_id}: {entry['rows']} leads → {entry['file']} ({entry['bytes']} bytes)")
+
+        summary = export_day(
+            day, output_dir=options["output_dir"], processes=options["processes"],
+            bank_ids=options["banks"], force=options["force"], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['date']}: wrote {len(summary['written'])} bank files ({summary['rows_written']} leads), "
+            f"{summary['unchanged']} unchanged, {len(summary['removed'])} removed in {summary['seconds']}s "
+            f"→ {summary['directory']}"
+        ))
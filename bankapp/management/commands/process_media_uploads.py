@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from bankapp.media_uploads import process_upload
+from bankapp.models import MediaUpload
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload spooled bank logos / managed card images that are still pending "
+        "(e.g. after a restart), re-queueing uploads stuck in 'uploading'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-minutes", type=int, default=15,
+                            help="Treat 'uploading' rows untouched for this long as abandoned")
+        parser.add_argument("--retry-failed", action="store_true", help="Also retry uploads marked failed")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        cutoff = now - timedelta(minutes=options["stale_minutes"])
+        # updated_at is the claim time of an 'uploading' row (process_upload sets it)
+        MediaUpload.objects.filter(status="uploading", updated_at__lt=cutoff).update(status="pending", updated_at=now)
+        if options["retry_failed"]:
+            MediaUpload.objects.filter(status="failed").update(status="pending", attempts=0, updated_at=now)
+
+        results = {}
+        for upload_id in MediaUpload.objects.filter(status="pending").order_by("id").values_list("id", flat=True):
+            outcome = process_upload(upload_id)
+            results[outcome] = results.get(outcome, 0) + 1
+        self.stdout.write(f"Processed uploads: {results or 'none pending'}")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from bankapp.customer_search import BACKEND_PG_TRGM, INDEX_BATCH_SIZE, rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the customer search n-gram table (needed after customer writes that bypass "
+        "model signals). Not used when Postgres serves the search with pg_trgm."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=INDEX_BATCH_SIZE, help="Customers per batch")
+        parser.add_argument("--force", action="store_true", help="Rebuild even when pg_trgm is in use")
+
+    def handle(self, *args, **options):
+        if search_backend() == BACKEND_PG_TRGM and not options["force"]:
+            self.stdout.write("Customer search uses pg_trgm indexes; nothing to rebuild (use --force to fill the table anyway).")
+            return
+
+        def progress(customers, grams):
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"  {customers} customers, {grams} grams")
+
+        customers, grams = rebuild_index(batch_size=options["batch_size"], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {customers} customers ({grams} grams)"))
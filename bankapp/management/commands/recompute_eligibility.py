@@ -0,0 +1,32 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+
+from bankapp.recompute import recompute_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute eligibility for every customer against the current catalog, "
+        "sharding customers by id range across a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                            help="Worker processes (default: CPU count; 1 runs inline)")
+        parser.add_argument("--shard-size", type=int, default=10000, help="Customer ids per shard")
+
+    def handle(self, *args, **options):
+        def progress(done, total, customers):
+            if self.verbosity >= 2 or done == total:
+                self.stdout.write(f"  shard {done}/{total} — {customers} customers")
+
+        self.verbosity = options["verbosity"]
+        summary = recompute_all(
+            processes=options["processes"], shard_size=options["shard_size"], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {summary['customers']} customers → {summary['results']} eligible products "
+            f"in {summary['seconds']}s ({summary['customers_per_second']} customers/s, "
+            f"{summary['shards']} shards, {summary['processes']} processes)"
+        ))
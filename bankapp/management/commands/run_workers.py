@@ -0,0 +1,88 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from bankapp import jobs
+
+
+def _worker_main(index, kinds, poll_interval, max_jobs, exit_when_idle, stop_event):
+    import django
+    django.setup()  # no-op when forked, required with the spawn start method
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent coordinates shutdown
+    worker_id = f"{jobs.default_worker_id()}/{index}"
+    jobs.work(
+        worker_id=worker_id,
+        kinds=kinds,
+        poll_interval=poll_interval,
+        max_jobs=max_jobs,
+        stop=stop_event.is_set,
+        exit_when_idle=exit_when_idle,
+    )
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (bankapp.jobs) in a pool of processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                            help="Number of worker processes (default: CPU count)")
+        parser.add_argument("--kinds", default="", help="Comma-separated job kinds to run (default: all)")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--max-jobs", type=int, default=None,
+                            help="Recycle a worker process after this many jobs")
+        parser.add_argument("--stale-after", type=int, default=3600,
+                            help="Requeue 'running' jobs without a heartbeat for this many seconds")
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit")
+
+    def handle(self, *args, **options):
+        kinds = [k.strip() for k in options["kinds"].split(",") if k.strip()] or None
+        unknown = set(kinds or ()) - set(jobs.JOB_HANDLERS)
+        if unknown:
+            self.stderr.write(f"Unknown job kinds: {', '.join(sorted(unknown))}")
+            return
+
+        requeued = jobs.requeue_stale(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        # Children must not inherit the parent's DB connections
+        connections.close_all()
+        stop_event = multiprocessing.Event()
+        worker_args = (kinds, options["poll_interval"], options["max_jobs"], options["once"], stop_event)
+
+        def start(index):
+            # not daemonic: handlers such as eligibility_recompute start their own process pools
+            process = multiprocessing.Process(target=_worker_main, args=(index,) + worker_args)
+            process.start()
+            return process
+
+        processes = {i: start(i) for i in range(max(1, options["processes"]))}
+        self.stdout.write(f"Started {len(processes)} worker process(es)")
+
+        def shutdown(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        last_stale_check = time.monotonic()
+        while processes:
+            for index, process in list(processes.items()):
+                process.join(timeout=0.5)
+                if process.is_alive():
+                    continue
+                if stop_event.is_set() or options["once"]:
+                    processes.pop(index)
+                else:
+                    # crashed or recycled after --max-jobs: replace it
+                    processes[index] = start(index)
+            if time.monotonic() - last_stale_check > 60 and not stop_event.is_set():
+                jobs.requeue_stale(options["stale_after"])
+                connections.close_all()
+                last_stale_check = time.monotonic()
+
+        self.stdout.write("Workers stopped")
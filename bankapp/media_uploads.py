@@ -0,0 +1,207 @@
+"""
+Deferred media upload pipeline.
+
+`bank_list_create` / `managed_card_list_create` no longer push images to
+Cloudinary inside the request: the file is spooled to local disk, a
+MediaUpload row is recorded and the request returns with a pending status.
+A bounded thread pool then uploads the file through the configured
+storage backend, retries with backoff, and writes the stored value back to
+`Bank.bank_image` / `ManagedCard.image`.
+
+Settings (BANKAPP_MEDIA_UPLOADS):
+    SPOOL_DIR        local directory for files waiting to be uploaded
+    BACKEND          dotted path of the storage backend class
+    FILESYSTEM_ROOT  target directory of FileSystemBackend
+    DISPATCH         "thread" (in-process pool) or "jobs" (bankapp.jobs queue)
+    MAX_CONCURRENCY  upload threads per process
+    MAX_ATTEMPTS     tries before an upload is marked failed
+    RETRY_BACKOFF    seconds before the first retry (doubles each time)
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudinary import CloudinaryResource, uploader
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Bank, ManagedCard, MediaUpload
+
+logger = logging.getLogger(__name__)
+
+# MediaUpload.target → (model, CloudinaryField name)
+UPLOAD_TARGETS = {
+    "bank.bank_image": (Bank, "bank_image"),
+    "managedcard.image": (ManagedCard, "image"),
+}
+
+DEFAULT_OPTIONS = {
+    "SPOOL_DIR": os.path.join(str(settings.BASE_DIR), "media_spool"),
+    "BACKEND": "bankapp.media_uploads.CloudinaryBackend",
+    "DISPATCH": "thread",
+    "FILESYSTEM_ROOT": os.path.join(str(settings.BASE_DIR), "media_store"),
+    "MAX_CONCURRENCY": 4,
+    "MAX_ATTEMPTS": 3,
+    "RETRY_BACKOFF": 2.0,
+}
+
+
+def get_options():
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "BANKAPP_MEDIA_UPLOADS", {}))
+    return options
+
+
+# -------------------- Storage backends --------------------
+class CloudinaryBackend:
+    """Uploads to Cloudinary, returns the CloudinaryResource to store."""
+
+    def upload(self, path, target):
+        return uploader.upload_resource(path, resource_type="image", type="upload")
+
+
+class FileSystemBackend:
+    """
+    Local stand-in for Cloudinary (tests / offline dev): copies the file under
+    FILESYSTEM_ROOT and returns a resource in the same `image/upload/v<n>/<id>.<ext>` shape.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or get_options()["FILESYSTEM_ROOT"]
+
+    def upload(self, path, target):
+        os.makedirs(self.root, exist_ok=True)
+        base, ext = os.path.splitext(os.path.basename(path))
+        public_id = f"{target.replace('.', '_')}_{base}"
+        shutil.copyfile(path, os.path.join(self.root, public_id + ext))
+        return CloudinaryResource(
+            public_id=public_id, format=ext.lstrip(".") or None, version=str(int(time.time())),
+            type="upload", resource_type="image",
+        )
+
+
+def get_backend():
+    return import_string(get_options()["BACKEND"])()
+
+
+# -------------------- Enqueue --------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_options()["MAX_CONCURRENCY"], thread_name_prefix="media-upload"
+            )
+        return _executor
+
+
+def split_deferred_file(request, field_name):
+    """
+    Take an uploaded image out of the request payload so the serializer
+    saves the row without touching the storage backend.
+    Returns (data without the file, uploaded file or None).
+    """
+    upload = request.FILES.get(field_name)
+    if upload is None:
+        return request.data, None
+    data = {key: value for key, value in request.data.items() if key != field_name}
+    return data, upload
+
+
+def defer_upload(instance, field_name, uploaded_file):
+    """Spool `uploaded_file` locally and schedule its upload once the transaction commits."""
+    target = f"{instance._meta.model_name}.{field_name}"
+    if target not in UPLOAD_TARGETS:
+        raise ValueError(f"Unsupported upload target: {target}")
+
+    spool_dir = get_options()["SPOOL_DIR"]
+    os.makedirs(spool_dir, exist_ok=True)
+    _, ext = os.path.splitext(uploaded_file.name or "")
+    local_path = os.path.join(spool_dir, f"{uuid.uuid4().hex}{ext.lower()}")
+    with open(local_path, "wb") as fh:
+        for chunk in uploaded_file.chunks():
+            fh.write(chunk)
+
+    upload = MediaUpload.objects.create(
+        target=target,
+        object_id=instance.pk,
+        local_path=local_path,
+        original_name=uploaded_file.name,
+    )
+    if get_options()["DISPATCH"] == "jobs":
+        # Job row is written in the same transaction as the upload row
+        from .jobs import enqueue
+        enqueue("media_upload", {"upload_id": upload.pk}, priority=5, max_attempts=1)
+    else:
+        transaction.on_commit(lambda: dispatch(upload.pk))
+    return upload
+
+
+def dispatch(upload_id):
+    """Hand an upload to the background pool."""
+    _get_executor().submit(_run_in_thread, upload_id)
+
+
+def _run_in_thread(upload_id):
+    close_old_connections()
+    try:
+        process_upload(upload_id)
+    except Exception:
+        logger.exception("Media upload %s crashed", upload_id)
+    finally:
+        close_old_connections()
+
+
+# -------------------- Worker --------------------
+def process_upload(upload_id, backend=None, sleep=time.sleep):
+    """
+    Push one pending upload to the backend, retrying with exponential backoff.
+    Returns the final status, or None when another worker owns the upload.
+    Every status change sets updated_at explicitly: .update() skips auto_now,
+    and process_media_uploads judges abandoned claims by it.
+    """
+    options = get_options()
+    backend = backend or get_backend()
+
+    while True:
+        claimed = MediaUpload.objects.filter(pk=upload_id, status="pending").update(
+            status="uploading", attempts=F("attempts") + 1, updated_at=timezone.now()
+        )
+        if not claimed:
+            return None
+        upload = MediaUpload.objects.get(pk=upload_id)
+        model, field_name = UPLOAD_TARGETS[upload.target]
+
+        try:
+            resource = backend.upload(upload.local_path, upload.target)
+            stored = model._meta.get_field(field_name).get_prep_value(resource)
+            # .update() so the model's CloudinaryField doesn't try to upload again
+            model.objects.filter(pk=upload.object_id).update(**{field_name: stored})
+        except Exception as e:
+            final = upload.attempts >= options["MAX_ATTEMPTS"]
+            MediaUpload.objects.filter(pk=upload_id).update(
+                status="failed" if final else "pending", last_error=str(e), updated_at=timezone.now()
+            )
+            if final:
+                logger.warning("Media upload %s failed after %s attempts: %s", upload_id, upload.attempts, e)
+                return "failed"
+            sleep(options["RETRY_BACKOFF"] * (2 ** (upload.attempts - 1)))
+            continue
+
+        MediaUpload.objects.filter(pk=upload_id).update(status="done", last_error=None, updated_at=timezone.now())
+        try:
+            os.remove(upload.local_path)
+        except OSError:
+            pass
+        return "done"
@@ -0,0 +1,59 @@
+"""
+Cloudinary delivery URLs for bank logos and managed-card images.
+
+Building a URL (and signing it, when BANKAPP_CLOUDINARY_SIGN_URLS is on)
+is pure string work on (public_id, version, format, transformation), so
+results are memoized per resource and preset instead of being rebuilt for
+every row of every list response.
+"""
+from functools import lru_cache
+
+from cloudinary import utils as cloudinary_utils
+from django.conf import settings
+
+
+# Transformation presets; "original" is what CloudinaryResource.url returns
+IMAGE_PRESETS = {
+    "original": {},
+    "thumb": {"width": 160, "height": 160, "crop": "limit", "quality": "auto", "fetch_format": "auto"},
+}
+
+# Widths offered in `srcset` so browsers fetch the smallest adequate logo
+SRCSET_WIDTHS = (160, 320, 640, 960)
+
+for _width in SRCSET_WIDTHS:
+    IMAGE_PRESETS[f"w{_width}"] = {"width": _width, "crop": "limit", "quality": "auto", "fetch_format": "auto"}
+
+
+@lru_cache(maxsize=8192)
+def _build_url(public_id, version, fmt, delivery_type, resource_type, preset, sign_url):
+    options = dict(IMAGE_PRESETS[preset])
+    if sign_url:
+        options["sign_url"] = True
+    url, _ = cloudinary_utils.cloudinary_url(
+        public_id, format=fmt, version=version, type=delivery_type,
+        resource_type=resource_type or "image", **options
+    )
+    return url
+
+
+def image_url(resource, preset="original"):
+    """Delivery URL of a CloudinaryResource for a preset (None when there is no image)."""
+    if not resource or not getattr(resource, "public_id", None):
+        return None
+    return _build_url(
+        resource.public_id,
+        resource.version,
+        resource.format,
+        resource.type,
+        resource.resource_type,
+        preset,
+        getattr(settings, "BANKAPP_CLOUDINARY_SIGN_URLS", False),
+    )
+
+
+def image_srcset(resource):
+    """`srcset` attribute value with one width-limited variant per SRCSET_WIDTHS entry."""
+    if not resource or not getattr(resource, "public_id", None):
+        return None
+    return ", ".join(f"{image_url(resource, f'w{width}')} {width}w" for width in SRCSET_WIDTHS)
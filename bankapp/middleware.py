@@ -0,0 +1,113 @@
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # optional dependency — gzip only
+    brotli = None
+
+
+DEFAULT_COMPRESSION = {
+    "MIN_SIZE": 1024,          # bytes; smaller bodies aren't worth the CPU
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 5,       # 4-6 is the sweet spot for on-the-fly compression
+    "CONTENT_TYPES": ("application/json",),
+}
+
+_accept_encoding_re = _lazy_re_compile(r"\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?")
+
+
+def _compression_settings():
+    options = dict(DEFAULT_COMPRESSION)
+    options.update(getattr(settings, "BANKAPP_COMPRESSION", {}))
+    return options
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q-values."""
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        match = _accept_encoding_re.match(part)
+        if not match or not match.group(1):
+            continue
+        try:
+            q = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        weights[match.group(1).lower()] = q
+
+    wildcard = weights.get("*", 0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0
+    for encoding in candidates:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress API responses above BANKAPP_COMPRESSION["MIN_SIZE"] with brotli
+    (when installed) or gzip, negotiated per request via Accept-Encoding.
+    Runs natively in both the WSGI and ASGI handler chains, so async requests
+    don't take a thread hop through this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        options = _compression_settings()
+        self.min_size = options["MIN_SIZE"]
+        self.gzip_level = options["GZIP_LEVEL"]
+        self.brotli_quality = options["BROTLI_QUALITY"]
+        self.content_types = tuple(options["CONTENT_TYPES"])
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in self.content_types:
+            return response
+
+        # Caches must key on the encoding even when this body stays plain
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < self.min_size:
+            return response
+
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING"))
+        if encoding == "br":
+            compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        elif encoding == "gzip":
+            compressed = gzip.compress(response.content, compresslevel=self.gzip_level, mtime=0)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # A strong ETag no longer matches the transformed body
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
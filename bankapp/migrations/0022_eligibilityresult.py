@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0021_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EligibilityResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_salary_required', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eligibility_results', to='bankapp.bank')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eligibility_results', to='bankapp.customer')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eligibility_results', to='bankapp.product')),
+            ],
+        ),
+    ]
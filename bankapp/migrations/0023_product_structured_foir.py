@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:57
+
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copy of bankapp.loan_math.parse_foir as it was when this migration was
+# written: later changes to the app's parser must not change what it does.
+_PERCENT_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(%|percent)?(?:\s*(?:-|–|to)\s*\d+(?:\.\d+)?)?\s*(%|percent)?",
+    re.IGNORECASE,
+)
+_IGNORES_OBLIGATIONS_RE = re.compile(
+    r"\b(?:excl\w*|exclusive of|without|ignor\w*|not including)\b[^.;]*\b(?:emi|obligation|loan)",
+    re.IGNORECASE,
+)
+
+
+def parse_foir(text):
+    if not text:
+        return None, "deduct"
+    handling = "ignore" if _IGNORES_OBLIGATIONS_RE.search(text) else "deduct"
+    keyword = text.lower().find("foir")
+    for candidate in ([text[keyword:]] if keyword >= 0 else []) + [text]:
+        for match in _PERCENT_RE.finditer(candidate):
+            value = Decimal(match.group(1))
+            if value <= 1 and not (match.group(2) or match.group(3)):
+                value *= 100  # written as a ratio
+            if 0 < value <= 100:
+                return value.quantize(Decimal("0.01")), handling
+    return None, handling
+
+
+def parse_existing_foir(apps, schema_editor):
+    Product = apps.get_model("bankapp", "Product")
+    changed = []
+    for product in Product.objects.exclude(foir_details__isnull=True).exclude(foir_details="").only("id", "foir_details"):
+        product.foir_percent, product.obligation_handling = parse_foir(product.foir_details)
+        changed.append(product)
+    Product.objects.bulk_update(changed, ["foir_percent", "obligation_handling"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0022_eligibilityresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='foir_percent',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='obligation_handling',
+            field=models.CharField(choices=[('deduct', 'Existing EMIs count against FOIR'), ('ignore', 'Existing EMIs are not counted')], default='deduct', max_length=10),
+        ),
+        migrations.RunPython(parse_existing_foir, migrations.RunPython.noop),
+    ]
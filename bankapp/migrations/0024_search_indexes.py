@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0023_product_structured_foir'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['bank', 'min_roi'], name='product_bank_roi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_roi', 'max_roi'], name='product_roi_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_loan_amount', 'max_loan_amount'], name='product_loan_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['min_tenure', 'max_tenure'], name='product_tenure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salarycriteria',
+            index=models.Index(fields=['product', 'category', 'min_salary'], name='criteria_product_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salarycriteria',
+            index=models.Index(fields=['category', 'min_salary'], name='criteria_cat_salary_idx'),
+        ),
+    ]
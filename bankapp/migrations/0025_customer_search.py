@@ -0,0 +1,106 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:04
+
+import django.db.models.deletion
+from django.db import DatabaseError, migrations, models, transaction
+
+SEARCH_FIELDS = ("full_name", "email", "phone", "pan")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """GIN trigram indexes for icontains on Postgres; skipped when pg_trgm can't be installed."""
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return  # no privilege: customer_search falls back to the n-gram table
+    with connection.cursor() as cursor:
+        for field in SEARCH_FIELDS:
+            # same expression Django emits for icontains: UPPER("field"::text)
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS customer_{field}_trgm ON bankapp_customer '
+                f'USING gin (UPPER("{field}"::text) gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for field in SEARCH_FIELDS:
+            cursor.execute(f"DROP INDEX IF EXISTS customer_{field}_trgm")
+
+
+# Frozen copies of bankapp.customer_search.customer_grams and bankapp.fast_writes.insert_rows:
+# later changes to the app code must not change what this migration writes.
+def customer_grams(values):
+    out = set()
+    for value in values:
+        text = (value or "").lower()
+        out |= {text[i:i + 3] for i in range(len(text) - 2)}
+    return out
+
+
+def insert_grams(connection, entries, batch_size=400):
+    """Multi-row INSERT of (gram, customer_id) pairs (≤ 800 parameters per statement)."""
+    quote = connection.ops.quote_name
+    insert = f"INSERT INTO {quote('bankapp_customersearchgram')} ({quote('gram')}, {quote('customer_id')}) VALUES "
+    with connection.cursor() as cursor:
+        for i in range(0, len(entries), batch_size):
+            chunk = entries[i:i + batch_size]
+            cursor.execute(insert + ", ".join(["(%s, %s)"] * len(chunk)), [v for row in chunk for v in row])
+
+
+def fill_search_grams(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'customer_full_name_trgm'")
+            if cursor.fetchone():
+                return  # pg_trgm serves the search
+    Customer = apps.get_model("bankapp", "Customer")
+    entries = []
+    for row in Customer.objects.order_by("id").values_list("id", *SEARCH_FIELDS).iterator(chunk_size=2000):
+        entries.extend((gram, row[0]) for gram in customer_grams(row[1:]))
+        if len(entries) >= 20000:
+            insert_grams(connection, entries)
+            entries = []
+    insert_grams(connection, entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0024_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['pincode', 'id'], name='customer_pincode_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['last_eligibility_check', 'id'], name='customer_checked_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='customersearchgram',
+            name='customer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_grams', to='bankapp.customer'),
+        ),
+        migrations.AddConstraint(
+            model_name='customersearchgram',
+            constraint=models.UniqueConstraint(fields=('gram', 'customer'), name='customer_gram_unique'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.RunPython(fill_search_grams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0026_lead_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerinterest',
+            index=models.Index(fields=['bank', 'created_at'], name='interest_bank_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eligibilityresult',
+            index=models.Index(fields=['customer', 'bank', 'product'], name='eligibility_cust_bank_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:26
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bankapp', '0027_lead_export_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFunnelStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('region', models.CharField(default='', max_length=10)),
+                ('eligible', models.PositiveIntegerField(default=0)),
+                ('interests', models.PositiveIntegerField(default=0)),
+                ('eligible_interests', models.PositiveIntegerField(default=0)),
+                ('bank', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='funnel_stats', to='bankapp.bank')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='funnel_stats', to='bankapp.companycategory')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='funnel_stats', to='bankapp.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(models.F('day'), models.F('bank'), django.db.models.functions.comparison.Coalesce('product', 0), django.db.models.functions.comparison.Coalesce('category', 0), models.F('region'), name='funnel_stat_unique')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from cloudinary.models import CloudinaryField
 from django.contrib.auth.hashers import make_password, check_password
 from datetime import date
@@ -28,6 +29,13 @@ class Customer(models.Model):
     # ✅ New field to restrict one eligibility check per day
     last_eligibility_check = models.DateField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # admin customer search: filter + keyset on id (see customer_search.py)
+            models.Index(fields=["pincode", "id"], name="customer_pincode_id_idx"),
+            models.Index(fields=["last_eligibility_check", "id"], name="customer_checked_id_idx"),
+        ]
+
     def __str__(self):
         return self.full_name
 
@@ -76,6 +84,23 @@ class Product(models.Model):
     # FOIR (string so it can store formatted descriptions like "40% of salary")
     foir_details = models.CharField(max_length=255, null=True, blank=True)
 
+    # Structured FOIR used for loan sizing (parsed from foir_details when not given — see loan_math.py)
+    OBLIGATION_CHOICES = (
+        ("deduct", "Existing EMIs count against FOIR"),
+        ("ignore", "Existing EMIs are not counted"),
+    )
+    foir_percent = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    obligation_handling = models.CharField(max_length=10, choices=OBLIGATION_CHOICES, default="deduct")
+
+    class Meta:
+        indexes = [
+            # products/search/ range filters and the bank + ROI ordering (see product_search.py)
+            models.Index(fields=["bank", "min_roi"], name="product_bank_roi_idx"),
+            models.Index(fields=["min_roi", "max_roi"], name="product_roi_idx"),
+            models.Index(fields=["min_loan_amount", "max_loan_amount"], name="product_loan_idx"),
+            models.Index(fields=["min_tenure", "max_tenure"], name="product_tenure_idx"),
+        ]
+
     def __str__(self):
         return f"{self.bank.bank_name} - {self.product_title}"
     
@@ -87,6 +112,11 @@ class CustomerInterest(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)  # ✅ New field added
 
+    class Meta:
+        indexes = [
+            # per-bank daily lead exports (lead_exports.py)
+            models.Index(fields=["bank", "created_at"], name="interest_bank_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.customer.full_name} - {self.bank.bank_name} ({self.product.product_title if self.product else 'No Product'})"
@@ -143,5 +173,162 @@ class SalaryCriteria(models.Model):
     category = models.ForeignKey(CompanyCategory, on_delete=models.CASCADE, related_name="salary_criteria")
     min_salary = models.DecimalField(max_digits=12, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # category-with-salary search: per product (EXISTS) and per category
+            models.Index(fields=["product", "category", "min_salary"], name="criteria_product_cat_idx"),
+            models.Index(fields=["category", "min_salary"], name="criteria_cat_salary_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.product_title} - {self.category.category_name} - {self.min_salary}"            
+
+# 🔹 Deferred image uploads (bank logos / managed cards) — see media_uploads.py
+class MediaUpload(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("uploading", "Uploading"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    target = models.CharField(max_length=50)          # e.g. "bank.bank_image"
+    object_id = models.PositiveIntegerField()
+    local_path = models.CharField(max_length=500)
+    original_name = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.target}#{self.object_id} ({self.status})"
+
+
+# 🔹 Background jobs (catalog imports, media uploads, recomputation, exports) — see jobs.py
+class Job(models.Model):
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    )
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    priority = models.IntegerField(default=0)  # higher runs first
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+
+    progress = models.FloatField(default=0)  # percent
+    progress_message = models.CharField(max_length=255, null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # claim query: status='queued' ORDER BY priority DESC, run_after
+            models.Index(fields=["status", "-priority", "run_after"], name="job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}#{self.pk} ({self.status})"
+
+
+# 🔹 Precomputed eligibility (one row per eligible customer/product) — see recompute.py
+class EligibilityResult(models.Model):
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="eligibility_results")
+    bank = models.ForeignKey(Bank, on_delete=models.CASCADE, related_name="eligibility_results")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="eligibility_results")
+    min_salary_required = models.DecimalField(max_digits=12, decimal_places=2)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # eligibility snapshot lookups of the daily lead exports (lead_exports.py)
+            models.Index(fields=["customer", "bank", "product"], name="eligibility_cust_bank_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id} → {self.product_id}"
+
+
+# 🔹 Customer search n-grams (used when pg_trgm isn't available) — see customer_search.py
+class CustomerSearchGram(models.Model):
+    gram = models.CharField(max_length=3)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="search_grams")
+
+    class Meta:
+        constraints = [
+            # also the lookup index: gram → customers
+            models.UniqueConstraint(fields=["gram", "customer"], name="customer_gram_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.gram!r} → {self.customer_id}"
+
+
+# 🔹 Lead delivery outbox (written in the same transaction as each CustomerInterest) — see lead_outbox.py
+class LeadOutbox(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("delivered", "Delivered"),
+        ("failed", "Failed"),
+    )
+
+    interest = models.OneToOneField(CustomerInterest, on_delete=models.SET_NULL, null=True, blank=True, related_name="outbox")
+    bank = models.ForeignKey(Bank, on_delete=models.CASCADE, related_name="lead_outbox")
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    batch_id = models.CharField(max_length=64, null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # dispatcher claim: status='pending' AND next_attempt_at <= now, per bank
+            models.Index(fields=["status", "next_attempt_at", "bank"], name="lead_outbox_due_idx"),
+            models.Index(fields=["status", "delivered_at"], name="lead_outbox_delivered_idx"),
+        ]
+
+    def __str__(self):
+        return f"lead#{self.pk} → bank {self.bank_id} ({self.status})"
+
+
+# 🔹 Daily eligibility → interest funnel counters (incremented on each check / interest) — see funnel.py
+class DailyFunnelStat(models.Model):
+    day = models.DateField()
+    bank = models.ForeignKey(Bank, on_delete=models.CASCADE, related_name="funnel_stats")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name="funnel_stats")
+    category = models.ForeignKey(CompanyCategory, on_delete=models.CASCADE, null=True, blank=True, related_name="funnel_stats")
+    region = models.CharField(max_length=10, default="")  # pincode prefix, "" when unknown
+
+    eligible = models.PositiveIntegerField(default=0)            # checks where the product was eligible
+    interests = models.PositiveIntegerField(default=0)           # interests created
+    eligible_interests = models.PositiveIntegerField(default=0)  # ... by applicants eligible for the product
+
+    class Meta:
+        constraints = [
+            # upsert target of funnel.increment_stats (NULL product / category count as one value)
+            models.UniqueConstraint(
+                "day", "bank", Coalesce("product", 0), Coalesce("category", 0), "region",
+                name="funnel_stat_unique",
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.product.product_title} - {self.category.category_name} - {self.min_salary}"            
\ No newline at end of file
+        return f"{self.day} bank {self.bank_id} product {self.product_id}: {self.eligible} → {self.interests}"
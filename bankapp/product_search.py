@@ -0,0 +1,180 @@
+"""
+Catalog search for the marketplace (products/search/).
+
+Filters, all optional:
+
+    roi_min / roi_max        the product's ROI range overlaps [roi_min, roi_max]
+    loan_min / loan_max      the product's loan amount range overlaps [loan_min, loan_max]
+    tenure_min / tenure_max  the product's tenure range overlaps [tenure_min, tenure_max]
+    age                      the product's age range contains age
+    bank                     product belongs to one of these bank ids
+    category (+ salary)      product has salary criteria for the category
+                             (and the salary meets one of them)
+
+Missing bounds follow the rest of the app: a single ROI / tenure bound is a
+one-point range (loan_math), a product without either doesn't match that
+filter; a missing min loan is 0 and a missing max loan is uncapped; a
+product without a full age range accepts any age (CatalogSnapshot.age_allows).
+
+Matching runs over this process's catalog snapshot when one is already
+loaded and current, otherwise as one query on the Product / SalaryCriteria
+search indexes, so a cold worker doesn't load the whole catalog for a single
+search. Bank facet counts use every filter except `bank`, so they show what
+each bank would add to the results.
+"""
+from collections import Counter
+
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.functions import Coalesce, Lower
+
+from .models import CompanyCategory, Product, SalaryCriteria
+
+
+def resolve_category_filter(value, snapshot=None):
+    """Category id or name (any case, `CAT_A` or `CAT A`) → category_id, or None."""
+    value = str(value).strip()
+    if value.isdigit():
+        category_id = int(value)
+        if snapshot is not None:
+            return category_id if category_id in snapshot.category_names else None
+        return category_id if CompanyCategory.objects.filter(category_id=category_id).exists() else None
+    if snapshot is not None:
+        return snapshot.category_id(value)
+    return (
+        CompanyCategory.objects.filter(category_name__iexact=value.replace("_", " "))
+        .values_list("category_id", flat=True).first()
+    )
+
+
+# -------------------- snapshot path --------------------
+def _point_range(low, high):
+    """(low, high) with a single bound used for both, or None."""
+    low = low if low is not None else high
+    high = high if high is not None else low
+    return None if low is None else (low, high)
+
+
+def _overlaps(bounds, low, high):
+    return bounds is not None and (low is None or bounds[1] >= low) and (high is None or bounds[0] <= high)
+
+
+def _snapshot_filter(snapshot, filters):
+    """Predicate for every filter except `bank`."""
+    roi_min, roi_max = filters.get("roi_min"), filters.get("roi_max")
+    tenure_min, tenure_max = filters.get("tenure_min"), filters.get("tenure_max")
+    loan_min = float(filters["loan_min"]) if filters.get("loan_min") is not None else None
+    loan_max = float(filters["loan_max"]) if filters.get("loan_max") is not None else None
+    age = filters.get("age")
+    category_id = filters.get("category_id")
+    salary = float(filters["salary"]) if filters.get("salary") is not None else None
+
+    def matches(product):
+        if (roi_min is not None or roi_max is not None) and not _overlaps(
+                _point_range(product.min_roi, product.max_roi), roi_min, roi_max):
+            return False
+        if (tenure_min is not None or tenure_max is not None) and not _overlaps(
+                _point_range(product.min_tenure, product.max_tenure), tenure_min, tenure_max):
+            return False
+        if loan_max is not None and (product.min_loan_amount or 0) > loan_max:
+            return False
+        if loan_min is not None and product.max_loan_amount is not None and product.max_loan_amount < loan_min:
+            return False
+        if age is not None and not snapshot.age_allows(product, age):
+            return False
+        if category_id is not None:
+            salaries = snapshot.criteria.get((product.id, category_id))
+            if not salaries or (salary is not None and not any(salary >= m for m in salaries)):
+                return False
+        return True
+    return matches
+
+
+def _snapshot_sort_key(sort):
+    if sort == "roi":
+        def key(p):
+            low = p.min_roi if p.min_roi is not None else p.max_roi
+            return (low is None, low or 0, p.id)
+    elif sort == "max_loan":
+        def key(p):
+            return (p.max_loan_amount is None, -(p.max_loan_amount or 0), p.id)
+    elif sort == "title":
+        def key(p):
+            return (p.product_title.lower(), p.id)
+    else:
+        def key(p):
+            return p.id
+    return key
+
+
+def search_snapshot(snapshot, filters, sort="id"):
+    """(ordered product ids, {bank_id: count}) from the catalog snapshot."""
+    matches = list(filter(_snapshot_filter(snapshot, filters), snapshot.products))
+    facets = Counter(p.bank_id for p in matches)
+    banks = filters.get("bank")
+    if banks:
+        banks = set(banks)
+        matches = [p for p in matches if p.bank_id in banks]
+    matches.sort(key=_snapshot_sort_key(sort))
+    return [p.id for p in matches], dict(facets)
+
+
+# -------------------- database path --------------------
+def _range_q(low_field, high_field, low, high):
+    """Overlap test with a single stored bound used for both ends (index-friendly ORs)."""
+    q = Q(**{f"{low_field}__isnull": False}) | Q(**{f"{high_field}__isnull": False})
+    if high is not None:
+        q &= Q(**{f"{low_field}__lte": high}) | Q(**{f"{low_field}__isnull": True, f"{high_field}__lte": high})
+    if low is not None:
+        q &= Q(**{f"{high_field}__gte": low}) | Q(**{f"{high_field}__isnull": True, f"{low_field}__gte": low})
+    return q
+
+
+def _filtered_queryset(filters):
+    """Product queryset with every filter except `bank`."""
+    qs = Product.objects.all()
+    if filters.get("roi_min") is not None or filters.get("roi_max") is not None:
+        qs = qs.filter(_range_q("min_roi", "max_roi", filters.get("roi_min"), filters.get("roi_max")))
+    if filters.get("tenure_min") is not None or filters.get("tenure_max") is not None:
+        qs = qs.filter(_range_q("min_tenure", "max_tenure", filters.get("tenure_min"), filters.get("tenure_max")))
+    if filters.get("loan_max") is not None:
+        qs = qs.filter(Q(min_loan_amount__lte=filters["loan_max"]) | Q(min_loan_amount__isnull=True))
+    if filters.get("loan_min") is not None:
+        qs = qs.filter(Q(max_loan_amount__gte=filters["loan_min"]) | Q(max_loan_amount__isnull=True))
+    if filters.get("age") is not None:
+        age = filters["age"]
+        # Same as age_allows: a missing (or 0) bound means no age restriction
+        qs = qs.filter(
+            Q(min_age__lte=age, max_age__gte=age)
+            | Q(min_age__isnull=True) | Q(max_age__isnull=True) | Q(min_age=0) | Q(max_age=0)
+        )
+    if filters.get("category_id") is not None:
+        criteria = SalaryCriteria.objects.filter(product=OuterRef("pk"), category_id=filters["category_id"])
+        if filters.get("salary") is not None:
+            criteria = criteria.filter(min_salary__lte=filters["salary"])
+        qs = qs.filter(Exists(criteria))
+    return qs
+
+
+_DB_ORDERING = {
+    "id": ("id",),
+    "roi": (Coalesce("min_roi", "max_roi").asc(nulls_last=True), "id"),
+    "max_loan": (F("max_loan_amount").desc(nulls_last=True), "id"),
+    "title": (Lower("product_title"), "id"),
+}
+
+
+def search_database(filters, sort="id"):
+    """(ordered product id queryset, {bank_id: count}) as indexed queries."""
+    qs = _filtered_queryset(filters)
+    facets = dict(qs.order_by().values("bank_id").annotate(n=Count("id")).values_list("bank_id", "n"))
+    if filters.get("bank"):
+        qs = qs.filter(bank_id__in=filters["bank"])
+    return qs.order_by(*_DB_ORDERING[sort]).values_list("id", flat=True), facets
+
+
+def bank_facets(counts, bank_names):
+    """[{"bank_id", "bank_name", "count"}], most results first."""
+    return sorted(
+        ({"bank_id": bank_id, "bank_name": bank_names.get(bank_id), "count": n} for bank_id, n in counts.items()),
+        key=lambda row: (-row["count"], row["bank_name"] or "", row["bank_id"]),
+    )
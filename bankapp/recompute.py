@@ -0,0 +1,121 @@
+"""
+Full-base eligibility recomputation.
+
+Customers are split into id-range shards and evaluated in a process pool
+against ONE catalog snapshot (loaded in the parent and shipped to every
+worker), so every shard sees the same criteria even if the catalog changes
+mid-run. Each shard replaces its EligibilityResult rows in one transaction
+with multi-row INSERT statements.
+"""
+import multiprocessing
+import time
+from datetime import date
+
+from django import db
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .eligibility import CatalogSnapshot, calculate_age
+from .fast_writes import insert_rows
+from .models import Customer, EligibilityResult
+
+CUSTOMER_CHUNK_SIZE = 2000
+INSERT_BATCH_SIZE = 5000
+RESULT_FIELDS = ("customer", "bank", "product", "min_salary_required", "computed_at")
+
+# Per-process state set by _init_worker (or directly when running inline)
+_worker_state = {}
+
+
+def build_shards(shard_size):
+    """[(lo, hi), ...] half-open id ranges covering every customer."""
+    bounds = Customer.objects.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return []
+    return [(lo, min(lo + shard_size, bounds["hi"] + 1)) for lo in range(bounds["lo"], bounds["hi"] + 1, shard_size)]
+
+
+def _insert_results(rows):
+    """(customer_id, bank_id, product_id, min_salary, computed_at) tuples → multi-row INSERTs."""
+    insert_rows(EligibilityResult, RESULT_FIELDS, rows)
+
+
+def _init_worker(snapshot, today, computed_at):
+    import django
+    django.setup()  # no-op when forked, required with the spawn start method
+    db.connections.close_all()
+    _worker_state.update(snapshot=snapshot, today=today, computed_at=computed_at)
+
+
+def recompute_shard(bounds):
+    """Recompute one id range; returns (customers, results)."""
+    lo, hi = bounds
+    snapshot = _worker_state["snapshot"]
+    today = _worker_state["today"]
+    computed_at = connection.ops.adapt_datetimefield_value(_worker_state["computed_at"])
+
+    customers = (
+        Customer.objects.filter(id__gte=lo, id__lt=hi)
+        .order_by("id")
+        .values_list("id", "dob", "salary", "pincode", "companyName")
+    )
+    customer_count = result_count = 0
+    batch = []
+    with transaction.atomic():
+        EligibilityResult.objects.filter(customer_id__gte=lo, customer_id__lt=hi).delete()
+        for customer_id, dob, salary, pincode, company_name in customers.iterator(chunk_size=CUSTOMER_CHUNK_SIZE):
+            customer_count += 1
+            category_id = snapshot.resolve_category(company_name)
+            for product, min_salary in snapshot.eligible_products(calculate_age(dob, today), pincode, category_id, salary):
+                batch.append((customer_id, product.bank_id, product.id, min_salary, computed_at))
+            if len(batch) >= INSERT_BATCH_SIZE:
+                _insert_results(batch)
+                result_count += len(batch)
+                batch = []
+        _insert_results(batch)
+        result_count += len(batch)
+    return customer_count, result_count
+
+
+def recompute_all(processes=None, shard_size=10000, progress=None):
+    """
+    Recompute EligibilityResult for every customer.
+    `progress(done_shards, total_shards, customers)` is called after each shard.
+    Returns a summary dict with counts and throughput.
+    """
+    started = time.monotonic()
+    processes = processes or multiprocessing.cpu_count()
+    snapshot = CatalogSnapshot.load()
+    shards = build_shards(shard_size)
+    state = (snapshot, date.today(), timezone.now())
+
+    customers = results = 0
+
+    def collect(done, outcome):
+        nonlocal customers, results
+        customers += outcome[0]
+        results += outcome[1]
+        if progress:
+            progress(done, len(shards), customers)
+
+    if processes <= 1 or len(shards) <= 1:
+        _worker_state.update(snapshot=state[0], today=state[1], computed_at=state[2])
+        for done, shard in enumerate(shards, start=1):
+            collect(done, recompute_shard(shard))
+    else:
+        # Children fork with the parent's connection; close it so neither side reuses it
+        db.connections.close_all()
+        with multiprocessing.Pool(processes=processes, initializer=_init_worker, initargs=state) as pool:
+            for done, outcome in enumerate(pool.imap_unordered(recompute_shard, shards), start=1):
+                collect(done, outcome)
+
+    elapsed = time.monotonic() - started
+    return {
+        "customers": customers,
+        "results": results,
+        "shards": len(shards),
+        "processes": processes,
+        "seconds": round(elapsed, 2),
+        "customers_per_second": round(customers / elapsed, 1) if elapsed else None,
+    }
@@ -0,0 +1,50 @@
+"""
+High-speed JSON rendering for the bankapp API.
+
+`FastJSONRenderer` encodes with orjson when it is installed and otherwise
+behaves exactly like DRF's JSONRenderer. Values orjson doesn't handle the
+way DRF does (Decimal, datetime/date/time, lazy strings, querysets, ...)
+are routed through DRF's own encoder, so the output matches the stock
+renderer.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency — fall back to the stdlib renderer
+    orjson = None
+
+
+_drf_default = JSONEncoder().default
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder ("Z" suffix, no microsecond changes)
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+else:
+    ORJSON_OPTIONS = 0
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            # Pretty printing (browsable API, ?indent) isn't the hot path
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_drf_default, option=ORJSON_OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same JS-safety escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -1,5 +1,154 @@
+from collections import Counter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Customer, Bank, CustomerInterest, Product, User, ManagedCard, CompanyCategory, Company, SalaryCriteria
+from .models import Customer, Bank, CustomerInterest, Product, User, ManagedCard, CompanyCategory, Company, SalaryCriteria, MediaUpload, Job
+from .catalog_io import sync_salary_criteria
+from .customer_search import MIN_QUERY_LENGTH
+from .funnel import DIMENSIONS as FUNNEL_DIMENSIONS
+from .loan_math import parse_foir
+from .media_urls import image_url, image_srcset
+
+
+# 🔹 Queryset shaping: list serializers declare the relations they read,
+#    views call `setup_eager_loading(qs)` so a list costs a fixed number of queries
+class EagerLoadingMixin:
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
+# 🔹 Sparse fieldsets: `?fields=id,customer_details.full_name` keeps only the listed
+#    fields (dotted names reach into nested serializers), `?expand=bank_details`
+#    adds optional related representations declared in `expandable_fields`.
+def parse_sparse_params(query_params):
+    """Returns (fields tree or None, expand set). A tree value of None means "whole field"."""
+    fields = None
+    raw = query_params.get("fields")
+    if raw:
+        fields = {}
+        for item in raw.split(","):
+            parts = [p for p in item.strip().split(".") if p]
+            node = fields
+            for i, part in enumerate(parts):
+                last = i == len(parts) - 1
+                if last:
+                    node[part] = None
+                elif part in node and node[part] is None:
+                    break  # whole field already requested
+                else:
+                    node = node.setdefault(part, {})
+    expand = {e.strip() for e in query_params.get("expand", "").split(",") if e.strip()}
+    return fields, expand
+
+
+def _collect_columns(serializer, model, prefix, columns, related, many):
+    """
+    Walk the fields a serializer will read and record the model columns / joins
+    behind them. Returns False when a field reads something we can't map.
+    """
+    columns.add(prefix + model._meta.pk.name)
+    dependencies = getattr(serializer, "field_dependencies", {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in dependencies:
+            columns.update(prefix + column for column in dependencies[name])
+            continue
+        if field.source == "*":
+            return False
+
+        current, path = model, prefix
+        parts = field.source.split(".")
+        for i, attr in enumerate(parts):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return False
+            if model_field.one_to_many or model_field.many_to_many:
+                many.add(path + attr)  # loaded by prefetch, not narrowed
+                break
+            columns.add(path + attr)
+            if model_field.is_relation and (i < len(parts) - 1 or isinstance(field, serializers.Serializer)):
+                related.add(path + attr)
+                current, path = model_field.related_model, path + attr + "__"
+        else:
+            if isinstance(field, serializers.Serializer):
+                if not _collect_columns(field, current, path, columns, related, many):
+                    return False
+    return True
+
+
+class SparseFieldsMixin(EagerLoadingMixin):
+    expandable_fields = {}     # name -> (serializer class name, kwargs)
+    field_dependencies = {}    # method fields -> model columns they read
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        expand = kwargs.pop("expand", None)
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = fields
+        # naming an expandable field in ?fields= expands it too
+        self.expanded = (set(expand or ()) | set(fields or ())) & set(self.expandable_fields)
+
+        for name in self.expanded:
+            class_name, options = self.expandable_fields[name]
+            self.fields[name] = globals()[class_name](read_only=True, fields=(fields or {}).get(name), **options)
+
+        if fields is None:
+            return
+        for name in list(self.fields):
+            field = self.fields[name]
+            if field.write_only or name in self.expanded:
+                continue
+            if name not in fields:
+                self.fields.pop(name)
+            elif fields[name]:
+                self.fields[name] = self._restrict(name, field, fields[name])
+
+    @staticmethod
+    def _restrict(name, field, subfields):
+        options = {"read_only": True}
+        if field.source != name:
+            options["source"] = field.source
+        if isinstance(field, serializers.ListSerializer) and isinstance(field.child, SparseFieldsMixin):
+            return type(field.child)(many=True, fields=subfields, **options)
+        if isinstance(field, SparseFieldsMixin):
+            return type(field)(fields=subfields, **options)
+        return field
+
+    def shape_queryset(self, queryset, extra_columns=()):
+        """
+        Eager loading for this (possibly sparse) serializer: joins for expanded
+        relations, and `.only()` of the columns behind the kept fields
+        (plus `extra_columns` the view itself reads).
+        """
+        queryset = self.setup_eager_loading(queryset)
+        for name in self.expanded:
+            field = self.fields[name]
+            queryset = queryset.select_related(
+                field.source, *(f"{field.source}__{rel}" for rel in field.select_related_fields)
+            )
+        if self.sparse_fields is None:
+            return queryset
+
+        columns, related, many = set(), set(), set()
+        if not _collect_columns(self, queryset.model, "", columns, related, many):
+            return queryset
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        if not many:
+            queryset = queryset.prefetch_related(None)
+        return queryset.only(*columns, *extra_columns)
 
 
 # 🔹 Serializer for login
@@ -24,7 +173,9 @@ class AdminLoginSerializer(serializers.Serializer):
 
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {"company_details": ("CompanySerializer", {"source": "company"})}
+
     class Meta:
         model = Customer
         fields = '__all__'
@@ -55,17 +206,30 @@ class CustomerSerializer(serializers.ModelSerializer):
             # Create new record
             return Customer.objects.create(**validated_data)
         
-class BankSerializer(serializers.ModelSerializer):
+class BankSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     bank_image_url = serializers.SerializerMethodField()
+    bank_image_thumb_url = serializers.SerializerMethodField()
+    bank_image_srcset = serializers.SerializerMethodField()
+
+    field_dependencies = {
+        "bank_image_url": ["bank_image"],
+        "bank_image_thumb_url": ["bank_image"],
+        "bank_image_srcset": ["bank_image"],
+    }
     
     class Meta:
         model = Bank
-        fields = ['id', 'bank_name', 'pincode', 'bank_image', 'bank_image_url']
+        fields = ['id', 'bank_name', 'pincode', 'bank_image', 'bank_image_url', 'bank_image_thumb_url', 'bank_image_srcset']
 
+    # URLs are memoized per (public_id, version, preset) — see media_urls.py
     def get_bank_image_url(self, obj):
-        if obj.bank_image:
-            return obj.bank_image.url
-        return None
+        return image_url(obj.bank_image)
+
+    def get_bank_image_thumb_url(self, obj):
+        return image_url(obj.bank_image, "thumb")
+
+    def get_bank_image_srcset(self, obj):
+        return image_srcset(obj.bank_image)
 
     # ✅ Validate bank name uniqueness
     def validate_bank_name(self, value):
@@ -90,17 +254,22 @@ class BankSerializer(serializers.ModelSerializer):
     # ✅ Ensure pincodes are returned as a list in response
     def to_representation(self, instance):
         data = super().to_representation(instance)
+        if 'pincode' not in data:  # dropped by ?fields=
+            return data
         if instance.pincode:
             data['pincode'] = [p.strip() for p in instance.pincode.split(',') if p.strip()]
         else:
             data['pincode'] = []
         return data
 
-class CustomerInterestSerializer(serializers.ModelSerializer):
+class CustomerInterestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     customer_details = CustomerSerializer(source="customer", read_only=True)
     bank_name = serializers.CharField(source="bank.bank_name", read_only=True)
     product_title = serializers.CharField(source="product.product_title", read_only=True)
 
+    select_related_fields = ("customer", "bank", "product")
+    expandable_fields = {"bank_details": ("BankSerializer", {"source": "bank"})}
+
     class Meta:
         model = CustomerInterest
         fields = [
@@ -115,21 +284,50 @@ class CustomerInterestSerializer(serializers.ModelSerializer):
         ]
 
 
-class SalaryCriteriaSerializer(serializers.ModelSerializer):
+class BufferedInterestSerializer(serializers.Serializer):
+    """Ids only — existence is checked against the catalog snapshot / per flushed batch (interest_buffer.py)."""
+    customer = serializers.IntegerField(min_value=1)
+    bank = serializers.IntegerField(min_value=1)
+    product = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+
+class SalaryCriteriaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.product_title", read_only=True)
     category_name = serializers.CharField(source="category.category_name", read_only=True)
 
+    select_related_fields = ("product", "category")
+
     class Meta:
         model = SalaryCriteria
         fields = ['salary_id', 'product', 'product_name', 'category', 'category_name', 'min_salary']
 
         
-class ProductSerializer(serializers.ModelSerializer):
+def with_parsed_foir(attrs):
+    """Structured FOIR follows the foir_details description unless given explicitly."""
+    if attrs.get("foir_details") and "foir_percent" not in attrs:
+        attrs["foir_percent"], handling = parse_foir(attrs["foir_details"])
+        attrs.setdefault("obligation_handling", handling)
+    return attrs
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     salary_criteria = SalaryCriteriaSerializer(many=True, read_only=True)
 
     # Accept categories from frontend as dict
     categories = serializers.DictField(write_only=True, required=False)
 
+    expandable_fields = {"bank_details": ("BankSerializer", {"source": "bank"})}
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        # criteria.product is filled in by the reverse prefetch, only category needs a join
+        return queryset.prefetch_related(
+            Prefetch(
+                "salary_criteria",
+                queryset=SalaryCriteria.objects.select_related("category").order_by("salary_id"),
+            )
+        )
+
     class Meta:
         model = Product
         fields = [
@@ -145,28 +343,23 @@ class ProductSerializer(serializers.ModelSerializer):
             "min_roi",
             "max_roi",
             "foir_details",
+            "foir_percent",
+            "obligation_handling",
             "categories",
             "salary_criteria",
         ]
 
+    def validate(self, attrs):
+        return with_parsed_foir(attrs)
+
     def create(self, validated_data):
         categories_input = validated_data.pop("categories", {})
 
         # Create Product
         product = super().create(validated_data)
 
-        # Create SalaryCriteria entries
-        for key, salary in categories_input.items():
-            if salary is None:
-                continue
-            # Replace underscores with spaces to match your CompanyCategory names
-            category_name = key.replace("_", " ")
-            category, _ = CompanyCategory.objects.get_or_create(category_name=category_name)
-            SalaryCriteria.objects.create(
-                product=product,
-                category=category,
-                min_salary=salary
-            )
+        # Create SalaryCriteria entries (bulk, category names resolved in one go)
+        sync_salary_criteria({product.id: categories_input})
 
         return product
 
@@ -179,20 +372,253 @@ class ProductSerializer(serializers.ModelSerializer):
         instance.save()
 
         # Update or create SalaryCriteria entries
-        for key, salary in categories_input.items():
-            if salary is None:
-                continue
-            category_name = key.replace("_", " ")
-            category, _ = CompanyCategory.objects.get_or_create(category_name=category_name)
-            SalaryCriteria.objects.update_or_create(
-                product=instance,
-                category=category,
-                defaults={"min_salary": salary}
-            )
+        sync_salary_criteria({instance.id: categories_input})
 
         return instance
+
+
+# 🔹 Bulk catalog import (see catalog_io.py for the file format)
+class CatalogProductSerializer(serializers.Serializer):
+    product_title = serializers.CharField(max_length=150)
+    min_age = serializers.IntegerField(required=False, allow_null=True)
+    max_age = serializers.IntegerField(required=False, allow_null=True)
+    min_tenure = serializers.IntegerField(required=False, allow_null=True)
+    max_tenure = serializers.IntegerField(required=False, allow_null=True)
+    min_loan_amount = serializers.DecimalField(max_digits=15, decimal_places=2, required=False, allow_null=True)
+    max_loan_amount = serializers.DecimalField(max_digits=15, decimal_places=2, required=False, allow_null=True)
+    min_roi = serializers.FloatField(required=False, allow_null=True)
+    max_roi = serializers.FloatField(required=False, allow_null=True)
+    foir_details = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
+    foir_percent = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
+    obligation_handling = serializers.ChoiceField(choices=Product.OBLIGATION_CHOICES, required=False)
+    categories = serializers.DictField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True),
+        required=False,
+    )
+
+    def validate(self, attrs):
+        return with_parsed_foir(attrs)
+
+
+class CatalogBankSerializer(serializers.Serializer):
+    bank_name = serializers.CharField(max_length=100)
+    pincode = serializers.CharField(max_length=500, required=False, allow_null=True, allow_blank=True)
+    products = CatalogProductSerializer(many=True, required=False)
+
+    def validate_pincode(self, value):
+        return BankSerializer().validate_pincode(value)
+
+    def validate_products(self, value):
+        counts = Counter(p["product_title"].strip().lower() for p in value)
+        duplicates = sorted(t for t, n in counts.items() if n > 1)
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate product titles: {', '.join(duplicates)}")
+        return value
+
+
+class CatalogImportSerializer(serializers.Serializer):
+    banks = CatalogBankSerializer(many=True)
+
+    def validate_banks(self, value):
+        counts = Counter(b["bank_name"].strip().lower() for b in value)
+        duplicates = sorted(name for name, n in counts.items() if n > 1)
+        if duplicates:
+            raise serializers.ValidationError(f"Duplicate banks in catalog: {', '.join(duplicates)}")
+        return value
     
 
+# 🔹 Audience sizing (see audience.py)
+class AudienceSizeSerializer(serializers.Serializer):
+    """A product definition to size; `product` supplies defaults for anything not given."""
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), required=False)
+    bank = serializers.PrimaryKeyRelatedField(queryset=Bank.objects.all(), required=False)
+    pincode = serializers.CharField(max_length=5000, required=False, allow_blank=True)
+    min_age = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    max_age = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    categories = serializers.DictField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=2),
+        required=False,
+    )
+
+    def validate_pincode(self, value):
+        return BankSerializer().validate_pincode(value)
+
+    def validate(self, attrs):
+        if not any(key in attrs for key in ("product", "bank", "pincode")):
+            raise serializers.ValidationError("Provide a product, a bank or pincodes to size.")
+        if "product" not in attrs and "categories" not in attrs:
+            raise serializers.ValidationError("Provide salary criteria per category (categories) or a product.")
+        return attrs
+
+
+# 🔹 Eligibility what-if / salary frontier
+class EligibilityFrontierSerializer(serializers.Serializer):
+    dob = serializers.DateField(required=False)
+    age = serializers.IntegerField(required=False, min_value=0, max_value=120)
+    pincode = serializers.CharField(max_length=10)
+    companyName = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    steps = serializers.IntegerField(required=False, default=3, min_value=1, max_value=20)
+
+    def validate(self, attrs):
+        if "dob" not in attrs and "age" not in attrs:
+            raise serializers.ValidationError("Provide dob or age.")
+        return attrs
+
+
+# 🔹 Ranking / filtering of eligible offers (customer_create_or_eligible_banks query string)
+class EligibleOffersQuerySerializer(serializers.Serializer):
+    SORT_CHOICES = (
+        ("roi", "Lowest ROI first"),
+        ("max_loan", "Highest estimated max loan first"),
+        ("emi", "Lowest EMI first"),
+    )
+    sort = serializers.ChoiceField(choices=SORT_CHOICES, required=False)
+    min_loan = serializers.DecimalField(max_digits=15, decimal_places=2, required=False, min_value=0)
+    tenure = serializers.IntegerField(required=False, min_value=1, max_value=600)
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2, required=False, min_value=1)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=200)
+    offset = serializers.IntegerField(required=False, default=0, min_value=0)
+
+
+# 🔹 Admin customer search (see customer_search.py)
+class CustomerSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    city = serializers.CharField(max_length=50, required=False)
+    pincode = serializers.CharField(required=False)
+    employment_type = serializers.CharField(max_length=50, required=False)
+    salary_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    salary_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    checked_from = serializers.DateField(required=False)
+    checked_to = serializers.DateField(required=False)
+    cursor = serializers.IntegerField(required=False, min_value=1)
+    limit = serializers.IntegerField(required=False, default=20, min_value=1, max_value=100)
+
+    def validate_q(self, value):
+        value = value.strip()
+        if value and len(value) < MIN_QUERY_LENGTH:
+            raise serializers.ValidationError(f"Search text must be at least {MIN_QUERY_LENGTH} characters.")
+        return value
+
+    def validate_pincode(self, value):
+        return [p.strip() for p in value.split(",") if p.strip()]
+
+    def validate(self, attrs):
+        for low, high in (("salary_min", "salary_max"), ("checked_from", "checked_to")):
+            if low in attrs and high in attrs and attrs[low] > attrs[high]:
+                raise serializers.ValidationError(f"{low} must not be after {high}.")
+        return attrs
+
+
+# 🔹 Marketplace product search (products/search/ query string, see product_search.py)
+class ProductSearchSerializer(serializers.Serializer):
+    SORT_CHOICES = (
+        ("id", "Catalog order"),
+        ("roi", "Lowest ROI first"),
+        ("max_loan", "Highest max loan first"),
+        ("title", "Product title"),
+    )
+    roi_min = serializers.FloatField(required=False, min_value=0)
+    roi_max = serializers.FloatField(required=False, min_value=0)
+    loan_min = serializers.DecimalField(max_digits=15, decimal_places=2, required=False, min_value=0)
+    loan_max = serializers.DecimalField(max_digits=15, decimal_places=2, required=False, min_value=0)
+    tenure_min = serializers.IntegerField(required=False, min_value=0)
+    tenure_max = serializers.IntegerField(required=False, min_value=0)
+    age = serializers.IntegerField(required=False, min_value=0, max_value=120)
+    bank = serializers.CharField(required=False)
+    category = serializers.CharField(max_length=100, required=False)
+    salary = serializers.DecimalField(max_digits=12, decimal_places=2, required=False, min_value=0)
+    sort = serializers.ChoiceField(choices=SORT_CHOICES, required=False, default="id")
+
+    def validate_bank(self, value):
+        ids = [b.strip() for b in value.split(",") if b.strip()]
+        if not ids or not all(b.isdigit() for b in ids):
+            raise serializers.ValidationError("Comma-separated bank ids expected.")
+        return [int(b) for b in ids]
+
+    def validate(self, attrs):
+        for low, high in (("roi_min", "roi_max"), ("loan_min", "loan_max"), ("tenure_min", "tenure_max")):
+            if low in attrs and high in attrs and attrs[low] > attrs[high]:
+                raise serializers.ValidationError(f"{low} must not exceed {high}.")
+        if "salary" in attrs and "category" not in attrs:
+            raise serializers.ValidationError("salary filters by a category's salary criteria; provide category too.")
+        return attrs
+
+
+# 🔹 Conversion funnel report (analytics/funnel/ query string, see funnel.py)
+class FunnelReportSerializer(serializers.Serializer):
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    bank = serializers.CharField(required=False)
+    product = serializers.CharField(required=False)
+    category = serializers.CharField(max_length=100, required=False)
+    region = serializers.RegexField(r"^\d{1,6}$", required=False)
+    group_by = serializers.CharField(required=False, default="bank")
+
+    def _ids(self, value, name):
+        ids = [v.strip() for v in value.split(",") if v.strip()]
+        if not ids or not all(v.isdigit() for v in ids):
+            raise serializers.ValidationError(f"Comma-separated {name} ids expected.")
+        return [int(v) for v in ids]
+
+    def validate_bank(self, value):
+        return self._ids(value, "bank")
+
+    def validate_product(self, value):
+        return self._ids(value, "product")
+
+    def validate_group_by(self, value):
+        dimensions = [d.strip() for d in value.split(",") if d.strip()]
+        unknown = [d for d in dimensions if d not in FUNNEL_DIMENSIONS]
+        if not dimensions or unknown:
+            raise serializers.ValidationError(f"Group by any of: {', '.join(FUNNEL_DIMENSIONS)}.")
+        return list(dict.fromkeys(dimensions))
+
+    def validate(self, attrs):
+        if "date_from" in attrs and "date_to" in attrs and attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError("date_from must not be after date_to.")
+        return attrs
+
+
+# 🔹 EMI grid / amortization schedule
+class EmiGridSerializer(serializers.Serializer):
+    """`products` ids, or applicant details to use the applicant's eligible products."""
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2, min_value=1)
+    products = serializers.CharField(required=False)
+    dob = serializers.DateField(required=False)
+    age = serializers.IntegerField(required=False, min_value=0, max_value=120)
+    pincode = serializers.CharField(max_length=10, required=False)
+    companyName = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, min_value=0)
+    tenure_step = serializers.IntegerField(required=False, default=12, min_value=1, max_value=120)
+    roi_steps = serializers.IntegerField(required=False, default=3, min_value=1, max_value=10)
+
+    def validate_products(self, value):
+        ids = [p.strip() for p in value.split(",") if p.strip()]
+        if not ids or not all(p.isdigit() for p in ids):
+            raise serializers.ValidationError("Comma-separated product ids expected.")
+        if len(ids) > 100:
+            raise serializers.ValidationError("At most 100 products per request.")
+        return [int(p) for p in ids]
+
+    def validate(self, attrs):
+        if "products" not in attrs:
+            missing = [f for f in ("pincode", "salary") if f not in attrs]
+            if "dob" not in attrs and "age" not in attrs:
+                missing.append("dob or age")
+            if missing:
+                raise serializers.ValidationError(
+                    f"Provide products, or applicant details to use the eligible set (missing: {', '.join(missing)})."
+                )
+        return attrs
+
+
+class AmortizationSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2, min_value=1)
+    roi = serializers.FloatField(min_value=0, max_value=100)
+    tenure = serializers.IntegerField(min_value=1, max_value=600)
+
+
 # 🔹 Serializer for creating/updating users (admins)
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -216,19 +642,31 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class ManagedCardSerializer(serializers.ModelSerializer):
+class ManagedCardSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_thumb_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ManagedCard
-        fields = ['id', 'title', 'url', 'image', 'image_url']
+        fields = ['id', 'title', 'url', 'image', 'image_url', 'image_thumb_url', 'image_srcset']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Image arrives later through the deferred upload pipeline
+        if self.context.get("deferred_image"):
+            self.fields["image"].required = False
 
     def get_image_url(self, obj):
-        if obj.image:
-            return obj.image.url
-        return None
+        return image_url(obj.image)
+
+    def get_image_thumb_url(self, obj):
+        return image_url(obj.image, "thumb")
+
+    def get_image_srcset(self, obj):
+        return image_srcset(obj.image)
     
-class CompanyCategorySerializer(serializers.ModelSerializer):
+class CompanyCategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CompanyCategory
         fields = "__all__"
@@ -262,36 +700,58 @@ class CompanyCategorySerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class CompanySerializer(serializers.ModelSerializer):
+class CompanySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = CompanyCategorySerializer(read_only=True)   # show category details
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=CompanyCategory.objects.all(), write_only=True, source="category"
     )
 
+    select_related_fields = ("category",)
+
     class Meta:
         model = Company
         fields = ['company_id', 'company_name', 'category', 'category_id']
 
 
+class MediaUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MediaUpload
+        fields = ["id", "target", "object_id", "status", "attempts", "last_error", "created_at", "updated_at"]
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id", "kind", "status", "priority", "attempts", "max_attempts",
+            "progress", "progress_message", "result", "last_error",
+            "run_after", "created_at", "updated_at", "finished_at",
+        ]
+
+
 # Recent customers (eligibility checks)
-class RecentCustomerSerializer(serializers.ModelSerializer):
+class RecentCustomerSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ["id", "full_name", "email", "last_eligibility_check"]
 
 # Recent interests
-class RecentInterestSerializer(serializers.ModelSerializer):
+class RecentInterestSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     customer_name = serializers.CharField(source="customer.full_name")
     product_name = serializers.CharField(source="product.product_title")
 
+    select_related_fields = ("customer", "product")
+
     class Meta:
         model = CustomerInterest
         fields = ["id", "customer_name", "product_name", "created_at"]
 
 # Recent products
-class RecentProductSerializer(serializers.ModelSerializer):
+class RecentProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     bank_name = serializers.CharField(source="bank.bank_name")
 
+    select_related_fields = ("bank",)
+
     class Meta:
         model = Product
         fields = ["id", "product_title", "bank_name", "created_at"]
@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .customer_search import BACKEND_NGRAM, SEARCH_FIELDS, index_customers, search_backend
+from .eligibility import bump_catalog_version
+from .live_feed import publish_interests, publish_on_commit
+from .models import Bank, Company, CompanyCategory, Customer, CustomerInterest, Product, SalaryCriteria
+
+CATALOG_MODELS = (Bank, Product, SalaryCriteria, Company, CompanyCategory)
+
+
+def invalidate_catalog_snapshot(sender, using="default", **kwargs):
+    """Any catalog write makes the cached eligibility snapshot stale (once it commits)."""
+    transaction.on_commit(bump_catalog_version, using=using)
+
+
+# Connected per model: a sender-less receiver would disable fast deletes everywhere
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_catalog_snapshot, sender=model, dispatch_uid=f"catalog_snapshot_save_{model.__name__}")
+    post_delete.connect(invalidate_catalog_snapshot, sender=model, dispatch_uid=f"catalog_snapshot_delete_{model.__name__}")
+
+
+def reindex_customer_search(sender, instance, update_fields=None, using="default", **kwargs):
+    """Keep the customer search n-grams current (deletes cascade with the customer)."""
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    if search_backend(using) == BACKEND_NGRAM:
+        index_customers([(instance.pk, *(getattr(instance, f) for f in SEARCH_FIELDS))])
+
+
+post_save.connect(reindex_customer_search, sender=Customer, dispatch_uid="customer_search_save")
+
+
+# -------------------- live dashboard feed (live_feed.py) --------------------
+def publish_interest(sender, instance, created, using="default", **kwargs):
+    if created:
+        publish_interests([instance.pk], using=using)
+
+
+def publish_product_saved(sender, instance, created, using="default", **kwargs):
+    def payload():
+        product = {"id": instance.pk, "product_title": instance.product_title, "bank_id": instance.bank_id,
+                   "bank_name": Bank.objects.filter(pk=instance.bank_id).values_list("bank_name", flat=True).first(),
+                   "created_at": instance.created_at}
+        return {"action": "created" if created else "updated", "product": product}
+
+    publish_on_commit("product", payload, using=using)
+
+
+def publish_product_deleted(sender, instance, using="default", **kwargs):
+    product = {"id": instance.pk, "product_title": instance.product_title, "bank_id": instance.bank_id}
+    publish_on_commit("product", lambda: {"action": "deleted", "product": product}, using=using)
+
+
+post_save.connect(publish_interest, sender=CustomerInterest, dispatch_uid="live_feed_interest")
+post_save.connect(publish_product_saved, sender=Product, dispatch_uid="live_feed_product_save")
+post_delete.connect(publish_product_deleted, sender=Product, dispatch_uid="live_feed_product_delete")
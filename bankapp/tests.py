@@ -1,3 +1,1236 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
+
+from asgiref.sync import iscoroutinefunction
+from django.db import IntegrityError, connection
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import Customer, Bank, CustomerInterest, Product, CompanyCategory, Company, SalaryCriteria, EligibilityResult, LeadOutbox, DailyFunnelStat, MediaUpload, Job
+from .catalog_io import sync_salary_criteria
+from .recompute import recompute_all
+from .middleware import CompressionMiddleware, brotli, negotiate_encoding
+from .renderers import FastJSONRenderer
+from .loan_math import emi, estimate_max_loans, parse_foir
+from .eligibility import CatalogSnapshot
+from .product_search import search_database, search_snapshot
+from .throttling import SlidingWindowLimiter
+from .serializers import BankSerializer, CompanySerializer, ProductSerializer, SalaryCriteriaSerializer
+from . import audience, checks, dedupe, eligibility, fast_reads, idempotency, interest_buffer, jobs, lead_exports, lead_outbox, live_feed, media_uploads, media_urls
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.bank = Bank.objects.create(bank_name="Bank A", pincode="110001")
+        self.loan = Product.objects.create(bank=self.bank, product_title="Loan", min_age=21, max_age=58)
+        self.old = Product.objects.create(bank=self.bank, product_title="Old loan")
+        for name, salary in (("CAT A", 30000), ("CAT B", 40000)):
+            SalaryCriteria.objects.create(product=self.loan, category=CompanyCategory.objects.create(category_name=name),
+                                          min_salary=salary)
+        self.catalog = {"banks": [{"bank_name": "bank a", "products": [
+            {"product_title": "loan", "max_age": 60, "categories": {"CAT_A": "35000", "CAT C": "50000"}},
+            {"product_title": "New loan", "min_age": 25},
+        ]}]}
+
+    def post(self, catalog, query=""):
+        response = APIClient().post(f"/v1/api/products/catalog/import/{query}", catalog, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["summary"]
+
+    def criteria(self, product):
+        return dict(SalaryCriteria.objects.filter(product=product).values_list("category__category_name", "min_salary"))
+
+    def test_dry_run_reports_without_writing(self):
+        summary = self.post(self.catalog, "?dry_run=true&delete_missing=true")
+        self.assertEqual(
+            (summary["products_created"], summary["products_updated"], summary["products_deleted"]), (1, 1, 1))
+        self.assertEqual(
+            (summary["criteria_created"], summary["criteria_updated"], summary["criteria_deleted"]), (1, 1, 1))
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(self.criteria(self.loan), {"CAT A": Decimal("30000"), "CAT B": Decimal("40000")})
+
+    def test_creates_and_updates_but_keeps_missing_by_default(self):
+        summary = self.post(self.catalog)
+        self.assertEqual((summary["products_created"], summary["products_updated"], summary["products_deleted"]), (1, 1, 0))
+        self.loan.refresh_from_db()
+        self.assertEqual((self.loan.min_age, self.loan.max_age), (21, 60))
+        self.assertEqual(self.criteria(self.loan),
+                         {"CAT A": Decimal("35000"), "CAT B": Decimal("40000"), "CAT C": Decimal("50000")})
+        self.assertEqual(Product.objects.get(product_title="New loan").min_age, 25)
+        self.assertTrue(Product.objects.filter(pk=self.old.pk).exists())
+
+    def test_delete_missing_only_diffs_collections_in_the_file(self):
+        CustomerInterest.objects.create(
+            customer=Customer.objects.create(full_name="A", email="a@example.com", phone="9000000001", pan="ABCDE0001F"),
+            bank=self.bank, product=self.loan,
+        )
+        # No `products` key: the bank's products are left alone; no `categories`: criteria too
+        summary = self.post({"banks": [{"bank_name": "Bank A", "pincode": "110002"}]}, "?delete_missing=true")
+        self.assertEqual((summary["products_deleted"], summary["criteria_deleted"]), (0, 0))
+        summary = self.post({"banks": [{"bank_name": "Bank A", "products": [{"product_title": "Loan"}]}]},
+                            "?delete_missing=true")
+        self.assertEqual((summary["products_deleted"], summary["criteria_deleted"]), (1, 0))
+        self.assertEqual(len(self.criteria(self.loan)), 2)
+        self.assertEqual(CustomerInterest.objects.count(), 1)
+
+        self.post({"banks": [{"bank_name": "Bank A", "products": [{"product_title": "Loan", "categories": {"CAT B": "40000"}}]}]},
+                  "?delete_missing=true")
+        self.assertEqual(self.criteria(self.loan), {"CAT B": Decimal("40000")})
+        self.bank.refresh_from_db()
+        self.assertEqual(self.bank.pincode, "110002")
+        self.assertEqual(list(Product.objects.values_list("product_title", flat=True)), ["Loan"])
+
+    def test_null_salary_creates_no_category(self):
+        sync_salary_criteria({self.loan.id: {"CAT_X": None, "CAT A": "32000"}})
+        self.assertFalse(CompanyCategory.objects.filter(category_name="CAT X").exists())
+        self.assertEqual(self.criteria(self.loan), {"CAT A": Decimal("32000"), "CAT B": Decimal("40000")})
+
+
+class ListQueryCountTests(TestCase):
+    """List endpoints must cost the same number of queries for 1 row or many."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.categories = [CompanyCategory.objects.create(category_name=f"CAT {c}") for c in "ABC"]
+
+    def add_rows(self, n):
+        start = Bank.objects.count()
+        for i in range(start, start + n):
+            bank = Bank.objects.create(bank_name=f"Bank {i}", pincode="110001")
+            product = Product.objects.create(bank=bank, product_title=f"Loan {i}", min_age=21, max_age=60)
+            for category in self.categories:
+                SalaryCriteria.objects.create(product=product, category=category, min_salary=20000 + i)
+            Company.objects.create(company_name=f"Company {i}", category=self.categories[i % 3])
+            customer = Customer.objects.create(
+                full_name=f"Customer {i}", email=f"c{i}@example.com", phone=f"90000000{i:02d}",
+                pan=f"ABCDE{i:04d}F", dob=date(1990, 1, 1), salary=50000, pincode="110001",
+                last_eligibility_check=date.today(),
+            )
+            CustomerInterest.objects.create(customer=customer, bank=bank, product=product)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx)
+
+    def test_query_count_is_constant_in_rows(self):
+        urls = [
+            "/v1/api/banks/",
+            "/v1/api/products/",
+            "/v1/api/salary-criteria/",
+            "/v1/api/companies/",
+            "/v1/api/customer-interests/",
+            "/v1/api/admin-dashboard/",
+        ]
+        self.add_rows(1)
+        small = {url: self.count_queries(url) for url in urls}
+        self.add_rows(5)
+        large = {url: self.count_queries(url) for url in urls}
+        self.assertEqual(small, large)
+
+
+class FastReadParityTests(TestCase):
+    """The values-based read path must produce exactly what the serializers produce."""
+
+    def test_rows_match_serializer_output(self):
+        category = CompanyCategory.objects.create(category_name="CAT A")
+        bank = Bank.objects.create(bank_name="Bank", pincode="110001, 110002,", bank_image="banks/logo")
+        Bank.objects.create(bank_name="Bare", pincode=None)
+        product = Product.objects.create(
+            bank=bank, product_title="Loan", min_age=21, max_age=58, min_loan_amount=Decimal("50000"),
+            min_roi=10.5, foir_details="50% of net salary", foir_percent=Decimal("50"),
+        )
+        Product.objects.create(bank=bank, product_title="Bare loan")
+        SalaryCriteria.objects.create(product=product, category=category, min_salary=Decimal("25000.50"))
+        Company.objects.create(company_name="Acme", category=category)
+
+        cases = [
+            (fast_reads.bank_rows, BankSerializer, Bank.objects.order_by("id")),
+            (fast_reads.product_rows, ProductSerializer, Product.objects.order_by("id")),
+            (fast_reads.salary_criteria_rows, SalaryCriteriaSerializer, SalaryCriteria.objects.order_by("salary_id")),
+            (fast_reads.company_rows, CompanySerializer, Company.objects.order_by("company_id")),
+        ]
+        for rows, serializer_class, queryset in cases:
+            expected = serializer_class(serializer_class.setup_eager_loading(queryset), many=True).data
+            self.assertEqual(rows(queryset), json.loads(json.dumps(expected)), serializer_class.__name__)
+
+
+class RenderingAndCompressionTests(TestCase):
+    def test_orjson_renderer_matches_drf(self):
+        data = {
+            "amount": Decimal("12.50"), "when": datetime(2026, 3, 1, 9, 30, 0, 123456, tzinfo=dt_timezone.utc),
+            "day": date(2026, 3, 1), "id": uuid.UUID(int=7), "label": gettext_lazy("Loan"),
+            "text": "line\u2028sep", 3: [1.5, None, True], "big": 2 ** 70,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        del data["big"]  # > 64 bits falls back to the stock renderer; without it orjson does the work
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    @skipIf(brotli is None, "brotli is not installed")
+    def test_negotiate_encoding_honours_q_values(self):
+        self.assertEqual(negotiate_encoding("gzip, deflate, br"), "br")
+        self.assertEqual(negotiate_encoding("gzip;q=1.0, br;q=0.5"), "gzip")
+        self.assertEqual(negotiate_encoding("br;q=0, *;q=0.1"), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0, identity"))
+        self.assertIsNone(negotiate_encoding(None))
+
+    def middleware(self, response, get_response=None):
+        return CompressionMiddleware(get_response or (lambda request: response))
+
+    def json_response(self, size, etag='"abc"'):
+        response = HttpResponse(b'{"rows": "' + b"x" * size + b'"}', content_type="application/json")
+        response["ETag"] = etag
+        return response
+
+    def test_large_json_compressed_small_and_streaming_left_alone(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip;q=0.9, br;q=0.1")
+        body = self.json_response(5000).content
+        response = self.middleware(self.json_response(5000))(request)
+        self.assertEqual((response["Content-Encoding"], response["ETag"]), ("gzip", 'W/"abc"'))
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        small = self.middleware(self.json_response(10))(request)
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", small["Vary"])
+
+        streaming = StreamingHttpResponse(iter([b"x" * 5000]), content_type="application/json")
+        self.assertFalse(self.middleware(streaming)(request).has_header("Content-Encoding"))
+        html = HttpResponse(b"x" * 5000, content_type="text/html")
+        self.assertFalse(self.middleware(html)(request).has_header("Content-Encoding"))
+
+    def test_runs_natively_in_async_chains(self):
+        async def get_response(request):
+            return self.json_response(5000)
+
+        middleware = self.middleware(None, get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.json_response(5000).content)
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        category = CompanyCategory.objects.create(category_name="CAT A")
+        company = Company.objects.create(company_name="Acme", category=category)
+        self.bank = Bank.objects.create(bank_name="Bank", pincode="110001,110002")
+        product = Product.objects.create(bank=self.bank, product_title="Loan", min_age=21)
+        SalaryCriteria.objects.create(product=product, category=category, min_salary=25000)
+        for i in range(3):
+            customer = Customer.objects.create(full_name=f"C{i}", email=f"c{i}@example.com", phone=f"900000000{i}",
+                                               pan=f"ABCDE000{i}F", company=company)
+            CustomerInterest.objects.create(customer=customer, bank=self.bank, product=product)
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data, ctx.captured_queries
+
+    def test_fields_narrow_output_and_columns(self):
+        data, queries = self.get("/v1/api/customer-interests/", fields="id,customer_details.full_name,bank_name")
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("email", queries[0]["sql"])
+        self.assertEqual(
+            data["data"],
+            [{"id": i.id, "customer_details": {"full_name": i.customer.full_name}, "bank_name": "Bank"}
+             for i in CustomerInterest.objects.select_related("customer").order_by("-created_at")],
+        )
+
+        data, _ = self.get("/v1/api/products/", fields="product_title,salary_criteria.category_name,salary_criteria.min_salary")
+        self.assertEqual(data, [{"product_title": "Loan", "salary_criteria": [{"category_name": "CAT A", "min_salary": "25000.00"}]}])
+        data, _ = self.get("/v1/api/companies/", fields="company_name,category.category_name")
+        self.assertEqual(data, [{"company_name": "Acme", "category": {"category_name": "CAT A"}}])
+
+    def test_expand_adds_related_representations(self):
+        data, queries = self.get(f"/v1/api/customer-interests/customer/{Customer.objects.first().id}/",
+                                 expand="bank_details", fields="id,bank_details.bank_name,bank_details.pincode")
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data[0]["bank_details"], {"bank_name": "Bank", "pincode": ["110001", "110002"]})
+
+        data, _ = self.get("/v1/api/customers/search/", q="example", expand="company_details")
+        self.assertEqual({row["company_details"]["company_name"] for row in data["results"]}, {"Acme"})
+        self.assertIn("email", data["results"][0])  # expand alone keeps every field
+
+
+class MediaUrlTests(TestCase):
+    def setUp(self):
+        media_urls._build_url.cache_clear()
+        self.bank = Bank.objects.create(bank_name="Bank", bank_image="image/upload/v1700000000/banks/logo.png")
+        self.bank.refresh_from_db()
+
+    def test_urls_match_cloudinary_and_are_memoized(self):
+        image = self.bank.bank_image
+        self.assertEqual(media_urls.image_url(image), image.url)
+        thumb = media_urls.image_url(image, "thumb")
+        self.assertIn("c_limit,f_auto,h_160,q_auto,w_160", thumb)
+        srcset = media_urls.image_srcset(image)
+        self.assertEqual([entry.rsplit(" ", 1)[1] for entry in srcset.split(", ")], ["160w", "320w", "640w", "960w"])
+
+        misses = media_urls._build_url.cache_info().misses
+        fresh = Bank.objects.get(pk=self.bank.pk).bank_image  # another resource object for the same image
+        self.assertEqual(media_urls.image_url(fresh, "thumb"), thumb)
+        self.assertEqual(media_urls._build_url.cache_info().misses, misses)
+
+        with override_settings(BANKAPP_CLOUDINARY_SIGN_URLS=True):
+            self.assertIn("/s--", media_urls.image_url(image))  # signing is part of the cache key
+        self.assertIsNone(media_urls.image_url(None))
+        self.assertIsNone(media_urls.image_srcset(Bank(bank_name="Bare").bank_image))
+
+    def test_bank_payload_carries_variants(self):
+        [row] = APIClient().get("/v1/api/banks/").json()
+        self.assertEqual(row["bank_image_url"], self.bank.bank_image.url)
+        self.assertEqual(row["bank_image_thumb_url"], media_urls.image_url(self.bank.bank_image, "thumb"))
+        self.assertEqual(row["bank_image_srcset"], media_urls.image_srcset(self.bank.bank_image))
+
+
+class MediaUploadTests(TestCase):
+    def setUp(self):
+        self.spool_dir, self.store_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.settings_override = override_settings(BANKAPP_MEDIA_UPLOADS={
+            "SPOOL_DIR": self.spool_dir, "FILESYSTEM_ROOT": self.store_dir,
+            "BACKEND": "bankapp.media_uploads.FileSystemBackend", "MAX_ATTEMPTS": 2, "RETRY_BACKOFF": 1.0,
+        })
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+
+    def create_bank(self, name="Bank"):
+        logo = SimpleUploadedFile("logo.PNG", b"\x89PNG logo", content_type="image/png")
+        response = APIClient().post("/v1/api/banks/", {"bank_name": name, "pincode": "110001", "bank_image": logo})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["bank_image_upload"]["status"], "pending")
+        return Bank.objects.get(pk=response.data["id"]), MediaUpload.objects.get(pk=response.data["bank_image_upload"]["id"])
+
+    def test_upload_retries_then_stores_the_resource(self):
+        bank, upload = self.create_bank()
+        self.assertIsNone(bank.bank_image)
+
+        class Flaky(media_uploads.FileSystemBackend):
+            failures = 1
+
+            def upload(self, path, target):
+                if Flaky.failures:
+                    Flaky.failures -= 1
+                    raise OSError("connection reset")
+                return super().upload(path, target)
+
+        sleeps = []
+        self.assertEqual(media_uploads.process_upload(upload.pk, backend=Flaky(), sleep=sleeps.append), "done")
+        self.assertEqual(sleeps, [1.0])
+        upload.refresh_from_db()
+        bank.refresh_from_db()
+        self.assertEqual((upload.status, upload.attempts, upload.last_error), ("done", 2, None))
+        self.assertEqual(os.listdir(self.store_dir), [f"{bank.bank_image.public_id}.png"])
+        self.assertFalse(os.path.exists(upload.local_path))
+        self.assertIsNone(media_uploads.process_upload(upload.pk))  # already done: nobody claims it
+
+    def test_command_requeues_only_abandoned_claims(self):
+        _, live = self.create_bank("Live")
+        _, abandoned = self.create_bank("Abandoned")
+        hour_ago = timezone.now() - timedelta(hours=1)
+        MediaUpload.objects.update(created_at=hour_ago, updated_at=hour_ago)
+        MediaUpload.objects.filter(pk=abandoned.pk).update(status="uploading")  # its worker died an hour ago
+        seen = []
+
+        class Slow(media_uploads.FileSystemBackend):
+            def upload(self, path, target):
+                # The sweeper runs while this upload is still in progress
+                call_command("process_media_uploads", stdout=StringIO())
+                seen.append(dict(MediaUpload.objects.values_list("pk", "status")))
+                return super().upload(path, target)
+
+        self.assertEqual(media_uploads.process_upload(live.pk, backend=Slow()), "done")
+        self.assertEqual(seen, [{live.pk: "uploading", abandoned.pk: "done"}])
+        self.assertEqual(MediaUpload.objects.get(pk=live.pk).attempts, 1)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.handlers = mock.patch.dict(jobs.JOB_HANDLERS, {"echo": self.echo, "boom": self.boom})
+        self.handlers.start()
+
+    def tearDown(self):
+        self.handlers.stop()
+
+    def echo(self, ctx, payload):
+        self.calls.append(payload)
+        ctx.report_progress(50, "halfway", force=True)
+        return payload
+
+    def boom(self, ctx, payload):
+        raise RuntimeError("boom")
+
+    def test_claims_by_priority_and_records_the_result(self):
+        low = jobs.enqueue("echo", {"n": 1})
+        high = jobs.enqueue("echo", {"n": 2}, priority=5)
+        jobs.enqueue("echo", {"n": 3}, priority=9, run_after=timezone.now() + timedelta(hours=1))
+        self.assertIsNone(jobs.claim_next("w1", kinds=["boom"]))
+
+        job = jobs.claim_next("w1")
+        self.assertEqual((job.pk, job.status, job.locked_by, job.attempts), (high.pk, "running", "w1", 1))
+        self.assertEqual(jobs.claim_next("w2").pk, low.pk)
+        self.assertIsNone(jobs.claim_next("w3"))  # the third isn't due yet
+
+        self.assertTrue(jobs.run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.progress, job.progress_message), ("succeeded", {"n": 2}, 100, "halfway"))
+
+    def test_failures_back_off_then_fail(self):
+        job = jobs.enqueue("boom", max_attempts=2)
+        before = timezone.now()
+        with self.assertLogs("bankapp.jobs", "WARNING"):
+            self.assertFalse(jobs.run_job(jobs.claim_next("w1")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ("queued", 1, None))
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=jobs.RETRY_BASE_SECONDS))
+        self.assertIn("boom", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs("bankapp.jobs", "ERROR"):
+            self.assertFalse(jobs.run_job(jobs.claim_next("w1")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_stale_claims_requeued_until_attempts_run_out(self):
+        job = jobs.enqueue("echo", {"n": 1}, max_attempts=2)
+        first = jobs.claim_next("w1")
+        hour_ago = timezone.now() - timedelta(hours=2)
+        Job.objects.filter(pk=job.pk).update(locked_at=hour_ago)
+        jobs.JobContext(first).report_progress(10, force=True)  # progress doubles as a heartbeat
+        self.assertEqual(jobs.requeue_stale(3600), 0)
+
+        Job.objects.filter(pk=job.pk).update(locked_at=hour_ago)
+        self.assertEqual(jobs.requeue_stale(3600), 1)
+        second = jobs.claim_next("w2")
+        with self.assertLogs("bankapp.jobs", "WARNING") as logs:
+            self.assertFalse(jobs.run_job(first))  # w1 was presumed dead: its result is not recorded
+        self.assertIn("lost its claim", logs.output[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ("running", "w2"))
+
+        Job.objects.filter(pk=job.pk).update(locked_at=hour_ago)
+        with self.assertLogs("bankapp.jobs", "WARNING"):
+            self.assertEqual(jobs.requeue_stale(3600), 0)
+            self.assertFalse(jobs.run_job(second))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+
+class RecomputeEligibilityTests(TestCase):
+    def test_results_match_eligibility_checks(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        unlisted = CompanyCategory.objects.create(category_name="UNLISTED")
+        listed = CompanyCategory.objects.create(category_name="CAT A")
+        Company.objects.create(company_name="Acme", category=listed)
+        bank = Bank.objects.create(bank_name="Bank", pincode="110001, 110002")
+        Bank.objects.create(bank_name="Elsewhere", pincode="560001")
+        loan = Product.objects.create(bank=bank, product_title="Loan", min_age=21, max_age=40)
+        any_age = Product.objects.create(bank=bank, product_title="Any age")
+        SalaryCriteria.objects.create(product=loan, category=listed, min_salary=30000)
+        SalaryCriteria.objects.create(product=any_age, category=listed, min_salary=60000)
+        SalaryCriteria.objects.create(product=any_age, category=unlisted, min_salary=20000)
+        for i, (company, salary, dob, pincode) in enumerate([
+            ("acme ", 50000, date(1995, 5, 5), "110002"),   # Loan only
+            ("Other", 25000, date(1960, 1, 1), "110001"),   # UNLISTED → Any age
+            ("Acme", 90000, date(1990, 1, 1), "560001"),    # pincode not served by Bank
+        ]):
+            Customer.objects.create(
+                full_name=f"C{i}", email=f"r{i}@example.com", phone=f"80000000{i:02d}", pan=f"PQRST{i:04d}K",
+                companyName=company, salary=salary, dob=dob, pincode=pincode, last_eligibility_check=date.today(),
+            )
+
+        summary = recompute_all(processes=1, shard_size=2)
+
+        self.assertEqual((summary["customers"], summary["results"], summary["shards"]), (3, 2, 2))
+        stored = {
+            (r.customer.full_name, r.product.product_title, float(r.min_salary_required))
+            for r in EligibilityResult.objects.select_related("customer", "product")
+        }
+        self.assertEqual(stored, {("C0", "Loan", 30000.0), ("C1", "Any age", 20000.0)})
+
+        response = APIClient().get("/v1/api/get-all-eligiblity-checks/")
+        listed_pairs = {
+            (row["full_name"], bank_row["product_name"], bank_row["min_salary_required"])
+            for row in response.json()["results"] for bank_row in row["eligible_banks"]
+        }
+        self.assertEqual(listed_pairs, stored)
+
+
+    def test_catalog_version_bumped_after_commit(self):
+        shared = caches[eligibility.get_options()["CACHE"]]
+        before = shared.get(eligibility.CATALOG_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Bank.objects.create(bank_name="Bank", pincode="110001")
+            self.assertEqual(shared.get(eligibility.CATALOG_VERSION_KEY), before)
+        self.assertTrue(callbacks)
+        self.assertNotEqual(shared.get(eligibility.CATALOG_VERSION_KEY), before)
+
+    def test_no_snapshot_reuse_with_process_local_cache(self):
+        self.assertIs(eligibility.get_snapshot(), eligibility.get_snapshot())
+        with override_settings(BANKAPP_CATALOG_SNAPSHOT={"CACHE": "default"}):
+            self.assertIsNot(eligibility.get_snapshot(), eligibility.get_snapshot())
+            self.assertIsNone(eligibility.peek_snapshot())
+
+
+class AudienceSizeTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        cache.clear()
+        audience._columns = None
+        self.category = CompanyCategory.objects.create(category_name="CAT A")
+        Company.objects.create(company_name="Acme", category=self.category)
+        for i, (salary, pincode, dob) in enumerate([
+            (50000, "110001", date(1990, 1, 1)),
+            (20000, "110001", date(1990, 1, 1)),   # below the threshold
+            (60000, "560001", date(1990, 1, 1)),   # outside the bank's pincodes
+            (70000, "110002", date(1950, 1, 1)),   # too old
+        ]):
+            Customer.objects.create(full_name=f"C{i}", email=f"c{i}@example.com", phone=f"900000000{i}",
+                                    pan=f"ABCDE000{i}F", salary=salary, pincode=pincode, dob=dob, companyName="Acme")
+
+    def tearDown(self):
+        audience._columns = None
+
+    def size(self, **body):
+        response = APIClient().post("/v1/api/audience/size/", body, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def create_product(self):
+        bank = Bank.objects.create(bank_name="New bank", pincode="110001,110002")
+        product = Product.objects.create(bank=bank, product_title="Loan", min_age=21, max_age=60)
+        SalaryCriteria.objects.create(product=product, category=self.category, min_salary=30000)
+        return bank, product
+
+    def test_counts_by_product_and_overrides(self):
+        bank, product = self.create_product()
+        data = self.size(product=product.id)
+        self.assertEqual((data["total_customers"], data["eligible_count"]), (4, 1))
+        self.assertEqual(data["by_category"], [{"category": "CAT A", "count": 1}])
+        self.assertEqual(data["by_region"], [{"region": "110", "count": 1}])
+        self.assertEqual(self.size(product=product.id, max_age=90)["eligible_count"], 2)
+        self.assertEqual(self.size(bank=bank.id, pincode="560001", categories={"CAT_A": 10000})["eligible_count"], 1)
+
+    def test_bank_and_product_newer_than_the_snapshot(self):
+        stale = CatalogSnapshot.load()  # another worker's snapshot, loaded before the bank existed
+        bank, product = self.create_product()
+        with mock.patch("bankapp.views.get_snapshot", return_value=stale):
+            self.assertEqual(self.size(bank=bank.id, categories={"CAT A": 30000})["eligible_count"], 2)
+            data = self.size(product=product.id)
+        self.assertEqual(data["eligible_count"], 1)
+        self.assertEqual(data["criteria"]["categories"], {"CAT A": 30000.0})
+
+
+class EligibilityFrontierTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        category = CompanyCategory.objects.create(category_name="CAT A")
+        Company.objects.create(company_name="Acme", category=category)
+        near = Bank.objects.create(bank_name="Near", pincode="110001")
+        far = Bank.objects.create(bank_name="Far", pincode="560001")
+        for bank, title, min_salary, ages in [
+            (near, "Starter", 20000, (None, None)),
+            (near, "Plus", 40000, (None, None)),
+            (near, "Plus two", 45000, (21, 60)),
+            (near, "Young", 10000, (21, 30)),    # outside the applicant's age
+            (near, "Premium", 80000, (None, None)),
+            (far, "Elsewhere", 5000, (None, None)),  # pincode not served
+        ]:
+            product = Product.objects.create(bank=bank, product_title=title, min_age=ages[0], max_age=ages[1])
+            SalaryCriteria.objects.create(product=product, category=category, min_salary=min_salary)
+
+    def get(self, **params):
+        return APIClient().get("/v1/api/eligibility/frontier/", params)
+
+    def test_thresholds_and_next_unlocks(self):
+        response = self.get(age=35, pincode="110001", companyName="acme", salary=30000, steps=2)
+        self.assertEqual(response.status_code, 200, response.data)
+        data = response.data
+        self.assertEqual(data["company_category"], "CAT A")
+        self.assertEqual([(row["product_name"], row["min_salary_required"]) for row in data["salary_thresholds"]],
+                         [("Starter", 20000.0), ("Plus", 40000.0), ("Plus two", 45000.0), ("Premium", 80000.0)])
+        self.assertEqual((data["eligibility_status"], data["eligible_count"]), ("Eligible", 1))
+        self.assertEqual(
+            [(u["min_salary_required"], u["salary_gap"], [p["product_name"] for p in u["products"]]) for u in data["next_unlocks"]],
+            [(40000.0, 10000.0, ["Plus"]), (45000.0, 15000.0, ["Plus two"])],
+        )
+
+    def test_without_salary_or_listed_company(self):
+        data = self.get(dob="1990-01-01", pincode="110001").data
+        self.assertEqual((data["company_category"], data["products_available"]), ("UNLISTED", 0))
+        self.assertNotIn("next_unlocks", data)
+        self.assertEqual(self.get(pincode="110001").status_code, 400)
+
+    def test_company_and_bank_newer_than_the_snapshot(self):
+        self.assertEqual(self.get(age=35, pincode="400001", companyName="Globex").data["products_available"], 0)
+        # Written without the on-commit version bump reaching this process
+        Company.objects.create(company_name="Globex", category=CompanyCategory.objects.get(category_name="CAT A"))
+        bank = Bank.objects.create(bank_name="New", pincode="400001")
+        SalaryCriteria.objects.create(product=Product.objects.create(bank=bank, product_title="New loan"),
+                                      category=CompanyCategory.objects.get(category_name="CAT A"), min_salary=15000)
+        data = self.get(age=35, pincode="400001", companyName="Globex").data
+        self.assertEqual((data["company_category"], data["products_available"]), ("CAT A", 1))
+
+
+class IneligibilityReasonTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        cache.clear()
+        category = CompanyCategory.objects.create(category_name="CAT A")
+        other = CompanyCategory.objects.create(category_name="CAT B")
+        Company.objects.create(company_name="Acme", category=category)
+        near = Bank.objects.create(bank_name="Near", pincode="110001")
+        young = Product.objects.create(bank=near, product_title="Young", min_age=21, max_age=30)
+        SalaryCriteria.objects.create(product=young, category=category, min_salary=10000)
+        no_criteria = Product.objects.create(bank=near, product_title="Other category")
+        SalaryCriteria.objects.create(product=no_criteria, category=other, min_salary=10000)
+        rich = Product.objects.create(bank=near, product_title="Rich")
+        SalaryCriteria.objects.create(product=rich, category=category, min_salary=90000)
+        for i in range(4):
+            Bank.objects.create(bank_name=f"Far {i}", pincode="560001")
+
+    def check(self, query="", salary=30000, **fields):
+        response = APIClient().post(f"/v1/api/customer/create-or-eligible/{query}", {
+            "full_name": "A", "email": "a@example.com", "phone": "9000000001", "pan": "ABCDE0001F",
+            "dob": "1990-01-01", "salary": salary, "pincode": "110001", "companyName": "Acme", **fields,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def test_top_reasons_only_when_nothing_is_eligible(self):
+        reasons = self.check()["ineligibility_reasons"]
+        self.assertEqual([r["code"] for r in reasons], [
+            "age_out_of_range", "no_salary_criteria", "salary_below_minimum", "pincode_not_served", "pincode_not_served",
+        ])
+        self.assertEqual(reasons[2]["reason"], "Salary below minimum ₹90,000 for CAT A")
+        self.assertEqual(reasons[3], {"bank_name": "Far 0", "reason": "Bank not available in your area (pincode not served)",
+                                      "code": "pincode_not_served"})
+        self.assertNotIn("ineligibility_reasons", self.check(salary=95000))  # Rich is eligible
+        self.assertNotIn("ineligibility_reasons", self.check("?reasons=none"))
+
+    def test_all_reasons_are_capped(self):
+        data = self.check("?reasons=all", salary=95000)
+        self.assertEqual((len(data["ineligibility_reasons"]), data["ineligibility_reasons_truncated"]), (6, False))
+        with mock.patch("bankapp.views.MAX_INELIGIBILITY_REASONS", 4):
+            data = self.check("?reasons=all")
+        self.assertEqual((len(data["ineligibility_reasons"]), data["ineligibility_reasons_truncated"]), (4, True))
+        response = APIClient().post("/v1/api/customer/create-or-eligible/?reasons=some", {}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_company_newer_than_the_snapshot(self):
+        self.assertEqual(self.check(salary=95000, companyName="Initech")["eligible_banks"], [])  # UNLISTED
+        # Written without the on-commit version bump reaching this process
+        Company.objects.create(company_name="Initech", category=CompanyCategory.objects.get(category_name="CAT A"))
+        data = self.check(salary=95000, companyName="Initech")
+        self.assertEqual([row["product_name"] for row in data["eligible_banks"]], ["Rich"])
+
+
+class LoanMathTests(TestCase):
+    def test_parse_foir(self):
+        self.assertEqual(parse_foir("50% of net salary"), (Decimal("50.00"), "deduct"))
+        self.assertEqual(parse_foir("1% fee; FOIR 60% excluding existing EMIs"), (Decimal("60.00"), "ignore"))
+        self.assertEqual(parse_foir("40-50%")[0], Decimal("40.00"))
+        self.assertEqual(parse_foir("N/A"), (None, "deduct"))
+
+    def test_estimate_is_principal_whose_emi_fits_foir(self):
+        product = Product(min_roi=10.5, max_roi=12, max_tenure=60, foir_percent=Decimal("50"),
+                          obligation_handling="deduct", max_loan_amount=Decimal("5000000"))
+        [estimate] = estimate_max_loans([product], salary=60000, existing_emi=5000)
+        self.assertEqual(estimate["loan_estimate"]["emi_capacity"], 25000.0)
+        self.assertAlmostEqual(float(emi(estimate["estimated_max_loan"], 12, 60)), 25000, delta=1)
+
+        product.max_loan_amount = Decimal("500000")
+        [capped] = estimate_max_loans([product], salary=60000, existing_emi=5000)
+        self.assertEqual(capped["estimated_max_loan"], 500000.0)
+        self.assertTrue(capped["loan_estimate"]["capped_by_max_loan"])
+
+
+class EmiEndpointTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        category = CompanyCategory.objects.create(category_name="CAT A")
+        Company.objects.create(company_name="Acme", category=category)
+        bank = Bank.objects.create(bank_name="Bank", pincode="110001")
+        self.loan = Product.objects.create(bank=bank, product_title="Loan", min_tenure=12, max_tenure=36,
+                                           min_roi=10, max_roi=12, max_loan_amount=Decimal("500000"))
+        self.no_roi = Product.objects.create(bank=bank, product_title="No ROI", min_tenure=12, max_tenure=24)
+        for product in (self.loan, self.no_roi):
+            SalaryCriteria.objects.create(product=product, category=category, min_salary=20000)
+
+    def test_grid_for_products_or_eligible_set(self):
+        response = APIClient().get("/v1/api/emi/grid/", {"amount": 100000, "products": f"{self.loan.id},{self.no_roi.id},999999"})
+        self.assertEqual(response.status_code, 200, response.data)
+        data = response.data
+        [grid] = data["products"]
+        self.assertEqual((grid["rois"], grid["tenures"], grid["amount_in_range"]), ([10.0, 11.0, 12.0], [12, 24, 36], True))
+        self.assertEqual(grid["emi"][0][0], 8791.59)  # 1,00,000 at 10% over 12 months
+        self.assertEqual(grid["total_payable"][2][2], round(float(emi(100000, 12, 36)) * 36, 2))
+        self.assertEqual(grid["total_interest"][2][2], round(grid["total_payable"][2][2] - 100000, 2))
+        self.assertEqual(data["skipped"], [{"product_id": self.no_roi.id, "reason": "ROI range not set"}])
+        self.assertEqual(data["not_found"], [999999])
+
+        data = APIClient().get("/v1/api/emi/grid/", {
+            "amount": 900000, "age": 30, "pincode": "110001", "salary": 50000, "companyName": "Acme",
+            "tenure_step": 24, "roi_steps": 1,
+        }).data
+        self.assertEqual([(g["product_name"], g["tenures"], g["rois"], g["amount_in_range"]) for g in data["products"]],
+                         [("Loan", [12, 36], [10.0], False)])
+        self.assertEqual(data["skipped"], [{"product_id": self.no_roi.id, "reason": "ROI range not set"}])
+        self.assertEqual(APIClient().get("/v1/api/emi/grid/", {"amount": 1000}).status_code, 400)
+
+    def test_product_newer_than_the_snapshot_is_found(self):
+        APIClient().get("/v1/api/emi/grid/", {"amount": 100000, "products": str(self.loan.id)})  # loads the snapshot
+        # Written without the on-commit version bump reaching this process
+        newer = Product.objects.create(bank=self.loan.bank, product_title="Newer", min_tenure=12, max_tenure=12,
+                                       min_roi=9, max_roi=9)
+        data = APIClient().get("/v1/api/emi/grid/", {"amount": 100000, "products": f"{newer.id},999999"}).data
+        self.assertEqual([g["product_name"] for g in data["products"]], ["Newer"])
+        self.assertEqual(data["not_found"], [999999])
+
+    def test_amortization_streams_one_row_per_month(self):
+        response = APIClient().get("/v1/api/emi/schedule/", {"amount": 100000, "roi": 12, "tenure": 150})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["month"] for row in rows], list(range(1, 151)))
+        self.assertEqual((rows[0]["interest"], rows[-1]["balance"]), (1000.0, 0.0))
+        self.assertAlmostEqual(sum(row["principal"] for row in rows), 100000, delta=1)
+        self.assertTrue(all(abs(row["principal"] + row["interest"] - row["emi"]) < 0.02 for row in rows))
+
+        response = APIClient().get("/v1/api/emi/schedule/", {"amount": 1200, "roi": 0, "tenure": 12})
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual({(row["principal"], row["interest"]) for row in rows}, {(100.0, 0.0)})
+
+
+class EligibleOfferRankingTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        cache.clear()
+        category = CompanyCategory.objects.create(category_name="CAT A")
+        Company.objects.create(company_name="Acme", category=category)
+        bank = Bank.objects.create(bank_name="Bank", pincode="110001")
+        for title, rois, tenures, max_loan in [
+            ("Cheap", (8, 10), (12, 60), Decimal("200000")),
+            ("Big", (12, 14), (12, 24), Decimal("1000000")),
+            ("Plain", (None, None), (None, None), None),   # estimate falls back to 5 × salary
+        ]:
+            product = Product.objects.create(bank=bank, product_title=title, min_roi=rois[0], max_roi=rois[1],
+                                             min_tenure=tenures[0], max_tenure=tenures[1], max_loan_amount=max_loan)
+            SalaryCriteria.objects.create(product=product, category=category, min_salary=20000)
+
+    def offers(self, query):
+        response = APIClient().post(f"/v1/api/customer/create-or-eligible/?{query}", {
+            "full_name": "A", "email": "a@example.com", "phone": "9000000001", "pan": "ABCDE0001F",
+            "dob": "1990-01-01", "salary": 50000, "pincode": "110001", "companyName": "Acme",
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def test_sort_and_filter(self):
+        data = self.offers("sort=roi")
+        self.assertEqual([o["product_name"] for o in data["eligible_banks"]], ["Cheap", "Big", "Plain"])
+        self.assertEqual(data["eligible_banks_count"], 3)
+        data = self.offers("sort=max_loan&min_loan=210000")
+        self.assertEqual([(o["product_name"], o["estimated_max_loan"]) for o in data["eligible_banks"]],
+                         [("Big", 1000000.0), ("Plain", 250000.0)])
+        self.assertEqual(data["offers"]["matched_count"], 2)
+        data = self.offers("sort=emi&amount=100000")
+        self.assertEqual([o["product_name"] for o in data["eligible_banks"]], ["Cheap", "Big", "Plain"])
+        self.assertEqual(data["eligible_banks"][0]["indicative_emi"],
+                         {"amount": 100000.0, "roi": 10.0, "tenure_months": 60, "emi": round(float(emi(100000, 10, 60)), 2)})
+        self.assertIsNone(data["eligible_banks"][2]["indicative_emi"])
+
+    def test_tenure_filter_and_paging(self):
+        data = self.offers("tenure=48&sort=roi")
+        self.assertEqual([o["product_name"] for o in data["eligible_banks"]], ["Cheap", "Plain"])  # no range accepts any
+        first = self.offers("sort=max_loan&limit=2")
+        self.assertEqual([o["product_name"] for o in first["eligible_banks"]], ["Big", "Plain"])
+        self.assertEqual((first["offers"]["returned_count"], first["offers"]["next_offset"]), (2, 2))
+        last = self.offers(f"sort=max_loan&limit=2&offset={first['offers']['next_offset']}")
+        self.assertEqual([o["product_name"] for o in last["eligible_banks"]], ["Cheap"])
+        self.assertIsNone(last["offers"]["next_offset"])
+        self.assertNotIn("offers", self.offers(""))
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        self.category = CompanyCategory.objects.create(category_name="CAT A")
+        self.banks = [Bank.objects.create(bank_name=f"Bank {i}", pincode="110001") for i in range(3)]
+        for i in range(12):
+            product = Product.objects.create(
+                bank=self.banks[i % 3], product_title=f"Loan {i}",
+                min_roi=None if i % 5 == 0 else 8 + i / 2, max_roi=10 + i,
+                min_tenure=12, max_tenure=None if i % 4 == 0 else 12 * (i + 1),
+                min_loan_amount=Decimal(50000 * i), max_loan_amount=None if i % 3 == 0 else Decimal(200000 * i),
+                min_age=21, max_age=40 + i,
+            )
+            if i % 2:
+                SalaryCriteria.objects.create(product=product, category=self.category, min_salary=20000 + 5000 * i)
+
+    def test_snapshot_and_database_agree(self):
+        snapshot = CatalogSnapshot.load()
+        cases = [
+            {},
+            {"roi_max": 12.0, "age": 45},
+            {"roi_min": 15.0, "tenure_max": 48},
+            {"loan_min": Decimal("1500000"), "bank": [self.banks[0].id]},
+            {"loan_max": Decimal("300000"), "tenure_min": 60},
+            {"category_id": self.category.category_id, "salary": Decimal("50000")},
+        ]
+        for filters in cases:
+            for sort in ("id", "roi", "max_loan", "title"):
+                ids, facets = search_database(filters, sort)
+                self.assertEqual(search_snapshot(snapshot, filters, sort), (list(ids), facets), (filters, sort))
+
+    def test_endpoint_pages_and_facets(self):
+        response = APIClient().get("/v1/api/products/search/", {
+            "category": "cat_a", "bank": self.banks[1].id, "page_size": 2,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual([row["product_title"] for row in response.data["results"]], ["Loan 1", "Loan 7"])
+        self.assertEqual(sum(f["count"] for f in response.data["facets"]["banks"]), 6)
+
+
+class CustomerSearchTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            Customer.objects.create(
+                full_name=f"Ravi Kumar {i}" if i % 2 else f"Anita Rao {i}", email=f"lead{i}@example.com",
+                phone=f"98765000{i:02d}", pan=f"ABCDE{i:04d}F", city="Pune" if i < 3 else "Delhi",
+                salary=30000 + 10000 * i, pincode="411001",
+            )
+
+    def search(self, **params):
+        response = APIClient().get("/v1/api/customers/search/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_partial_match_filters_and_keyset_pages(self):
+        self.assertEqual([c["full_name"] for c in self.search(q="vi kum")["results"]], ["Ravi Kumar 3", "Ravi Kumar 1"])
+        self.assertEqual([c["pan"] for c in self.search(q="e0003")["results"]], ["ABCDE0003F"])
+        self.assertEqual(len(self.search(q="example", city="pune", salary_min=40000)["results"]), 2)
+
+        first = self.search(q="98765", limit=2)
+        second = self.search(q="98765", limit=2, cursor=first["next_cursor"])
+        third = self.search(q="98765", limit=2, cursor=second["next_cursor"])
+        names = [c["full_name"] for page in (first, second, third) for c in page["results"]]
+        self.assertEqual(names, [f"{'Ravi Kumar' if i % 2 else 'Anita Rao'} {i}" for i in range(4, -1, -1)])
+        self.assertIsNone(third["next_cursor"])
+
+    def test_index_follows_customer_updates(self):
+        customer = Customer.objects.get(pan="ABCDE0000F")
+        customer.full_name = "Zubin Mehta"
+        customer.save()
+        self.assertEqual([c["id"] for c in self.search(q="zubin")["results"]], [customer.id])
+        self.assertEqual(self.search(q="anita rao 0")["results"], [])
+
+
+@override_settings(BANKAPP_RATE_LIMITS={"CACHE": "default", "eligibility": {"ip": ["100/min"], "identity": ["2/min"]}})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        cache.clear()
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        self.assertEqual([w.id for w in checks.check_shared_caches(None)], ["bankapp.W001"])
+        with override_settings(BANKAPP_RATE_LIMITS={"CACHE": "shared"}):
+            self.assertEqual(checks.check_shared_caches(None), [])
+
+    def test_sliding_window_counts_part_of_previous_window(self):
+        limiter, start = SlidingWindowLimiter(), 600.0
+        self.assertEqual([limiter.check([("k", "3/min")], now=start + i)[0] for i in range(4)], [True] * 3 + [False])
+        # 30s into the next window half of the previous 3 still count: 1.5 + 1 ≤ 3
+        self.assertEqual(limiter.check([("k", "3/min")], now=start + 90), (True, 0.0))
+        allowed, retry_after = limiter.check([("k", "3/min")], now=start + 91)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 9, delta=0.01)
+
+    def test_eligibility_rejected_per_identity_before_database_work(self):
+        client = APIClient()
+        for _ in range(2):
+            self.assertNotEqual(client.post("/v1/api/customer/create-or-eligible/", {"pan": "ABCDE1234F"}).status_code, 429)
+        with self.assertNumQueries(0):
+            response = client.post("/v1/api/customer/create-or-eligible/", {"pan": "abcde1234f", "email": "x@y.com"})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertNotEqual(client.post("/v1/api/customer/create-or-eligible/", {"pan": "OTHER0000P"}).status_code, 429)
+
+    @override_settings(BANKAPP_RATE_LIMITS={"eligibility": {"identity": ["2/min"]}})
+    def test_idempotent_replays_not_counted(self):
+        client = APIClient()
+        first = client.post("/v1/api/customer/create-or-eligible/", {"pan": "ABCDE1234F"}, HTTP_IDEMPOTENCY_KEY="k1")
+        for _ in range(3):
+            replay = client.post("/v1/api/customer/create-or-eligible/", {"pan": "ABCDE1234F"}, HTTP_IDEMPOTENCY_KEY="k1")
+            self.assertEqual((replay.status_code, replay["Idempotent-Replayed"]), (first.status_code, "true"))
+        self.assertNotEqual(client.post("/v1/api/customer/create-or-eligible/", {"pan": "ABCDE1234F"}).status_code, 429)
+        self.assertEqual(client.post("/v1/api/customer/create-or-eligible/", {"pan": "ABCDE1234F"}).status_code, 429)
+
+
+@override_settings(BANKAPP_IDEMPOTENCY={"CACHE": "shared", "WAIT": 0})
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        cache.clear()
+        self.bank = Bank.objects.create(bank_name="Bank", pincode="110001")
+        self.customer = Customer.objects.create(full_name="A", email="a@example.com", phone="9000000001", pan="ABCDE0001F")
+        self.client = APIClient()
+
+    def post(self, key, **body):
+        return self.client.post("/v1/api/customer-interests/", dict(customer=self.customer.id, bank=self.bank.id, **body),
+                                format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_duplicate_is_replayed_without_running_the_view(self):
+        first = self.post("k1")
+        replay = self.post("k1")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((replay.status_code, replay.data), (201, first.data))
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(CustomerInterest.objects.count(), 1)
+
+        self.assertEqual(self.post("k1", product=None).status_code, 422)
+        self.assertEqual(self.post("k2").status_code, 201)
+        self.assertEqual(CustomerInterest.objects.count(), 2)
+
+    def test_in_flight_duplicate_is_not_executed(self):
+        self.post("k3")
+        key = f"{idempotency.KEY_PREFIX}:customer_interest:{hashlib.sha256(b'k3').hexdigest()}"
+        shared = caches["shared"]  # what every worker sees
+        shared.set(key, dict(shared.get(key), state="in_flight"))  # as if the first request were still running
+        response = self.post("k3")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(CustomerInterest.objects.count(), 1)
+
+    def test_claim_refreshed_while_view_runs(self):
+        cache.set("claim", {"state": "in_flight"}, timeout=0.3)
+        refresher = idempotency.ClaimRefresher(cache, "claim", 0.3)
+        refresher.start()
+        time.sleep(0.6)
+        refresher.stop()
+        self.assertEqual(cache.get("claim"), {"state": "in_flight"})
+
+
+class BufferedInterestTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        self.spool_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(BANKAPP_INTEREST_BUFFER={"AUTO_FLUSH": False, "SPOOL_DIR": self.spool_dir})
+        self.settings_override.enable()
+        interest_buffer._buffer = None
+        self.bank = Bank.objects.create(bank_name="Bank", pincode="110001")
+        self.product = Product.objects.create(bank=self.bank, product_title="Loan")
+        self.other_bank = Bank.objects.create(bank_name="Other", pincode="110001")
+        self.customer = Customer.objects.create(full_name="A", email="a@example.com", phone="9000000001", pan="ABCDE0001F")
+
+    def tearDown(self):
+        interest_buffer._buffer = None
+        self.settings_override.disable()
+
+    def post(self, **body):
+        return APIClient().post("/v1/api/customer-interests/?buffered=true", body, format="json")
+
+    def test_accepts_then_writes_in_one_batch(self):
+        for _ in range(3):
+            self.assertEqual(self.post(customer=self.customer.id, bank=self.bank.id, product=self.product.id).status_code, 202)
+        self.post(customer=999999, bank=self.bank.id)  # unknown customer: accepted, dropped at flush
+        self.assertEqual(self.post(customer=self.customer.id, bank=self.other_bank.id, product=self.product.id).status_code, 400)
+        self.assertEqual(CustomerInterest.objects.count(), 0)
+
+        # catalog version, customers, savepoint, INSERT, lead payloads, outbox INSERT, funnel upsert, release
+        with self.assertNumQueries(8):
+            self.assertEqual(interest_buffer.get_buffer().flush(), 3)
+        self.assertEqual(CustomerInterest.objects.filter(product=self.product).count(), 3)
+
+    def test_failed_flush_spools_and_replays(self):
+        buffer = interest_buffer.get_buffer()
+        buffer.add(self.customer.id, self.bank.id)
+        buffer._spool(buffer._take())  # what a failed flush does
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+        self.assertEqual(buffer.replay_spool(), 1)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+        self.assertEqual(CustomerInterest.objects.count(), 1)
+
+    def test_stale_rows_do_not_block_the_batch(self):
+        buffer = interest_buffer.get_buffer()
+        eligibility.get_snapshot()
+        newer = Product.objects.create(bank=self.bank, product_title="Newer")  # not in the loaded snapshot
+        self.assertEqual(self.post(customer=self.customer.id, bank=self.bank.id, product=newer.id).status_code, 202)
+        buffer.add(self.customer.id, self.bank.id)
+        buffer.add(self.customer.id, self.bank.id, self.product.id)
+        deleted = self.product.id
+        self.product.delete()  # after the snapshot / customer checks: the insert hits its foreign key
+        bulk_create = CustomerInterest.objects.bulk_create
+
+        def insert(objs, *args, **kwargs):
+            if any(obj.product_id == deleted for obj in objs):
+                raise IntegrityError("FOREIGN KEY constraint failed")
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(CustomerInterest.objects, "bulk_create", side_effect=insert), \
+                self.assertLogs("bankapp.interest_buffer", "WARNING"):
+            written = buffer.flush()
+        self.assertEqual(written, 2)
+        self.assertEqual(sorted(CustomerInterest.objects.values_list("product_id", flat=True), key=str), [newer.id, None])
+        self.assertEqual((buffer.stats["dropped"], os.listdir(self.spool_dir)), (1, []))
+
+    @skipIf(os.name == "nt", "dead replayers are only detected on POSIX")
+    def test_file_orphaned_by_dead_replayer_is_replayed(self):
+        buffer = interest_buffer.get_buffer()
+        buffer.add(self.customer.id, self.bank.id)
+        buffer._spool(buffer._take())
+        name = os.listdir(self.spool_dir)[0]
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        os.rename(os.path.join(self.spool_dir, name), os.path.join(self.spool_dir, f"{name}.{dead.pid}.replaying"))
+        self.assertEqual(buffer.replay_spool(), 1)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_unspoolable_rows_stay_buffered_and_flusher_restarts(self):
+        buffer = interest_buffer.get_buffer()
+        buffer.add(self.customer.id, self.bank.id)
+        with mock.patch.object(buffer, "_write", side_effect=RuntimeError("db down")), \
+                mock.patch.object(buffer, "_spool", side_effect=OSError("disk full")), \
+                self.assertLogs("bankapp.interest_buffer", "ERROR"):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending(), 1)
+
+        buffer._thread = dead = threading.Thread(target=lambda: None)
+        dead.start()
+        dead.join()
+        with mock.patch.object(buffer, "_run"):
+            buffer._ensure_thread()
+            self.assertIsNot(buffer._thread, dead)
+            buffer._thread.join()
+
+
+class LeadOutboxTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        self.bank = Bank.objects.create(bank_name="Bank", pincode="110001")
+        self.product = Product.objects.create(bank=self.bank, product_title="Loan")
+        self.customer = Customer.objects.create(full_name="A", email="a@example.com", phone="9000000001", pan="ABCDE0001F")
+
+    def test_interest_and_lead_written_together(self):
+        response = APIClient().post("/v1/api/customer-interests/",
+                                    {"customer": self.customer.id, "bank": self.bank.id, "product": self.product.id}, format="json")
+        self.assertEqual(response.status_code, 201)
+        lead = LeadOutbox.objects.get()
+        self.assertEqual((lead.interest_id, lead.bank_id, lead.status), (response.data["data"]["id"], self.bank.id, "pending"))
+        self.assertEqual(lead.payload["email"], "a@example.com")
+        self.assertEqual(lead.payload["product_title"], "Loan")
+
+    def test_batches_delivered_with_backoff_on_failure(self):
+        interests = CustomerInterest.objects.bulk_create([CustomerInterest(customer=self.customer, bank=self.bank) for _ in range(3)])
+        lead_outbox.record_leads([i.pk for i in interests])
+        with lead_outbox.LocalLeadReceiver() as receiver, \
+                override_settings(BANKAPP_LEAD_DELIVERY={"WEBHOOK_URL": receiver.url, "BATCH_SIZE": 2, "BACKOFF": 60}):
+            receiver.fail_next(1)
+            summary = lead_outbox.dispatch_once()
+            self.assertEqual((summary["batches"], summary["failed_batches"]), (1, 1))
+            failed = LeadOutbox.objects.filter(attempts=1, status="pending")
+            self.assertEqual(failed.count(), 2)
+            self.assertGreater(failed.first().next_attempt_at, failed.first().created_at)
+
+            self.assertEqual(lead_outbox.dispatch_once()["delivered"], 1)  # the two failed ones wait out the backoff
+            failed.update(next_attempt_at=failed.first().created_at)
+            self.assertEqual(lead_outbox.dispatch_once()["delivered"], 2)
+
+        self.assertEqual(LeadOutbox.objects.filter(status="delivered").count(), 3)
+        self.assertEqual([path for path, _ in receiver.batches], [f"/leads/{self.bank.id}"] * 2)
+        self.assertEqual(sum(len(body["leads"]) for _, body in receiver.batches), 3)
+        self.assertEqual(lead_outbox.delivery_metrics()["pending"], 0)
+
+    def test_webhook_session_per_thread(self):
+        transport = lead_outbox.WebhookTransport({"WEBHOOK_URL": "http://127.0.0.1/", "TIMEOUT": 1})
+        sessions = []
+        worker = threading.Thread(target=lambda: sessions.append(transport.session))
+        worker.start()
+        worker.join()
+        self.assertIs(transport.session, transport.session)
+        self.assertIsNot(sessions[0], transport.session)
+
+
+class LeadExportTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        self.output_dir = tempfile.mkdtemp()
+        self.day = date(2026, 3, 1)
+        self.banks = [Bank.objects.create(bank_name=f"Bank {i}", pincode="110001") for i in range(2)]
+        product = Product.objects.create(bank=self.banks[0], product_title="Loan")
+        customer = Customer.objects.create(full_name="A", email="a@example.com", phone="9000000001", pan="ABCDE0001F")
+        EligibilityResult.objects.create(customer=customer, bank=self.banks[0], product=product, min_salary_required=Decimal("25000"))
+        start, _ = lead_exports.day_bounds(self.day)
+        CustomerInterest.objects.bulk_create([
+            CustomerInterest(customer=customer, bank=self.banks[0], product=product),
+            CustomerInterest(customer=customer, bank=self.banks[0]),
+            CustomerInterest(customer=customer, bank=self.banks[1]),
+        ])
+        CustomerInterest.objects.update(created_at=start)
+
+    def read(self, bank):
+        with gzip.open(os.path.join(self.output_dir, self.day.isoformat(), f"bank_{bank.id}.csv.gz"), "rt") as fh:
+            return [line.rstrip("\n").split(",") for line in fh]
+
+    def test_files_per_bank_and_reruns_only_changed(self):
+        summary = lead_exports.export_day(self.day, output_dir=self.output_dir)
+        self.assertEqual(summary["written"], [self.banks[0].id, self.banks[1].id])
+        rows = self.read(self.banks[0])
+        eligible = rows[0].index("eligible")
+        self.assertEqual([row[eligible:] for row in rows[1:]], [["yes", "25000.00"]] * 2)  # product / cheapest at the bank
+        self.assertEqual(self.read(self.banks[1])[1][eligible:], ["no", ""])
+
+        self.assertEqual(lead_exports.export_day(self.day, output_dir=self.output_dir)["written"], [])
+        CustomerInterest.objects.filter(bank=self.banks[1]).delete()
+        os.remove(os.path.join(self.output_dir, self.day.isoformat(), f"bank_{self.banks[0].id}.csv.gz"))
+        summary = lead_exports.export_day(self.day, output_dir=self.output_dir)
+        self.assertEqual((summary["written"], summary["removed"]), ([self.banks[0].id], [self.banks[1].id]))
+        manifest = lead_exports.load_manifest(os.path.join(self.output_dir, self.day.isoformat()))
+        self.assertEqual(list(manifest["banks"]), [str(self.banks[0].id)])
+
+    def test_customer_edit_regenerates_file(self):
+        lead_exports.export_day(self.day, output_dir=self.output_dir)
+        Customer.objects.update(email="new@example.com")
+        summary = lead_exports.export_day(self.day, output_dir=self.output_dir)
+        self.assertEqual(summary["written"], [self.banks[0].id, self.banks[1].id])
+        rows = self.read(self.banks[0])
+        self.assertEqual({row[rows[0].index("email")] for row in rows[1:]}, {"new@example.com"})
+
+
+class LiveFeedTests(TestCase):
+    def setUp(self):
+        live_feed._broker = None
+
+    def tearDown(self):
+        live_feed._broker = None
+
+    async def test_stream_sends_snapshot_then_events_and_replays(self):
+        response = await self.async_client.get("/v1/api/admin-dashboard/stream/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b"retry:"))
+        self.assertIn(b"event: snapshot", await anext(chunks))
+
+        event_id = live_feed.get_broker().publish("product", {"action": "created", "product": {"id": 7}})
+        message = await anext(chunks)
+        self.assertIn(f"id: {event_id}\nevent: product".encode(), message)
+        await chunks.aclose()
+
+        response = await self.async_client.get("/v1/api/admin-dashboard/stream/", headers={"Last-Event-ID": str(event_id - 1)})
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)  # retry hint
+        self.assertEqual(await anext(chunks), message)  # replayed, no new snapshot
+        await chunks.aclose()
+
+    def test_stream_refused_under_wsgi(self):
+        response = self.client.get("/v1/api/admin-dashboard/stream/")
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.json()["status"], "error")
+        self.assertFalse(live_feed.get_broker().has_subscribers())
+
+    def test_writes_published_after_commit(self):
+        loop = asyncio.new_event_loop()
+        try:
+            subscription = live_feed.get_broker().subscribe(loop)
+            bank = Bank.objects.create(bank_name="Bank", pincode="110001")
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.create(bank=bank, product_title="Loan")
+            message = loop.run_until_complete(subscription.get(1))
+            self.assertIn("event: product", message)
+            self.assertIn('"bank_name":"Bank"', message)
+            subscription.close()
+        finally:
+            loop.close()
+
+
+class FunnelTests(TestCase):
+    def setUp(self):
+        eligibility.bump_catalog_version()  # catalog writes only bump it on commit; TestCase never commits
+        cache.clear()
+        category = CompanyCategory.objects.create(category_name="CAT A")
+        Company.objects.create(company_name="Acme", category=category)
+        self.bank = Bank.objects.create(bank_name="Near", pincode="110001")
+        self.product = Product.objects.create(bank=self.bank, product_title="Loan")
+        SalaryCriteria.objects.create(product=self.product, category=category, min_salary=20000)
+        self.far_bank = Bank.objects.create(bank_name="Far", pincode="560001")
+        self.far_product = Product.objects.create(bank=self.far_bank, product_title="Far loan")
+        SalaryCriteria.objects.create(product=self.far_product, category=category, min_salary=20000)
+        self.client = APIClient()
+
+    def test_checks_and_interests_feed_the_daily_counters(self):
+        response = self.client.post("/v1/api/customer/create-or-eligible/", {
+            "full_name": "A", "email": "a@example.com", "phone": "9000000001", "pan": "ABCDE0001F",
+            "dob": "1990-01-01", "salary": 50000, "pincode": "110001", "companyName": "Acme",
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        customer = Customer.objects.get()
+        for product in (self.product, self.far_product):
+            body = {"customer": customer.id, "bank": product.bank_id, "product": product.id}
+            self.assertEqual(self.client.post("/v1/api/customer-interests/", body, format="json").status_code, 201)
+
+        self.assertEqual(DailyFunnelStat.objects.count(), 2)
+        with self.assertNumQueries(1):
+            response = self.client.get("/v1/api/analytics/funnel/?group_by=bank")
+        rows = {row["bank_name"]: row for row in response.data["results"]}
+        self.assertEqual((rows["Near"]["eligible"], rows["Near"]["interests"], rows["Near"]["eligible_interests"]), (1, 1, 1))
+        self.assertEqual((rows["Far"]["eligible"], rows["Far"]["interests"], rows["Far"]["eligible_interests"]), (0, 1, 0))
+        self.assertEqual(response.data["totals"]["conversion"], 1.0)
+
+        response = self.client.get("/v1/api/analytics/funnel/?group_by=region,product")
+        self.assertEqual([(r["region"], r["product_title"]) for r in response.data["results"]],
+                         [("110", "Loan"), ("110", "Far loan")])  # the applicant's region, not the bank's
+
+
+class DedupeCustomersTests(TestCase):
+    def setUp(self):
+        self.bank = Bank.objects.create(bank_name="Bank", pincode="110001")
+
+    def customer(self, email, phone, pan, **extra):
+        return Customer.objects.create(full_name="A", email=email, phone=phone, pan=pan, **extra)
+
+    def test_clusters_by_normalized_keys_and_merges_into_oldest(self):
+        first = self.customer("a.b@gmail.com", "9000000001", "ABCDE0001F")
+        by_email = self.customer(" A.B+loans@GMAIL.com", "9000000002", "ABCDE0002F", city="Delhi")
+        by_phone = self.customer("x@example.com", "+91 90000 00002", "ABCDE0003F")  # chains through by_email
+        by_pan = self.customer("y@example.com", "9000000004", "abcde0001f")
+        other = self.customer("z@example.com", "9000000005", "ABCDE0005F")
+        for c in (by_email, by_phone, by_pan, other):
+            CustomerInterest.objects.create(customer=c, bank=self.bank)
+
+        clusters = dedupe.find_clusters(chunk_size=2)
+        self.assertEqual(clusters, [[first.id, by_email.id, by_phone.id, by_pan.id]])
+
+        summary = dedupe.merge_clusters(clusters)
+        self.assertEqual((summary["customers_removed"], summary["interests_repointed"]), (3, 3))
+        self.assertEqual(sorted(Customer.objects.values_list("id", flat=True)), [first.id, other.id])
+        self.assertEqual(CustomerInterest.objects.filter(customer=first).count(), 3)
+        first.refresh_from_db()
+        self.assertEqual(first.city, "Delhi")
 
-# Create your tests here.
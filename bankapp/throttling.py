@@ -0,0 +1,165 @@
+"""
+Sliding-window rate limiting on the Django cache.
+
+Each limit ("30/min") keeps one counter per fixed window in the cache. The
+count over the last `window` seconds is estimated from the current and the
+previous window, weighting the previous one by how much of it still falls
+inside the sliding window:
+
+    estimate = previous × (1 − elapsed / window) + current
+
+That costs two cache keys per limit (whatever the traffic) and avoids the
+burst a plain fixed window allows at its boundary.
+
+Settings (BANKAPP_RATE_LIMITS):
+    "CACHE":  cache alias holding the counters. Use a cache shared by every
+              worker process (Redis, Memcached, database) in production;
+              local memory limits per process (`check --deploy` warns).
+              The database cache's incr() reads then writes, so requests
+              racing on one counter may be under-counted; Redis is exact.
+    "<scope>": {"ip": [rates], "identity": [rates]} for a throttle scope,
+              e.g. "eligibility". Identity limits apply to each of the
+              request's email / phone / PAN separately.
+"""
+import hashlib
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from . import idempotency
+
+DEFAULTS = {
+    "CACHE": "default",
+    "eligibility": {
+        "ip": ["30/min", "300/hour"],
+        "identity": ["5/min", "20/day"],
+    },
+}
+IDENTITY_FIELDS = ("email", "phone", "pan")
+KEY_PREFIX = "ratelimit"
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def get_options():
+    options = dict(DEFAULTS)
+    options.update(getattr(settings, "BANKAPP_RATE_LIMITS", {}))
+    return options
+
+
+@lru_cache(maxsize=64)
+def parse_rate(rate):
+    """"30/min", "5/10s", "100/day" → (requests, window seconds)."""
+    count, period = rate.split("/")
+    period = period.strip()
+    digits = "".join(c for c in period if c.isdigit())
+    unit = period[len(digits):].strip()[:1].lower()
+    if unit not in _PERIODS:
+        raise ValueError(f"Invalid rate {rate!r}: period must be s, min, hour or day")
+    return int(count), (int(digits) if digits else 1) * _PERIODS[unit]
+
+
+class SlidingWindowLimiter:
+    """Sliding-window counters for any number of (key, rate) limits, one cache round trip per check."""
+
+    def __init__(self, cache_alias="default"):
+        self.cache = caches[cache_alias]
+
+    @staticmethod
+    def _window_keys(key, window, now):
+        index = int(now // window)
+        elapsed = (now - index * window) / window
+        prefix = f"{KEY_PREFIX}:{key}:{window}"
+        return f"{prefix}:{index}", f"{prefix}:{index - 1}", elapsed
+
+    def check(self, limits, now=None):
+        """
+        limits: [(key, rate), ...]. Returns (allowed, retry_after seconds).
+        Nothing is counted when any limit is exceeded.
+        """
+        now = time.time() if now is None else now
+        windows = []
+        for key, rate in limits:
+            count, window = parse_rate(rate)
+            current, previous, elapsed = self._window_keys(key, window, now)
+            windows.append((count, window, current, previous, elapsed))
+
+        counters = self.cache.get_many([k for w in windows for k in w[2:4]])
+        retry_after = 0.0
+        for count, window, current, previous, elapsed in windows:
+            in_current, in_previous = counters.get(current, 0), counters.get(previous, 0)
+            if in_previous * (1 - elapsed) + in_current + 1 > count:
+                retry_after = max(retry_after, self._wait(count, window, in_current, in_previous, elapsed))
+        if retry_after:
+            return False, retry_after
+
+        for count, window, current, previous, elapsed in windows:
+            self._incr(current, window)
+        return True, 0.0
+
+    @staticmethod
+    def _wait(count, window, in_current, in_previous, elapsed):
+        """Seconds until one more request fits, assuming no further traffic."""
+        room = count - 1 - in_current
+        if room >= 0 and in_previous:
+            # previous × (1 − f) ≤ room  →  f ≥ 1 − room / previous
+            return max((1 - room / in_previous - elapsed) * window, 1.0)
+        # Wait into the next window, where this window becomes the previous one
+        fraction = 1 - (count - 1) / in_current if in_current else 0.0
+        return (1 - elapsed + max(fraction, 0.0)) * window
+
+    def _incr(self, key, window):
+        if self.cache.add(key, 1, timeout=2 * window + 1):
+            return
+        try:
+            self.cache.incr(key)
+        except ValueError:  # expired between add() and incr()
+            self.cache.set(key, 1, timeout=2 * window + 1)
+
+
+def _digest(value):
+    return hashlib.sha1(str(value).strip().lower().encode()).hexdigest()[:20]
+
+
+class ScopedRateThrottle(BaseThrottle):
+    """
+    DRF throttle applying the BANKAPP_RATE_LIMITS[scope] limits per client IP and
+    per identity field in the request body. Runs in APIView.initial(), before the view.
+    Requests that will be answered from a stored Idempotency-Key response are
+    not counted when `idempotency_scope` names the view's @idempotent scope.
+    """
+    scope = None
+    idempotency_scope = None
+
+    def get_limits(self, request):
+        options = get_options()
+        scoped = options.get(self.scope) or {}
+        limits = [(f"{self.scope}:ip:{self.get_ident(request)}", rate) for rate in scoped.get("ip", ())]
+        data = request.data if hasattr(request.data, "get") else {}
+        for field in IDENTITY_FIELDS:
+            value = data.get(field)
+            if value:
+                key = f"{self.scope}:{field}:{_digest(value)}"
+                limits.extend((key, rate) for rate in scoped.get("identity", ()))
+        return limits
+
+    def allow_request(self, request, view):
+        limits = self.get_limits(request)
+        if not limits:
+            return True
+        if self.idempotency_scope and idempotency.is_replay(request, self.idempotency_scope):
+            return True
+        allowed, self._wait_seconds = SlidingWindowLimiter(get_options()["CACHE"]).check(limits)
+        return allowed
+
+    def wait(self):
+        return math.ceil(getattr(self, "_wait_seconds", 0)) or None
+
+
+class EligibilityRateThrottle(ScopedRateThrottle):
+    scope = "eligibility"
+    idempotency_scope = "eligibility"
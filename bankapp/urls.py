@@ -7,6 +7,7 @@ urlpatterns = [
     path("admin/update/<int:pk>/", views.update_admin, name="update-admin"),
 
     path("customer/create-or-eligible/", views.customer_create_or_eligible_banks, name="customer_create_or_eligible_banks"),
+    path("customers/search/", views.customer_search, name="customer-search"),
 
     path("banks/", views.bank_list_create, name="bank_list"),              # GET all, POST
     path("banks/<int:pk>/", views.bank_detail, name="bank_detail"),  # GET one, PUT, DELETE
@@ -17,10 +18,18 @@ urlpatterns = [
 
     path("products/", views.product_list, name="product-list-create"),
     path("products/<int:pk>/", views.product_list, name="product-detail"),
+    path("products/search/", views.product_search, name="product-search"),
     path("products/bank/<int:bank_id>/", views.get_products_by_bank, name="products-by-bank"),
+    path("products/catalog/export/", views.catalog_export, name="catalog-export"),
+    path("products/catalog/import/", views.catalog_import, name="catalog-import"),
 
     path('managed-cards/', views.managed_card_list_create, name='managed-card-list-create'),
     path('managed-cards/<int:pk>/', views.managed_card_detail, name='managed-card-detail'),
+    path('media-uploads/<int:pk>/', views.media_upload_detail, name='media-upload-detail'),
+
+    path('jobs/', views.job_list_create, name='job-list-create'),
+    path('jobs/<int:pk>/', views.job_detail, name='job-detail'),
+    path('leads/metrics/', views.lead_delivery_metrics, name='lead-delivery-metrics'),
     
     path('company-categories/', views.company_category_list_create, name='company-category-list'),
     path('company-categories/<int:pk>/', views.company_category_detail, name='company-category-detail'),
@@ -32,8 +41,14 @@ urlpatterns = [
     path('salary-criteria/<int:pk>/', views.salary_criteria_detail, name="salary-criteria-detail"),
 
     path ('get-all-eligiblity-checks/', views.get_all_eligibility_checks, name='get-all-eligiblity-checks'),
+    path('eligibility/frontier/', views.eligibility_frontier, name='eligibility-frontier'),
+    path('emi/grid/', views.emi_grid_view, name='emi-grid'),
+    path('emi/schedule/', views.amortization_schedule, name='emi-schedule'),
+    path('audience/size/', views.audience_size, name='audience-size'),
+    path('analytics/funnel/', views.funnel_analytics, name='funnel-analytics'),
 
     path('admin-dashboard/', views.admin_dashboard, name='admin-dashboard'),
+    path('admin-dashboard/stream/', views.admin_dashboard_stream, name='admin-dashboard-stream'),
 
 ]
 
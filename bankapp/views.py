@@ -1,12 +1,42 @@
-from rest_framework.decorators import api_view
+import asyncio
+import heapq
+import json
+import time
+from itertools import islice
+
+import numpy as np
+
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 from rest_framework import serializers
 from rest_framework import status
 from datetime import date
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import Min
 from django.utils import timezone
 from rest_framework.pagination import PageNumberPagination
-from .models import Customer, Bank, CustomerInterest ,Product, User, ManagedCard, CompanyCategory, Company, SalaryCriteria
-from .serializers import CustomerSerializer, BankSerializer, CustomerInterestSerializer , AdminLoginSerializer , ProductSerializer , UserSerializer, ManagedCardSerializer , CompanyCategorySerializer, CompanySerializer , SalaryCriteriaSerializer,DashboardSerializer
+from rest_framework.utils.urls import replace_query_param
+from .models import Customer, Bank, CustomerInterest ,Product, User, ManagedCard, CompanyCategory, Company, SalaryCriteria, MediaUpload, Job
+from .serializers import CustomerSerializer, BankSerializer, CustomerInterestSerializer , AdminLoginSerializer , ProductSerializer , UserSerializer, ManagedCardSerializer , CompanyCategorySerializer, CompanySerializer , SalaryCriteriaSerializer,DashboardSerializer, CatalogImportSerializer, RecentInterestSerializer, RecentProductSerializer, parse_sparse_params, MediaUploadSerializer, JobSerializer, AudienceSizeSerializer, EligibilityFrontierSerializer, EmiGridSerializer, AmortizationSerializer, EligibleOffersQuerySerializer, ProductSearchSerializer, CustomerSearchSerializer, BufferedInterestSerializer, FunnelReportSerializer
+from .catalog_io import export_catalog, import_catalog
+from .fast_reads import bank_rows, product_rows, salary_criteria_rows, company_rows
+from .media_uploads import split_deferred_file, defer_upload
+from .eligibility import get_snapshot, peek_snapshot, calculate_age
+from .audience import get_customer_columns, size_audience
+from .customer_search import search_customers
+from .product_search import search_snapshot, search_database, bank_facets, resolve_category_filter
+from .loan_math import estimate_max_loans, emi_grid, amortization_rows, emi
+from .throttling import EligibilityRateThrottle
+from .idempotency import idempotent
+from .interest_buffer import get_buffer as get_interest_buffer, get_options as get_interest_buffer_options, validate_interest
+from .lead_outbox import record_leads, delivery_metrics
+from .funnel import record_check, record_interests, funnel_report, default_range
+from .live_feed import format_event, get_broker as get_live_feed_broker, get_options as get_live_feed_options, publish_on_commit
+from . import jobs
 # 🔹 Admin Login API
 @api_view(["POST"])
 def admin_login(request):
@@ -61,19 +91,107 @@ def update_admin(request, pk):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+TOP_INELIGIBILITY_REASONS = 5
+MAX_INELIGIBILITY_REASONS = 200
+
+
+def _select_offers(eligible, products, options):
+    """
+    Filter, rank and page eligible offers (`eligible` response dicts with
+    their matching snapshot products). Ranking takes the top offset + limit
+    with a heap instead of sorting everything. Returns (page, matched count).
+    """
+    min_loan, tenure = options.get("min_loan"), options.get("tenure")
+    candidates = []
+    for index, (entry, product) in enumerate(zip(eligible, products)):
+        if min_loan is not None and entry["estimated_max_loan"] < min_loan:
+            continue
+        # Like age, a product without a tenure range accepts any tenure
+        if tenure is not None and not ((product.min_tenure or 0) <= tenure <= (product.max_tenure or tenure)):
+            continue
+        candidates.append((index, entry, product))
+
+    sort = options.get("sort")
+    if sort == "emi" or "amount" in options:
+        # Indicative EMI for the requested amount (else the estimated max loan),
+        # at the upper ROI over the requested (else longest) tenure — one vectorized call
+        amounts = [float(options["amount"]) if "amount" in options else e["estimated_max_loan"] for _, e, _ in candidates]
+        rois = [p.max_roi if p.max_roi is not None else p.min_roi for _, _, p in candidates]
+        tenures = [tenure or p.max_tenure or p.min_tenure for _, _, p in candidates]
+        emis = emi(amounts, [np.nan if r is None else r for r in rois], [t or np.nan for t in tenures])
+        for (_, entry, _), amount, roi, months, value in zip(candidates, amounts, rois, tenures, emis):
+            entry["indicative_emi"] = (
+                {"amount": amount, "roi": roi, "tenure_months": months, "emi": round(float(value), 2)}
+                if np.isfinite(value) else None
+            )
+
+    limit, offset = options.get("limit"), options.get("offset", 0)
+    wanted = offset + limit if limit else len(candidates)
+    if sort == "roi":
+        def key(c):
+            roi = c[2].min_roi if c[2].min_roi is not None else c[2].max_roi
+            return (roi if roi is not None else float("inf"), c[0])
+    elif sort == "max_loan":
+        def key(c):
+            return (-c[1]["estimated_max_loan"], c[0])
+    elif sort == "emi":
+        def key(c):
+            value = c[1]["indicative_emi"]
+            return (value["emi"] if value else float("inf"), c[0])
+    else:
+        key = None
+    ranked = heapq.nsmallest(wanted, candidates, key=key) if key else candidates[:wanted]
+    return [entry for _, entry, _ in ranked[offset:offset + limit if limit else None]], len(candidates)
+
+
+def _applicant_snapshot(company_name, pincode):
+    """
+    The catalog snapshot, reloaded when the applicant's company or pincode is
+    missing from it but present in the database (a write whose version bump
+    hasn't reached this process).
+    """
+    snapshot = get_snapshot()
+    name = (company_name or "").strip()
+    if (
+        (name and name.lower() not in snapshot.company_categories
+         and Company.objects.filter(company_name__iexact=name).exists())
+        or (pincode and not snapshot.banks_serving(pincode) and Bank.objects.filter(pincode__contains=pincode).exists())
+    ):
+        snapshot = get_snapshot(refresh=True)
+    return snapshot
+
 
 @api_view(["POST"])
+@throttle_classes([EligibilityRateThrottle])
+@idempotent("eligibility")
 def customer_create_or_eligible_banks(request):
     """
     Check loan eligibility for a customer based on:
     - Company category and salary criteria
     - Age limits from product
     - Bank coverage by pincode
-    Restriction: A customer can check eligibility only once per day.
+    Rate limited per client IP and per email / phone / PAN (BANKAPP_RATE_LIMITS);
+    over-limit requests get 429 with Retry-After before any database work.
+    Retries carrying the same Idempotency-Key header get the first response back.
+    ?reasons=top (default) → first 5 ineligibility reasons when nothing is eligible,
+    ?reasons=all → every reason (capped), ?reasons=none → no reasons.
     """
     try:
         data = request.data
 
+        reasons_mode = request.query_params.get("reasons", "top").strip().lower()
+        if reasons_mode not in ("top", "all", "none"):
+            return Response({
+                "status": "error",
+                "message": "reasons must be one of: top, all, none"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # ?sort= / ?min_loan= / ?tenure= / ?amount= / ?limit= / ?offset= rank and page the offers
+        offers_query = EligibleOffersQuerySerializer(data=request.query_params)
+        if not offers_query.is_valid():
+            return Response(offers_query.errors, status=status.HTTP_400_BAD_REQUEST)
+        offer_options = {k: v for k, v in offers_query.validated_data.items() if k in request.query_params}
+
         # Step 1: Validate Required Fields
         required_fields = ["full_name", "email", "phone", "dob", "salary", "pincode"]
         missing_fields = [field for field in required_fields if not data.get(field)]
@@ -89,6 +207,15 @@ def customer_create_or_eligible_banks(request):
         company_name = data.get("companyName", "").strip()
         applicant_salary = float(data.get("salary", 0))
         applicant_pincode = str(data.get("pincode", "")).strip()
+        try:
+            existing_emi = float(data.get("existing_emi") or 0)  # optional, monthly EMIs already being paid
+        except (TypeError, ValueError):
+            existing_emi = -1
+        if existing_emi < 0:
+            return Response({
+                "status": "error",
+                "message": "existing_emi must be a non-negative number"
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         # Step 2: Check if customer already exists
         customer = Customer.objects.filter(email=email).first() or Customer.objects.filter(phone=phone).first()
@@ -131,116 +258,101 @@ def customer_create_or_eligible_banks(request):
             (today.month, today.day) < (customer.dob.month, customer.dob.day)
         )
 
-        # Step 5: Determine Company Category
-        company_category = None
-        if company_name:
-            try:
-                company_obj = Company.objects.filter(company_name__iexact=company_name).first()
-                if company_obj:
-                    company_category = company_obj.category
-                else:
-                    company_category, _ = CompanyCategory.objects.get_or_create(category_name="UNLISTED")
-            except Exception:
-                company_category, _ = CompanyCategory.objects.get_or_create(category_name="UNLISTED")
-        else:
-            company_category, _ = CompanyCategory.objects.get_or_create(category_name="UNLISTED")
+        # Step 5: Determine Company Category (from the cached catalog snapshot)
+        snapshot = _applicant_snapshot(company_name, applicant_pincode)
+        category_id = snapshot.resolve_category(company_name)
+        category_name = snapshot.category_name(category_id)
 
         # Step 6: Check Eligibility
+        matches = list(snapshot.eligible_products(age, applicant_pincode, category_id, applicant_salary))
+        # Max loan per product from FOIR / ROI / tenure, one vectorized pass (see loan_math.py)
+        estimates = estimate_max_loans([product for product, _ in matches], applicant_salary, existing_emi)
+
         eligible_banks = []
-        ineligibility_reasons = []
-
-        for bank in Bank.objects.all():
-            bank_pins = bank.get_pincode_list()
-            if applicant_pincode not in bank_pins:
-                ineligibility_reasons.append({
-                    "bank_name": bank.bank_name,
-                    "reason": "Bank not available in your area (pincode not served)"
-                })
-                continue
-
-            for product in Product.objects.filter(bank=bank):
-                # Check age range
-                if product.min_age and product.max_age:
-                    if not (product.min_age <= age <= product.max_age):
-                        ineligibility_reasons.append({
-                            "bank_name": bank.bank_name,
-                            "product": product.product_title,
-                            "reason": f"Age {age} not in range {product.min_age}-{product.max_age}"
-                        })
-                        continue
-
-                salary_criteria_list = SalaryCriteria.objects.filter(
-                    product=product, category=company_category
-                )
-                if not salary_criteria_list.exists():
-                    ineligibility_reasons.append({
-                        "bank_name": bank.bank_name,
-                        "product": product.product_title,
-                        "reason": f"No salary criteria defined for category '{company_category.category_name}'"
-                    })
-                    continue
-
-                matched_criteria = None
-                salary_ok = False
-                for criteria in salary_criteria_list:
-                    if applicant_salary >= float(criteria.min_salary):
-                        salary_ok = True
-                        matched_criteria = criteria
-                        break
-
-                if not salary_ok:
-                    min_required = float(salary_criteria_list.first().min_salary)
-                    ineligibility_reasons.append({
-                        "bank_name": bank.bank_name,
-                        "product": product.product_title,
-                        "reason": f"Salary below minimum ₹{min_required:,.0f} for {company_category.category_name}"
-                    })
-                    continue
-
-                # ✅ Eligible bank
-                eligible_banks.append({
-                    "bank_id": bank.id,
-                    "bank_name": bank.bank_name,
-                    "product_id": product.id,
-                    "product_name": product.product_title,
-                    "eligibility_status": "Eligible",
-                    "company_category": company_category.category_name,
-                    "min_salary_required": float(matched_criteria.min_salary),
-                    "applicant_salary": applicant_salary,
-                    "age_requirement": f"{product.min_age}-{product.max_age} years" if product.min_age and product.max_age else "N/A",
-                    "applicant_age": age,
-                    "tenure_range": f"{product.min_tenure}-{product.max_tenure} months" if product.min_tenure and product.max_tenure else "N/A",
-                    "roi_range": f"{product.min_roi}%-{product.max_roi}%" if product.min_roi and product.max_roi else "N/A",
-                    "loan_amount_range": {
-                        "min": float(product.min_loan_amount) if product.min_loan_amount else 0,
-                        "max": float(product.max_loan_amount) if product.max_loan_amount else applicant_salary * 5
-                    },
-                    "foir_details": product.foir_details or "N/A",
-                    "estimated_max_loan": float(product.max_loan_amount) if product.max_loan_amount else applicant_salary * 5
-                })
+        for (product, min_salary), estimate in zip(matches, estimates):
+            # ✅ Eligible bank
+            eligible_banks.append({
+                "bank_id": product.bank_id,
+                "bank_name": snapshot.bank_by_id[product.bank_id].bank_name,
+                "product_id": product.id,
+                "product_name": product.product_title,
+                "eligibility_status": "Eligible",
+                "company_category": category_name,
+                "min_salary_required": min_salary,
+                "applicant_salary": applicant_salary,
+                "age_requirement": f"{product.min_age}-{product.max_age} years" if product.min_age and product.max_age else "N/A",
+                "applicant_age": age,
+                "tenure_range": f"{product.min_tenure}-{product.max_tenure} months" if product.min_tenure and product.max_tenure else "N/A",
+                "roi_range": f"{product.min_roi}%-{product.max_roi}%" if product.min_roi and product.max_roi else "N/A",
+                "loan_amount_range": {
+                    "min": product.min_loan_amount if product.min_loan_amount else 0,
+                    "max": product.max_loan_amount if product.max_loan_amount else applicant_salary * 5
+                },
+                "foir_details": product.foir_details or "N/A",
+                "estimated_max_loan": estimate["estimated_max_loan"],
+                "loan_estimate": estimate["loan_estimate"]
+            })
 
         # Step 7: Update last eligibility check date
         customer.last_eligibility_check = date.today()
         customer.save()
+        record_check([product for product, _ in matches], category_id, applicant_pincode)
+        check_event = {
+            "customer": {"id": customer.id, "full_name": customer.full_name, "email": customer.email,
+                         "last_eligibility_check": customer.last_eligibility_check},
+            "status": "Eligible" if eligible_banks else "Not Eligible",
+            "eligible_products": len(eligible_banks),
+        }
+        publish_on_commit("eligibility_check", lambda: check_event)
 
         # Step 8: Build Final Response
         customer_data = CustomerSerializer(customer).data
         customer_data["age"] = age
-        customer_data["company_category"] = company_category.category_name if company_category else "N/A"
+        customer_data["company_category"] = category_name
 
         overall_status = "Eligible" if eligible_banks else "Not Eligible"
+        eligible_count = len(eligible_banks)
+
+        offers_page = None
+        if offer_options:
+            offer_options.setdefault("offset", 0)
+            eligible_banks, matched = _select_offers(eligible_banks, [p for p, _ in matches], offer_options)
+            offers_page = {
+                "sort": offer_options.get("sort"),
+                "matched_count": matched,
+                "returned_count": len(eligible_banks),
+                "offset": offer_options["offset"],
+                "limit": offer_options.get("limit"),
+                "next_offset": (
+                    offer_options["offset"] + offer_options["limit"]
+                    if offer_options.get("limit") and offer_options["offset"] + offer_options["limit"] < matched
+                    else None
+                ),
+            }
 
         response_data = {
             "status": "created",
             "message": "Customer created and eligibility checked successfully",
             "eligibility_status": overall_status,
             "customer": customer_data,
-            "eligible_banks_count": len(eligible_banks),
+            "eligible_banks_count": eligible_count,
             "eligible_banks": eligible_banks
         }
-
-        if not eligible_banks and ineligibility_reasons:
-            response_data["ineligibility_reasons"] = ineligibility_reasons[:5]
+        if offers_page:
+            response_data["offers"] = offers_page
+
+        # Reasons are generated lazily and only as many as are returned
+        reasons = snapshot.ineligibility_reasons(age, applicant_pincode, category_id, applicant_salary)
+        if reasons_mode == "all":
+            returned = list(islice(reasons, MAX_INELIGIBILITY_REASONS + 1))
+            response_data["ineligibility_reasons"] = [
+                snapshot.describe_reason(r, age, category_id) for r in returned[:MAX_INELIGIBILITY_REASONS]
+            ]
+            response_data["ineligibility_reasons_truncated"] = len(returned) > MAX_INELIGIBILITY_REASONS
+        elif reasons_mode == "top" and not eligible_banks:
+            top = [snapshot.describe_reason(r, age, category_id) for r in islice(reasons, TOP_INELIGIBILITY_REASONS)]
+            if top:
+                response_data["ineligibility_reasons"] = top
 
         return Response(response_data, status=status.HTTP_201_CREATED)
 
@@ -254,15 +366,20 @@ def customer_create_or_eligible_banks(request):
 @api_view(['GET', 'POST'])
 def bank_list_create(request):
     if request.method == 'GET':
-        banks = Bank.objects.all().order_by('bank_name')
-        serializer = BankSerializer(banks, many=True)
-        return Response(serializer.data) 
+        # Read-only listing: built from .values_list(), same JSON as BankSerializer
+        return Response(bank_rows(Bank.objects.all().order_by('bank_name')))
 
     elif request.method == 'POST':
-        serializer = BankSerializer(data=request.data)
+        # Logo is uploaded in the background; the bank is created right away
+        data, image = split_deferred_file(request, "bank_image")
+        serializer = BankSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            bank = serializer.save()
+            response_data = serializer.data
+            if image:
+                upload = defer_upload(bank, "bank_image", image)
+                response_data["bank_image_upload"] = {"id": upload.id, "status": upload.status}
+            return Response(response_data, status=status.HTTP_201_CREATED)
         # Return validation errors (e.g., duplicate bank_name or invalid pincodes)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -325,7 +442,7 @@ def banks_by_pincodes(request, pincodes):
     for pin in valid_pins:
         banks |= Bank.objects.filter(pincode__regex=fr'(^|,){pin}(,|$)')
 
-    banks = banks.distinct()
+    banks = BankSerializer.setup_eager_loading(banks.distinct())
     serializer = BankSerializer(banks, many=True)
 
     response_data = {"banks": serializer.data}
@@ -336,10 +453,13 @@ def banks_by_pincodes(request, pincodes):
 
 
 @api_view(["GET", "POST"])
+@idempotent("customer_interest")
 def customer_interest_list_create(request):
     """
     GET  → List all customer interests with pagination and full linked details
-    POST → Create a new customer interest (with customer, bank, and optional product)
+    POST → Create a new customer interest (with customer, bank, and optional product);
+           honours the Idempotency-Key header. ?buffered=true queues it for a batched
+           insert and answers 202 Accepted (see interest_buffer.py)
     """
 
     if request.method == "GET":
@@ -349,9 +469,12 @@ def customer_interest_list_create(request):
         paginator.page_size = request.query_params.get('page_size', 10)  # Default page size = 10
         paginator.page_query_param = 'page'
         
-        # Fetch all interests with related customer, bank, product data
-        interests = CustomerInterest.objects.select_related("customer", "bank", "product").all().order_by('-created_at')
-        serializer = CustomerInterestSerializer(interests, many=True)
+        # Fetch all interests with related customer, bank, product data (narrowed by ?fields= / ?expand=)
+        fields, expand = parse_sparse_params(request.query_params)
+        interests = CustomerInterestSerializer(fields=fields, expand=expand).shape_queryset(
+            CustomerInterest.objects.all()
+        ).order_by('-created_at')
+        serializer = CustomerInterestSerializer(interests, many=True, fields=fields, expand=expand)
         return Response({
             "status": "success",
             "message": "All customer interests fetched successfully.",
@@ -360,9 +483,16 @@ def customer_interest_list_create(request):
         }, status=status.HTTP_200_OK)
 
     elif request.method == "POST":
+        if _query_flag(request, "buffered", default=get_interest_buffer_options()["MODE"] == "buffered"):
+            return _accept_buffered_interest(request)
+
         serializer = CustomerInterestSerializer(data=request.data)
         if serializer.is_valid():
-            interest = serializer.save()
+            # The partner-bank lead is queued in the same transaction (lead_outbox.py)
+            with transaction.atomic():
+                interest = serializer.save()
+                record_leads([interest.pk])
+                record_interests([(interest.customer_id, interest.bank_id, interest.product_id, interest.created_at)])
             return Response({
                 "status": "success",
                 "message": "Customer interest created successfully.",
@@ -375,14 +505,48 @@ def customer_interest_list_create(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _accept_buffered_interest(request):
+    """Validate against the catalog snapshot and queue the interest for a batched insert."""
+    serializer = BufferedInterestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            "status": "error",
+            "message": "Invalid data provided.",
+            "errors": serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+    error = validate_interest(get_snapshot(), data["bank"], data.get("product"))
+    if error and Bank.objects.filter(pk=data["bank"]).exists() and (
+        data.get("product") is None or Product.objects.filter(pk=data["product"], bank_id=data["bank"]).exists()
+    ):
+        error = None  # bank / product newer than this process's snapshot
+    if error:
+        return Response({"status": "error", "message": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    accepted_at = get_interest_buffer().add(data["customer"], data["bank"], data.get("product"))
+    return Response({
+        "status": "accepted",
+        "message": "Customer interest queued.",
+        "data": {
+            "customer": data["customer"],
+            "bank": data["bank"],
+            "product": data.get("product"),
+            "accepted_at": accepted_at,
+        }
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 
 @api_view(["GET"])
 def customer_interests_by_customer(request, customer_id):
     """
     GET → Fetch all interests for a specific customer
     """
-    interests = CustomerInterest.objects.select_related("customer", "bank", "product").filter(customer_id=customer_id)
-    serializer = CustomerInterestSerializer(interests, many=True)
+    fields, expand = parse_sparse_params(request.query_params)
+    interests = CustomerInterestSerializer(fields=fields, expand=expand).shape_queryset(
+        CustomerInterest.objects.filter(customer_id=customer_id)
+    )
+    serializer = CustomerInterestSerializer(interests, many=True, fields=fields, expand=expand)
     return Response(serializer.data) 
 
 
@@ -390,16 +554,19 @@ def customer_interests_by_customer(request, customer_id):
 def product_list(request, pk=None):
     # -------------------- GET --------------------
     if request.method == 'GET':
+        fields, expand = parse_sparse_params(request.query_params)
+        products = ProductSerializer(fields=fields, expand=expand).shape_queryset(Product.objects.all())
         if pk:  # Get single product
             try:
-                product = Product.objects.get(pk=pk)
-                serializer = ProductSerializer(product)
+                product = products.get(pk=pk)
+                serializer = ProductSerializer(product, fields=fields, expand=expand)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except Product.DoesNotExist:
                 return Response({"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
-        else:  # Get all products
-            products = Product.objects.all()
-            serializer = ProductSerializer(products, many=True)
+        elif fields is None and not expand:  # Get all products (fast values path)
+            return Response(product_rows(Product.objects.all()), status=status.HTTP_200_OK)
+        else:
+            serializer = ProductSerializer(products, many=True, fields=fields, expand=expand)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
     # -------------------- POST --------------------
@@ -458,24 +625,179 @@ def product_list(request, pk=None):
         
 @api_view(["GET"])
 def get_products_by_bank(request, bank_id):
-    products = Product.objects.filter(bank_id=bank_id)
-    if not products.exists():
+    fields, expand = parse_sparse_params(request.query_params)
+    products = ProductSerializer(fields=fields, expand=expand).shape_queryset(Product.objects.filter(bank_id=bank_id))
+    if not products:
         return Response({"error": "No products found for this bank"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = ProductSerializer(products, many=True)
+    serializer = ProductSerializer(products, many=True, fields=fields, expand=expand)
     return Response(serializer.data, status=status.HTTP_200_OK)        
 
+
+# 🔹 Admin customer search
+@api_view(["GET"])
+def customer_search(request):
+    """
+    Search customers by partial name / email / phone / PAN (?q=, 3+ characters)
+    and filter by ?city=, ?pincode=<pin>[,<pin>...], ?employment_type=,
+    ?salary_min= / ?salary_max=, ?checked_from= / ?checked_to= (last eligibility check).
+    Newest first, ?limit= per page (default 20); follow "next" (?cursor=) for the next page.
+    """
+    serializer = CustomerSearchSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    filters = dict(serializer.validated_data)
+    fields, expand = parse_sparse_params(request.query_params)
+
+    customers, next_cursor = search_customers(
+        filters,
+        query=filters.pop("q", None),
+        cursor=filters.pop("cursor", None),
+        limit=filters.pop("limit"),
+        queryset=CustomerSerializer(fields=fields, expand=expand).shape_queryset(Customer.objects.all()),
+    )
+    return Response({
+        "status": "success",
+        "results": CustomerSerializer(customers, many=True, fields=fields, expand=expand).data,
+        "next_cursor": next_cursor,
+        "next": replace_query_param(request.build_absolute_uri(), "cursor", next_cursor) if next_cursor else None,
+    }, status=status.HTTP_200_OK)
+
+
+# 🔹 Marketplace product search
+@api_view(["GET"])
+def product_search(request):
+    """
+    Filtered, paginated product catalog (?page=, ?page_size= up to 100):
+    ?roi_min=/?roi_max=, ?loan_min=/?loan_max=, ?tenure_min=/?tenure_max=,
+    ?age=, ?bank=<id>[,<id>...], ?category= (+ ?salary=), ?sort=roi|max_loan|title.
+    Includes the number of matches per bank (ignoring ?bank=) under "facets".
+    """
+    serializer = ProductSearchSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    filters = dict(serializer.validated_data)
+    sort = filters.pop("sort")
+
+    snapshot = peek_snapshot()  # served from memory when this process already holds the catalog
+    if "category" in filters:
+        filters["category_id"] = resolve_category_filter(filters["category"], snapshot)
+        if filters["category_id"] is None:
+            return Response({"status": "error", "message": f"Unknown category '{filters['category']}'"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    if snapshot is not None:
+        product_ids, counts = search_snapshot(snapshot, filters, sort)
+        bank_names = {bank_id: snapshot.bank_by_id[bank_id].bank_name for bank_id in counts}
+    else:
+        product_ids, counts = search_database(filters, sort)
+        bank_names = dict(Bank.objects.filter(id__in=list(counts)).values_list("id", "bank_name"))
+
+    paginator = PageNumberPagination()
+    paginator.page_size = 20
+    paginator.page_size_query_param = "page_size"
+    paginator.max_page_size = 100
+    page_ids = list(paginator.paginate_queryset(product_ids, request))
+
+    rows = {row["id"]: row for row in product_rows(Product.objects.filter(id__in=page_ids))}
+    response = paginator.get_paginated_response([rows[pk] for pk in page_ids if pk in rows])
+    response.data["facets"] = {"banks": bank_facets(counts, bank_names)}
+    return response
+
+def _query_flag(request, name, default=False):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes")
+
+
+@api_view(["GET"])
+def catalog_export(request):
+    """
+    Export the product catalog (banks → products → salary criteria).
+    ?bank=<id>[,<id>...] limits the export to specific banks.
+    ?download=true returns it as a file attachment.
+    """
+    bank_param = request.query_params.get("bank")
+    bank_ids = [b for b in (bank_param or "").split(",") if b.strip().isdigit()]
+    catalog = export_catalog(bank_ids=bank_ids or None)
+
+    response = Response(catalog, status=status.HTTP_200_OK)
+    if _query_flag(request, "download"):
+        response["Content-Disposition"] = 'attachment; filename="catalog.json"'
+    return response
+
+
+@api_view(["POST"])
+def catalog_import(request):
+    """
+    Import a catalog file (JSON body or multipart `file`) and diff it against
+    the stored products and salary criteria.
+    ?delete_missing=true removes products/criteria that the file leaves out.
+    ?dry_run=true reports the changes without applying them.
+    ?async=true queues the import as a background job (202 + job id).
+    """
+    data = request.data
+    upload = request.FILES.get("file")
+    if upload:
+        try:
+            data = json.loads(upload.read().decode("utf-8"))
+        except (UnicodeDecodeError, ValueError) as e:
+            return Response({
+                "status": "error",
+                "message": "Catalog file is not valid JSON",
+                "error": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = CatalogImportSerializer(data=data)
+    if not serializer.is_valid():
+        return Response({
+            "status": "error",
+            "message": "Invalid catalog.",
+            "errors": serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if _query_flag(request, "async"):
+        job = jobs.enqueue("catalog_import", {
+            "catalog": data,
+            "delete_missing": _query_flag(request, "delete_missing"),
+            "dry_run": _query_flag(request, "dry_run"),
+        }, priority=10)
+        return Response({
+            "status": "queued",
+            "message": "Catalog import queued.",
+            "job": JobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    summary = import_catalog(
+        serializer.validated_data["banks"],
+        delete_missing=_query_flag(request, "delete_missing"),
+        dry_run=_query_flag(request, "dry_run"),
+    )
+    return Response({
+        "status": "success",
+        "message": "Catalog import dry run completed." if summary["dry_run"] else "Catalog imported successfully.",
+        "summary": summary
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET', 'POST'])
 def managed_card_list_create(request):
     if request.method == 'GET':
-        cards = ManagedCard.objects.all()
+        cards = ManagedCardSerializer.setup_eager_loading(ManagedCard.objects.all())
         serializer = ManagedCardSerializer(cards, many=True)
         return Response(serializer.data)
 
     elif request.method == 'POST':
-        serializer = ManagedCardSerializer(data=request.data)
+        # Image is uploaded in the background; the card is created right away
+        data, image = split_deferred_file(request, "image")
+        serializer = ManagedCardSerializer(data=data, context={"deferred_image": image is not None})
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            card = serializer.save()
+            response_data = serializer.data
+            if image:
+                upload = defer_upload(card, "image", image)
+                response_data["image_upload"] = {"id": upload.id, "status": upload.status}
+            return Response(response_data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 # Retrieve + Update + Delete
@@ -501,10 +823,62 @@ def managed_card_detail(request, pk):
         card.delete()
         return Response(status=status.HTTP_200_OK)
 
+@api_view(["GET"])
+def media_upload_detail(request, pk):
+    """Status of a deferred bank logo / managed card upload."""
+    try:
+        upload = MediaUpload.objects.get(pk=pk)
+    except MediaUpload.DoesNotExist:
+        return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(MediaUploadSerializer(upload).data)
+
+
+@api_view(["GET", "POST"])
+def job_list_create(request):
+    """
+    GET  → Recent background jobs (?status=, ?kind=, ?limit= up to 200)
+    POST → Queue a job: {"kind": ..., "payload": {...}, "priority": 0}
+    """
+    if request.method == "GET":
+        qs = Job.objects.order_by("-created_at")
+        if request.query_params.get("status"):
+            qs = qs.filter(status=request.query_params["status"])
+        if request.query_params.get("kind"):
+            qs = qs.filter(kind=request.query_params["kind"])
+        try:
+            limit = min(int(request.query_params.get("limit", 50)), 200)
+        except ValueError:
+            limit = 50
+        return Response(JobSerializer(qs[:limit], many=True).data)
+
+    kind = request.data.get("kind")
+    if kind not in jobs.JOB_HANDLERS:
+        return Response({
+            "error": f"Unknown job kind '{kind}'",
+            "available_kinds": sorted(jobs.JOB_HANDLERS)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        priority = int(request.data.get("priority", 0))
+    except (TypeError, ValueError):
+        return Response({"error": "priority must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    job = jobs.enqueue(kind, request.data.get("payload") or {}, priority=priority)
+    return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+def job_detail(request, pk):
+    """Status / progress / result of one background job."""
+    try:
+        job = Job.objects.get(pk=pk)
+    except Job.DoesNotExist:
+        return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job).data)
+
+
 @api_view(['GET', 'POST'])
 def company_category_list_create(request):
     if request.method == 'GET':
-        categories = CompanyCategory.objects.all()
+        categories = CompanyCategorySerializer.setup_eager_loading(CompanyCategory.objects.all())
         serializer = CompanyCategorySerializer(categories, many=True)
         return Response(serializer.data)
 
@@ -543,8 +917,11 @@ def company_category_detail(request, pk):
 @api_view(['GET', 'POST'])
 def company_list_create(request):
     if request.method == 'GET':
-        companies = Company.objects.all()
-        serializer = CompanySerializer(companies, many=True)
+        fields, expand = parse_sparse_params(request.query_params)
+        if fields is None and not expand:
+            return Response(company_rows(Company.objects.all()))
+        companies = CompanySerializer(fields=fields, expand=expand).shape_queryset(Company.objects.all())
+        serializer = CompanySerializer(companies, many=True, fields=fields, expand=expand)
         return Response(serializer.data)
 
     elif request.method == 'POST':
@@ -564,7 +941,8 @@ def company_detail(request, pk):
         return Response({"error": "Company not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer = CompanySerializer(company)
+        fields, expand = parse_sparse_params(request.query_params)
+        serializer = CompanySerializer(company, fields=fields, expand=expand)
         return Response(serializer.data)
 
     elif request.method == 'PUT':
@@ -581,9 +959,7 @@ def company_detail(request, pk):
 @api_view(['GET', 'POST'])
 def salary_criteria_list_create(request):
     if request.method == 'GET':
-        criteria = SalaryCriteria.objects.all()
-        serializer = SalaryCriteriaSerializer(criteria, many=True)
-        return Response(serializer.data)
+        return Response(salary_criteria_rows(SalaryCriteria.objects.all()))
 
     elif request.method == 'POST':
         serializer = SalaryCriteriaSerializer(data=request.data)
@@ -627,7 +1003,12 @@ def get_all_eligibility_checks(request):
     """
     try:
         # 1️⃣ Get all customers ordered by last eligibility check
-        customers_qs = Customer.objects.all().order_by("-last_eligibility_check")
+        #    (?fields= / ?expand= narrow the customer columns that are loaded)
+        fields, expand = parse_sparse_params(request.query_params)
+        customers_qs = CustomerSerializer(fields=fields, expand=expand).shape_queryset(
+            Customer.objects.all(),
+            extra_columns=("dob", "companyName", "pincode", "salary", "last_eligibility_check"),
+        ).order_by("-last_eligibility_check")
 
         if not customers_qs.exists():
             return Response({
@@ -642,78 +1023,47 @@ def get_all_eligibility_checks(request):
         paginated_customers = paginator.paginate_queryset(customers_qs, request)
 
         # 3️⃣ Build response data for paginated customers
+        #    (eligibility is evaluated against the cached catalog snapshot — no per-row queries)
+        snapshot = get_snapshot()
+        today = date.today()
         response_data = []
 
         for customer in paginated_customers:
-            # Calculate age
-            age = None
-            if customer.dob:
-                today = date.today()
-                age = today.year - customer.dob.year - (
-                    (today.month, today.day) < (customer.dob.month, customer.dob.day)
-                )
-
-            # Determine company category
-            company_category = None
-            company_name = getattr(customer, "companyName", "")
-            if company_name:
-                company_obj = Company.objects.filter(company_name__iexact=company_name).first()
-                if company_obj and company_obj.category:
-                    company_category = company_obj.category
-                else:
-                    company_category, _ = CompanyCategory.objects.get_or_create(category_name="UNLISTED")
-            else:
-                company_category, _ = CompanyCategory.objects.get_or_create(category_name="UNLISTED")
+            age = calculate_age(customer.dob, today)
+            category_id = snapshot.resolve_category(getattr(customer, "companyName", ""))
+            applicant_salary = float(customer.salary or 0)
 
             # Check eligible banks for this customer
             eligible_banks = []
-            for bank in Bank.objects.all():
-                bank_pins = bank.get_pincode_list()
-                if customer.pincode not in bank_pins:
-                    continue
-
-                for product in Product.objects.filter(bank=bank):
-                    # Check age range
-                    if product.min_age and product.max_age:
-                        if not (product.min_age <= age <= product.max_age):
-                            continue
-
-                    # Salary criteria check
-                    salary_criteria = SalaryCriteria.objects.filter(
-                        product=product, category=company_category
-                    )
-
-                    if not salary_criteria.exists():
-                        continue
-
-                    for criteria in salary_criteria:
-                        if float(customer.salary or 0) >= float(criteria.min_salary):
-                            eligible_banks.append({
-                                "bank_id": bank.id,
-                                "bank_name": bank.bank_name,
-                                "product_id": product.id,
-                                "product_name": product.product_title,
-                                "min_salary_required": float(criteria.min_salary),
-                                "applicant_salary": float(customer.salary or 0),
-                                "roi_range": f"{product.min_roi}%-{product.max_roi}%" if product.min_roi and product.max_roi else "N/A",
-                                "tenure_range": f"{product.min_tenure}-{product.max_tenure} months" if product.min_tenure and product.max_tenure else "N/A",
-                                "loan_amount_range": {
-                                    "min": float(product.min_loan_amount) if product.min_loan_amount else 0,
-                                    "max": float(product.max_loan_amount) if product.max_loan_amount else float(customer.salary or 0) * 5
-                                }
-                            })
-                            break  # Only need first matched criteria
+            for product, min_salary in snapshot.eligible_products(age, customer.pincode, category_id, applicant_salary):
+                eligible_banks.append({
+                    "bank_id": product.bank_id,
+                    "bank_name": snapshot.bank_by_id[product.bank_id].bank_name,
+                    "product_id": product.id,
+                    "product_name": product.product_title,
+                    "min_salary_required": min_salary,
+                    "applicant_salary": applicant_salary,
+                    "roi_range": f"{product.min_roi}%-{product.max_roi}%" if product.min_roi and product.max_roi else "N/A",
+                    "tenure_range": f"{product.min_tenure}-{product.max_tenure} months" if product.min_tenure and product.max_tenure else "N/A",
+                    "loan_amount_range": {
+                        "min": product.min_loan_amount if product.min_loan_amount else 0,
+                        "max": product.max_loan_amount if product.max_loan_amount else applicant_salary * 5
+                    }
+                })
 
             # Build customer data
-            customer_data = CustomerSerializer(customer).data
-            customer_data.update({
+            customer_data = CustomerSerializer(customer, fields=fields, expand=expand).data
+            eligibility_data = {
                 "age": age,
-                "company_category": company_category.category_name if company_category else "N/A",
+                "company_category": snapshot.category_name(category_id),
                 "eligibility_status": "Eligible" if eligible_banks else "Not Eligible",
                 "eligible_banks_count": len(eligible_banks),
                 "eligible_banks": eligible_banks,
                 "last_eligibility_check": customer.last_eligibility_check
-            })
+            }
+            if fields is not None:
+                eligibility_data = {k: v for k, v in eligibility_data.items() if k in fields}
+            customer_data.update(eligibility_data)
 
             response_data.append(customer_data)
 
@@ -728,26 +1078,284 @@ def get_all_eligibility_checks(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _frontier_product(snapshot, product):
+    return {
+        "bank_id": product.bank_id,
+        "bank_name": snapshot.bank_by_id[product.bank_id].bank_name,
+        "product_id": product.id,
+        "product_name": product.product_title,
+    }
+
+
+@api_view(["GET"])
+def eligibility_frontier(request):
+    """
+    What-if view of eligibility for ?dob= (or ?age=), ?pincode= and ?companyName=:
+    every product available in the area / age band with its minimum salary, ascending.
+    With ?salary= it also returns how many products that salary gets and which
+    products unlock at the next ?steps= (default 3) salary thresholds.
+    """
+    serializer = EligibilityFrontierSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    age = data["age"] if "age" in data else calculate_age(data["dob"])
+    pincode = data["pincode"].strip()
+    snapshot = _applicant_snapshot(data.get("companyName"), pincode)
+    category_id = snapshot.resolve_category(data.get("companyName"))
+    thresholds, products = snapshot.salary_frontier(category_id, pincode, age)
+
+    response_data = {
+        "status": "success",
+        "company_category": snapshot.category_name(category_id),
+        "applicant_age": age,
+        "products_available": len(products),
+        "salary_thresholds": [
+            dict(_frontier_product(snapshot, product), min_salary_required=threshold)
+            for threshold, product in zip(thresholds, products)
+        ],
+    }
+
+    if "salary" in data:
+        salary = float(data["salary"])
+        eligible, unlocks = snapshot.next_unlocks(category_id, pincode, age, salary, steps=data["steps"])
+        response_data.update({
+            "applicant_salary": salary,
+            "eligibility_status": "Eligible" if eligible else "Not Eligible",
+            "eligible_count": len(eligible),
+            "next_unlocks": [
+                {
+                    "min_salary_required": threshold,
+                    "salary_gap": round(threshold - salary, 2),
+                    "products": [_frontier_product(snapshot, product) for product in unlocked],
+                }
+                for threshold, unlocked in unlocks
+            ],
+        })
+
+    return Response(response_data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def emi_grid_view(request):
+    """
+    EMI / total interest / total payable of ?amount= across each product's
+    tenure range (every ?tenure_step= months, default 12) × ROI range
+    (?roi_steps= points, default 3).
+    Products come from ?products=1,2,3 or, without it, the eligible set for
+    ?dob= (or ?age=), ?pincode=, ?salary= and ?companyName=.
+    """
+    serializer = EmiGridSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    snapshot = get_snapshot()
+    if "products" in data:
+        missing = [pid for pid in data["products"] if pid not in snapshot.product_by_id]
+        if missing and Product.objects.filter(id__in=missing).exists():
+            snapshot = get_snapshot(refresh=True)  # created after this process loaded its snapshot
+        products = [snapshot.product_by_id[pid] for pid in data["products"] if pid in snapshot.product_by_id]
+        not_found = [pid for pid in data["products"] if pid not in snapshot.product_by_id]
+    else:
+        age = data["age"] if "age" in data else calculate_age(data["dob"])
+        category_id = snapshot.resolve_category(data.get("companyName"))
+        products = [p for p, _ in snapshot.eligible_products(age, data["pincode"].strip(), category_id, data["salary"])]
+        not_found = []
+
+    amount = float(data["amount"])
+    grids, skipped = emi_grid(amount, products, data["tenure_step"], data["roi_steps"])
+
+    response_data = {
+        "status": "success",
+        "amount": amount,
+        "products_count": len(grids),
+        "products": [
+            {
+                "product_id": grid["product"].id,
+                "product_name": grid["product"].product_title,
+                "bank_id": grid["product"].bank_id,
+                "bank_name": snapshot.bank_by_id[grid["product"].bank_id].bank_name,
+                "amount_in_range": (
+                    (grid["product"].min_loan_amount or 0) <= amount
+                    and (not grid["product"].max_loan_amount or amount <= grid["product"].max_loan_amount)
+                ),
+                "rois": grid["rois"],
+                "tenures": grid["tenures"],
+                "emi": grid["emi"],
+                "total_interest": grid["total_interest"],
+                "total_payable": grid["total_payable"],
+            }
+            for grid in grids
+        ],
+    }
+    if skipped:
+        response_data["skipped"] = [{"product_id": p.id, "reason": reason} for p, reason in skipped]
+    if not_found:
+        response_data["not_found"] = not_found
+    return Response(response_data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def amortization_schedule(request):
+    """
+    Month-by-month amortization of ?amount= at ?roi= (annual %) over ?tenure= months,
+    streamed as newline-delimited JSON (one row per month).
+    """
+    serializer = AmortizationSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    rows = amortization_rows(data["amount"], data["roi"], data["tenure"])
+    response = StreamingHttpResponse(
+        (json.dumps(row) + "\n" for row in rows), content_type="application/x-ndjson"
+    )
+    response["Content-Disposition"] = 'inline; filename="amortization.ndjson"'
+    return response
+
+
+def _bank_pincodes(snapshot, bank_id):
+    """Pincodes a bank serves: from the snapshot, or from the row when the snapshot predates the bank."""
+    bank = snapshot.bank_by_id.get(bank_id)
+    if bank is not None:
+        return set(bank.pincodes)
+    pincode = Bank.objects.filter(pk=bank_id).values_list("pincode", flat=True).first()
+    return {p.strip() for p in (pincode or "").split(",") if p.strip()}
+
+
+@api_view(["POST"])
+def audience_size(request):
+    """
+    How many stored customers would qualify for a product definition.
+    Body: {"product": id?, "bank": id?, "pincode": "110001,110002"?,
+           "min_age": 21?, "max_age": 58?, "categories": {"CAT A": 25000, ...}?}
+    An existing `product` supplies the defaults; any other field overrides it.
+    Returns eligible counts overall, by company category and by pincode region.
+    """
+    serializer = AudienceSizeSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    data = serializer.validated_data
+
+    started = time.perf_counter()
+    snapshot = get_snapshot()
+    pincodes, min_age, max_age, thresholds = set(), None, None, {}
+
+    # The serializer resolved product / bank from the database; this process's
+    # snapshot may predate them (up to SNAPSHOT_MAX_AGE), so fall back to the rows
+    product = data.get("product")
+    if product is not None:
+        pincodes = _bank_pincodes(snapshot, product.bank_id)
+        min_age, max_age = product.min_age, product.max_age
+        if product.id in snapshot.product_by_id:
+            thresholds = snapshot.product_thresholds(product.id)
+        else:
+            thresholds = {
+                category_id: float(min_salary)
+                for category_id, min_salary in SalaryCriteria.objects.filter(product=product).order_by()
+                .values_list("category_id").annotate(Min("min_salary"))
+            }
+    if "bank" in data:
+        pincodes = _bank_pincodes(snapshot, data["bank"].id)
+    if "pincode" in data:
+        pincodes = {p for p in data["pincode"].split(",") if p}
+    min_age = data.get("min_age", min_age)
+    max_age = data.get("max_age", max_age)
+
+    unknown_categories = []
+    if "categories" in data:
+        thresholds = {}
+        for name, min_salary in data["categories"].items():
+            category_id = snapshot.category_id(name)
+            if category_id is None:
+                unknown_categories.append(name)  # no customer can resolve to it
+            else:
+                thresholds[category_id] = float(min_salary)
+
+    result = size_audience(get_customer_columns(), snapshot, pincodes, min_age, max_age, thresholds)
+    result.update(
+        status="success",
+        criteria={
+            "pincodes": len(pincodes),
+            "age_range": f"{min_age}-{max_age}" if min_age and max_age else "N/A",
+            "categories": {snapshot.category_name(c): t for c, t in sorted(thresholds.items())},
+        },
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+    if unknown_categories:
+        result["unknown_categories"] = unknown_categories
+    return Response(result, status=status.HTTP_200_OK)
+
+
+# 🔹 Eligibility → interest conversion funnel
+@api_view(["GET"])
+def funnel_analytics(request):
+    """
+    Eligible checks, interests and conversion from the daily funnel counters
+    (see funnel.py): ?date_from= / ?date_to= (default: last 30 days),
+    ?bank=<id>[,<id>...], ?product=<id>[,...], ?category=<id or name>,
+    ?region=<pincode prefix>, ?group_by=bank,product,category,region,day.
+    """
+    serializer = FunnelReportSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = serializer.validated_data
+    default_from, default_to = default_range()
+    date_from, date_to = params.get("date_from", default_from), params.get("date_to", default_to)
+
+    category_id = None
+    if params.get("category"):
+        category_id = resolve_category_filter(params["category"], peek_snapshot())
+        if category_id is None:
+            return Response({
+                "status": "error",
+                "message": f"Unknown category '{params['category']}'"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    rows, totals = funnel_report(
+        date_from, date_to, group_by=params["group_by"], bank_ids=params.get("bank"),
+        product_ids=params.get("product"), category_id=category_id, region=params.get("region"),
+    )
+    return Response({
+        "status": "success",
+        "date_from": date_from,
+        "date_to": date_to,
+        "group_by": params["group_by"],
+        "totals": totals,
+        "results": rows,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def lead_delivery_metrics(request):
+    """Partner-bank lead outbox: queue depth, lag and delivery throughput."""
+    return Response({"status": "success", "data": delivery_metrics()}, status=status.HTTP_200_OK)
+
+
+def _dashboard_data():
+    # Top 5 recent customers who checked eligibility
+    recent_customers = Customer.objects.order_by("-last_eligibility_check")[:5]
+    # Top 5 recent interested users
+    recent_interests = RecentInterestSerializer.setup_eager_loading(CustomerInterest.objects.order_by("-created_at"))[:5]
+    # Top 5 recent products
+    recent_products = RecentProductSerializer.setup_eager_loading(Product.objects.order_by("-created_at"))[:5]
+
+    dashboard_data = {
+        "recent_customers": recent_customers,
+        "recent_interests": recent_interests,
+        "recent_products": recent_products
+    }
+    return DashboardSerializer(dashboard_data).data
+
+
 @api_view(["GET"])
 def admin_dashboard(request):
     try:
-        # Top 5 recent customers who checked eligibility
-        recent_customers = Customer.objects.order_by("-last_eligibility_check")[:5]
-        # Top 5 recent interested users
-        recent_interests = CustomerInterest.objects.order_by("-created_at")[:5]
-        # Top 5 recent products
-        recent_products = Product.objects.order_by("-created_at")[:5]
-
-        dashboard_data = {
-            "recent_customers": recent_customers,
-            "recent_interests": recent_interests,
-            "recent_products": recent_products
-        }
-
-        serializer = DashboardSerializer(dashboard_data)
         return Response({
             "status": "success",
-            "data": serializer.data
+            "data": _dashboard_data()
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -755,4 +1363,50 @@ def admin_dashboard(request):
             "status": "error",
             "message": "An error occurred while fetching dashboard data",
             "error": str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def admin_dashboard_stream(request):
+    """
+    GET → Server-Sent Events feed of the admin dashboard (see live_feed.py): a
+          snapshot on connect (or the missed events after Last-Event-ID), then
+          eligibility checks, interests and product changes as they happen.
+          Only served by the ASGI app; under WSGI the open stream would pin a worker.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({
+            "status": "error",
+            "message": "The live dashboard stream needs the ASGI server (myproject.asgi); poll admin-dashboard/ instead"
+        }, status=501)
+    options = get_live_feed_options()
+    broker = get_live_feed_broker()
+    subscription = broker.subscribe(asyncio.get_running_loop())
+
+    # Subscribed before the snapshot / replay is taken, so nothing falls in between
+    backlog = None
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    if last_event_id.isdigit():
+        backlog = broker.replay(int(last_event_id))
+    if backlog is None:
+        snapshot = await sync_to_async(_dashboard_data)()
+        backlog = [format_event(None, "snapshot", json.dumps(snapshot, cls=DjangoJSONEncoder))]
+
+    async def stream():
+        try:
+            yield f"retry: {options['RETRY']}\n\n"
+            for message in backlog:
+                yield message
+            while True:
+                try:
+                    yield await subscription.get(options["HEARTBEAT"])
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
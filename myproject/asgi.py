@@ -3,6 +3,13 @@ ASGI config for myproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this module; the live dashboard stream
+(admin-dashboard/stream/) is refused under WSGI:
+
+    gunicorn myproject.asgi:application -k uvicorn.workers.UvicornWorker
+
+or `uvicorn myproject.asgi:application` for a single process.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
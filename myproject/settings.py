@@ -49,6 +49,19 @@ cloudinary.config(
 
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
+# Sign Cloudinary delivery URLs (bankapp.media_urls memoizes them per image/preset)
+BANKAPP_CLOUDINARY_SIGN_URLS = False
+
+# Deferred bank logo / managed card uploads (bankapp.media_uploads)
+BANKAPP_MEDIA_UPLOADS = {
+    "SPOOL_DIR": os.path.join(BASE_DIR, "media_spool"),
+    "BACKEND": "bankapp.media_uploads.CloudinaryBackend",
+    "DISPATCH": "thread",  # or "jobs" to hand uploads to the run_workers queue
+    "MAX_CONCURRENCY": 4,
+    "MAX_ATTEMPTS": 3,
+    "RETRY_BACKOFF": 2.0,
+}
+
 
 # Application definition
 
@@ -68,6 +81,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'bankapp.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +92,101 @@ MIDDLEWARE = [
 
 ]
 
+# ✅ API rendering: orjson-backed renderer (falls back to stdlib json when orjson isn't installed)
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'bankapp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# ✅ Caches — "default" is per process (local memory). "shared" is seen by every
+# worker and holds state that must be: the catalog version, rate-limit counters,
+# Idempotency-Key claims. Its table is created by migration 0029_shared_cache_table
+# (or `manage.py createcachetable`); Redis (django.core.cache.backends.redis.RedisCache)
+# works as well.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bankapp',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'bankapp_shared_cache',
+    },
+}
+
+# ✅ Catalog snapshot used for eligibility (bankapp.eligibility); CACHE holds its version
+BANKAPP_CATALOG_SNAPSHOT = {
+    'CACHE': 'shared',
+}
+
+# ✅ Sliding-window rate limits (bankapp.throttling)
+BANKAPP_RATE_LIMITS = {
+    'CACHE': 'shared',                         # every worker counts in the same windows (check --deploy warns otherwise)
+    'eligibility': {
+        'ip': ['30/min', '300/hour'],          # per client IP
+        'identity': ['5/min', '20/day'],       # per email / phone / PAN
+    },
+}
+
+# ✅ Idempotency-Key replay for eligibility / customer-interest POSTs (bankapp.idempotency)
+BANKAPP_IDEMPOTENCY = {
+    'CACHE': 'shared',      # claims must be seen by every worker (check --deploy warns otherwise)
+    'TTL': 24 * 3600,       # seconds a stored response is replayed
+    'LOCK_TIMEOUT': 60,     # seconds an in-flight claim survives a crashed worker
+    'WAIT': 10,             # seconds a concurrent duplicate waits for the first response
+}
+
+# ✅ Write-behind CustomerInterest ingestion (bankapp.interest_buffer)
+BANKAPP_INTEREST_BUFFER = {
+    'MODE': 'direct',          # "buffered" → every customer-interests POST is queued (202)
+    'MAX_ROWS': 500,           # rows per bulk insert
+    'MAX_DELAY_MS': 200,       # longest a row waits in memory
+    'MAX_PENDING': 50000,      # beyond this, rows spool straight to disk
+    'SPOOL_DIR': os.path.join(BASE_DIR, 'interest_spool'),
+}
+
+# ✅ Partner-bank lead delivery from the LeadOutbox table (bankapp.lead_outbox)
+BANKAPP_LEAD_DELIVERY = {
+    'TRANSPORT': 'bankapp.lead_outbox.WebhookTransport',  # or bankapp.lead_outbox.FileDropTransport
+    'WEBHOOK_URL': os.environ.get('LEAD_WEBHOOK_URL'),    # "{bank_id}" is substituted
+    'FILE_DROP_DIR': os.path.join(BASE_DIR, 'lead_drop'),
+    'BATCH_SIZE': 200,         # leads per delivery
+    'CONCURRENCY': 4,          # banks delivered in parallel
+    'MAX_ATTEMPTS': 8,         # then the lead is marked failed
+    'BACKOFF': 30,             # seconds before the first retry, doubling per attempt
+    'MAX_BACKOFF': 3600,
+    'SENDING_TIMEOUT': 300,    # seconds before an unfinished batch is retried
+    'BANKS': {},               # per-bank overrides, e.g. {3: {'TRANSPORT': '...FileDropTransport'}}
+}
+
+# ✅ Daily per-bank lead files (manage.py export_daily_leads, bankapp.lead_exports)
+BANKAPP_LEAD_EXPORT = {
+    'OUTPUT_DIR': os.path.join(BASE_DIR, 'lead_exports'),  # <OUTPUT_DIR>/<date>/bank_<id>.csv.gz + manifest.json
+}
+
+# ✅ Live admin dashboard over Server-Sent Events (admin-dashboard/stream/, bankapp.live_feed; needs ASGI)
+BANKAPP_LIVE_FEED = {
+    'BROKER': 'bankapp.live_feed.LocalBroker',  # in-process; use a shared broker with several workers
+    'QUEUE_SIZE': 500,     # events buffered per dashboard before it is told to resync
+    'HISTORY': 500,        # events kept for Last-Event-ID replay
+    'HEARTBEAT': 15,       # seconds between keep-alive comments
+    'RETRY': 3000,         # ms before the browser reconnects
+}
+
+# ✅ Eligibility → interest funnel counters (analytics/funnel/, bankapp.funnel)
+BANKAPP_FUNNEL = {
+    'REGION_DIGITS': 3,    # pincode prefix length used as the region
+}
+
+# ✅ br/gzip compression of JSON responses (bankapp.middleware.CompressionMiddleware)
+BANKAPP_COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
 ROOT_URLCONF = 'myproject.urls'
 
 TEMPLATES = [
@@ -95,7 +204,9 @@ TEMPLATES = [
     },
 ]
 
+# ✅ Production runs the ASGI app (see myproject/asgi.py); WSGI can't serve admin-dashboard/stream/
 WSGI_APPLICATION = 'myproject.wsgi.application'
+ASGI_APPLICATION = 'myproject.asgi.application'
 
 
 # Database